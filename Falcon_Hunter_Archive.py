@@ -0,0 +1,398 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Append-only binary archive of finished Falcon - Hunter chess games
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+from Falcon_Hunter_Chess import Chessboard, GameError, MoveCodec, PositionNotation
+
+
+class GameArchive:
+    """
+    Layout of the archive files shared by ArchiveWriter and ArchiveReader
+    The games file starts with an 8 byte header (magic and version), followed by one record per game: a 4 byte header
+    holding the result code, a spare byte and the number of plies, then a 16-bit move code (see MoveCodec) per ply
+    The index file holds the 64-bit offset of every game record in the games file, so game K is found without reading
+    the games before it. Both files are only ever appended to, and the index can be rebuilt from the games file
+    """
+    _magic = b'FHGA'
+    _version = 1
+    _file_header = struct.Struct('<4sHxx')
+    _game_header = struct.Struct('<BxH')
+    _offset_format = struct.Struct('<Q')
+    _results = ['UNFINISHED', 'WHITE_WON', 'BLACK_WON', 'DRAW']
+    _result_codes = {result: code for code, result in enumerate(_results)}
+
+    @staticmethod
+    def get_index_path(path):
+        """
+        :param path: path of the games file
+        :return: path of its index file
+        """
+        return path + '.idx'
+
+    @classmethod
+    def get_results(cls):
+        """
+        :return: list of game results indexed by result code
+        """
+        return cls._results
+
+    @classmethod
+    def pack_game(cls, moves, result):
+        """
+        :param moves: moves played from the starting position, (source, destination) or (fairy piece, entry square)
+        :param result: 'UNFINISHED', 'WHITE_WON', 'BLACK_WON' or 'DRAW'
+        :return: game record as bytes
+        """
+        if len(moves) > 0xFFFF:
+            raise GameError(f"A game of {len(moves)} plies is too long for the archive")
+        codes = [MoveCodec.encode_move(move) for move in moves]
+        return cls._game_header.pack(cls._result_codes[result], len(codes)) + struct.pack(f'<{len(codes)}H', *codes)
+
+
+class ArchiveWriter(GameArchive):
+    """
+    Appends games to an archive, records are gathered in memory and written to the games and index files in bulk
+    Opening an existing archive continues after its last indexed game. Games are only readable once the writer is
+    flushed or closed, and the index is written after the games it points to so a reader never sees an offset past the
+    data
+    """
+
+    def __init__(self, path, buffer_size=1 << 20):
+        """
+        :param path: path of the games file, created with its index if it does not exist
+        :param buffer_size: bytes of game records gathered before they are written
+        """
+        self._path = path
+        self._buffer_size = buffer_size
+        new_archive = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_archive:
+            if not os.path.exists(self.get_index_path(path)):
+                ArchiveReader.rebuild_index(path)
+            self._truncate_unindexed()
+        self._games_file = open(path, 'ab')
+        self._index_file = open(self.get_index_path(path), 'ab')
+        if new_archive:
+            self._games_file.write(self._file_header.pack(self._magic, self._version))
+        self._end_offset = self._games_file.tell()
+        self._game_count = os.path.getsize(self.get_index_path(path)) // self._offset_format.size
+        self._games = bytearray()
+        self._offsets = bytearray()
+
+    def _truncate_unindexed(self):
+        """
+        Cuts the files back to the end of the last indexed game. A crash inside flush can leave game records written
+        without their offsets, or part of an offset, and the next game's offset would otherwise point past them
+        :return: None
+        """
+        index_path = self.get_index_path(self._path)
+        offset_size = self._offset_format.size
+        index_size = os.path.getsize(index_path)
+        index_size -= index_size % offset_size
+        end_offset = self._file_header.size
+        with open(index_path, 'r+b') as index_file:
+            index_file.truncate(index_size)
+            if index_size:
+                index_file.seek(index_size - offset_size)
+                end_offset = self._offset_format.unpack(index_file.read(offset_size))[0]
+        with open(self._path, 'r+b') as games_file:
+            if index_size:
+                games_file.seek(end_offset)
+                plies = self._game_header.unpack(games_file.read(self._game_header.size))[1]
+                end_offset += self._game_header.size + 2 * plies
+            if os.fstat(games_file.fileno()).st_size > end_offset:
+                games_file.truncate(end_offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """
+        :return: number of games in the archive, including ones not yet flushed
+        """
+        return self._game_count
+
+    def append_game(self, moves, result):
+        """
+        :param moves: moves played from the starting position
+        :param result: 'UNFINISHED', 'WHITE_WON', 'BLACK_WON' or 'DRAW'
+        :return: number of the game in the archive, counting from 0
+        """
+        self._offsets += self._offset_format.pack(self._end_offset + len(self._games))
+        self._games += self.pack_game(moves, result)
+        self._game_count += 1
+        if len(self._games) >= self._buffer_size:
+            self.flush()
+        return self._game_count - 1
+
+    def append_chessboard(self, chessboard, result=None):
+        """
+        :param chessboard: chessboard holding a game played from the starting position
+        :param result: result to record, the chessboard's game state if not given
+        :return: number of the game in the archive, counting from 0
+        """
+        if result is None:
+            result = chessboard.get_game_manager().get_game_state()
+        return self.append_game(chessboard.get_move_history(), result)
+
+    def flush(self):
+        """
+        Writes the gathered game records and then their offsets
+        :return: None
+        """
+        if self._games:
+            self._games_file.write(self._games)
+            self._games_file.flush()
+            self._end_offset += len(self._games)
+            self._games = bytearray()
+        if self._offsets:
+            self._index_file.write(self._offsets)
+            self._index_file.flush()
+            self._offsets = bytearray()
+
+    def close(self):
+        """
+        :return: None
+        """
+        self.flush()
+        self._games_file.close()
+        self._index_file.close()
+
+
+class ArchiveReader(GameArchive):
+    """
+    Reads an archive through memory maps of the games and index files, so only the pages holding the games asked for
+    are read from disk however large the archive is
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path of the games file, its index is rebuilt first if it is missing
+        """
+        self._path = path
+        index_path = self.get_index_path(path)
+        if not os.path.exists(index_path):
+            self.rebuild_index(path)
+
+        self._games_file = open(path, 'rb')
+        self._index_file = open(index_path, 'rb')
+        self._games = self._map(self._games_file)
+        self._index = self._map(self._index_file)
+        magic, version = self._file_header.unpack_from(self._games, 0)
+        if magic != self._magic or version != self._version:
+            raise GameError(f"{path} is not a version {self._version} game archive")
+        self._game_count = len(self._index) // self._offset_format.size
+
+    @staticmethod
+    def _map(open_file):
+        """
+        :param open_file: file opened for reading
+        :return: read only memory map of the whole file, an empty bytes object for an empty file
+        """
+        if os.fstat(open_file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(open_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """
+        :return: number of games in the archive
+        """
+        return self._game_count
+
+    def __iter__(self):
+        """
+        Reads every game in order through the index, so game numbers always match get_codes even if records were
+        written past the last indexed game
+        :return: generator of (move codes, result) tuples
+        """
+        unpack_offset = self._offset_format.unpack_from
+        offset_size = self._offset_format.size
+        for game_number in range(self._game_count):
+            yield self._read_record(unpack_offset(self._index, game_number * offset_size)[0])
+
+    def get_offset(self, game_number):
+        """
+        :param game_number: number of the game, counting from 0
+        :return: offset of the game's record in the games file
+        """
+        if not 0 <= game_number < self._game_count:
+            raise IndexError(f"Game {game_number} is not in an archive of {self._game_count} games")
+        return self._offset_format.unpack_from(self._index, game_number * self._offset_format.size)[0]
+
+    def get_codes(self, game_number):
+        """
+        :param game_number: number of the game, counting from 0
+        :return: (move codes, result) tuple of the game
+        """
+        return self._read_record(self.get_offset(game_number))
+
+    def get_game(self, game_number):
+        """
+        :param game_number: number of the game, counting from 0
+        :return: (moves, result) tuple of the game, moves as (source, destination) or (fairy piece, entry square)
+        """
+        codes, result = self.get_codes(game_number)
+        return [MoveCodec.decode_move(code) for code in codes], result
+
+    def _read_record(self, offset):
+        """
+        :param offset: offset of a game record
+        :return: (move codes, result) tuple
+        """
+        result_code, plies = self._game_header.unpack_from(self._games, offset)
+        codes = struct.unpack_from(f'<{plies}H', self._games, offset + self._game_header.size)
+        return codes, self._results[result_code]
+
+    @staticmethod
+    def replay(codes, chessboard=None):
+        """
+        Plays an archived game through the rules engine with Chessboard.apply_moves
+        :param codes: move codes of the game
+        :param chessboard: chessboard to play on, a new one is created if not given
+        :return: chessboard after the last move, GameError is raised for an illegal move
+        """
+        if chessboard is None:
+            chessboard = Chessboard()
+        chessboard.apply_moves([MoveCodec.decode_move(code) for code in codes])
+        return chessboard
+
+    def replay_game(self, game_number):
+        """
+        :param game_number: number of the game, counting from 0
+        :return: chessboard after the game's last move, see replay
+        """
+        return self.replay(self.get_codes(game_number)[0])
+
+    @classmethod
+    def rebuild_index(cls, path):
+        """
+        Writes the index of a games file by walking its records, for archives copied without their index
+        A record cut short at the end of the file is left out
+        :param path: path of the games file
+        :return: number of games indexed
+        """
+        game_count = 0
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as games_file, open(cls.get_index_path(path), 'wb') as index_file:
+            games_file.seek(cls._file_header.size)
+            offset = cls._file_header.size
+            offsets = bytearray()
+            while True:
+                header = games_file.read(cls._game_header.size)
+                if len(header) < cls._game_header.size:
+                    break
+                plies = cls._game_header.unpack(header)[1]
+                if offset + cls._game_header.size + 2 * plies > file_size:
+                    break
+                offsets += cls._offset_format.pack(offset)
+                games_file.seek(2 * plies, os.SEEK_CUR)
+                offset += cls._game_header.size + 2 * plies
+                game_count += 1
+                if len(offsets) >= 1 << 20:
+                    index_file.write(offsets)
+                    offsets = bytearray()
+            index_file.write(offsets)
+        return game_count
+
+    def close(self):
+        """
+        :return: None
+        """
+        for mapped in (self._games, self._index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._games_file.close()
+        self._index_file.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status, 1 if a game could not be packed or replayed
+    """
+    parser = argparse.ArgumentParser(description="Store and read finished games in a binary archive")
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack_parser = commands.add_parser('pack', help="append games in text form, one per line, to an archive")
+    pack_parser.add_argument('archive', help="archive to append to")
+    pack_parser.add_argument('files', nargs='*', default=['-'], help="game files to read, '-' for stdin (default)")
+    show_parser = commands.add_parser('show', help="print games from an archive in text form")
+    show_parser.add_argument('archive', help="archive to read")
+    show_parser.add_argument('games', nargs='*', type=int, help="game numbers to print (default all)")
+    verify_parser = commands.add_parser('verify', help="replay every game in an archive through the rules engine")
+    verify_parser.add_argument('archive', help="archive to read")
+    index_parser = commands.add_parser('index', help="rebuild the index of an archive")
+    index_parser.add_argument('archive', help="archive to index")
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        failures = 0
+        with ArchiveWriter(args.archive) as writer:
+            for name in args.files:
+                games_file = sys.stdin if name == '-' else open(name)
+                try:
+                    for line_number, line in enumerate(games_file, 1):
+                        line = line.strip()
+                        if not line or line.startswith('#'):
+                            continue
+                        # Games are replayed before they are stored so the archive only holds legal games
+                        try:
+                            chessboard = Chessboard()
+                            chessboard.apply_moves(PositionNotation.parse_moves(line))
+                        except GameError as error:
+                            print(f"{name}:{line_number}: {error}", file=sys.stderr)
+                            failures += 1
+                            continue
+                        writer.append_chessboard(chessboard)
+                finally:
+                    if games_file is not sys.stdin:
+                        games_file.close()
+            print(f"{len(writer)} games in {args.archive}, {failures} rejected", file=sys.stderr)
+        return 1 if failures else 0
+
+    if args.command == 'index':
+        print(f"Indexed {ArchiveReader.rebuild_index(args.archive)} games", file=sys.stderr)
+        return 0
+
+    with ArchiveReader(args.archive) as reader:
+        if args.command == 'show':
+            game_numbers = args.games if args.games else range(len(reader))
+            for game_number in game_numbers:
+                moves, result = reader.get_game(game_number)
+                text = '; '.join(f"{source.lower() if len(source) == 2 else source}, {destination.lower()}"
+                                 for source, destination in moves)
+                print(f"{game_number}\t{result}\t{text}")
+            return 0
+
+        failures = 0
+        for game_number, (codes, result) in enumerate(reader):
+            try:
+                chessboard = ArchiveReader.replay(codes)
+            except GameError as error:
+                print(f"Game {game_number}: {error}", file=sys.stderr)
+                failures += 1
+                continue
+            game_state = chessboard.get_game_manager().get_game_state()
+            if game_state != 'UNFINISHED' and game_state != result:
+                print(f"Game {game_number}: recorded as {result} but replays to {game_state}", file=sys.stderr)
+                failures += 1
+        print(f"{len(reader)} games replayed, {failures} failed", file=sys.stderr)
+        return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Vectorized evaluation of many Falcon - Hunter chess positions at once with NumPy
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from Falcon_Hunter_Chess import PositionNotation
+from Falcon_Hunter_Engine import Evaluator
+
+
+class BatchEvaluator:
+    """
+    Scores N positions at once with the same material weights, piece-square tables and reserve values as Evaluator
+    Boards are (N, 64) int8 arrays indexed by square like Chessboard._board read row by row: 0 is an empty square,
+    White's pieces are 1 to 8 in the order PNBRQKFH and Black's pieces are the same codes negated
+    The rest of each position is kept in three more arrays: sides (N,) int8 is 1 when White is to move and -1 for
+    Black, reserves (N, 4) int8 counts the F, H, f and h still waiting to be entered and unlocked (N, 2) bool tells
+    whether White and Black may enter fairy pieces
+    Scores come back as an (N,) int64 array from the point of view of the player to move, equal to Evaluator.evaluate
+    """
+    _piece_order = 'PNBRQKFH'
+    _piece_codes = {'_': 0, **{piece: code for code, piece in enumerate(_piece_order, 1)},
+                    **{piece.lower(): -code for code, piece in enumerate(_piece_order, 1)}}
+
+    # Fairy pieces in the column order of the reserves array
+    _reserve_order = 'FHfh'
+
+    def __init__(self, chunk_size=65536):
+        """
+        Builds one (17, 64) table of material plus piece-square value indexed by piece code + 8 and square
+        :param chunk_size: positions scored per NumPy pass, bounds the temporary arrays for very large batches
+        """
+        self._chunk_size = chunk_size
+        piece_values = Evaluator.get_piece_values()
+        tables = Evaluator.get_piece_square_tables()
+        mirror = np.arange(64) ^ 56
+        self._square_values = np.zeros((17, 64), dtype=np.int64)
+        for kind, code in ((kind, self._piece_codes[kind]) for kind in self._piece_order):
+            table = np.array(tables[kind], dtype=np.int64) + piece_values[kind]
+            self._square_values[8 + code] = table
+            # Black reads White's table upside down and counts against White
+            self._square_values[8 - code] = -table[mirror]
+
+        reserve_values = Evaluator.get_reserve_values()
+        self._reserve_values = np.array([reserve_values['locked'], reserve_values['unlocked']], dtype=np.int64)
+
+        # Lookup from the 4-bit codes of a binary position record to board codes
+        self._record_codes = np.array([self._piece_codes[piece] for piece in PositionNotation.get_piece_order()],
+                                      dtype=np.int8)
+
+    @classmethod
+    def get_piece_codes(cls):
+        """
+        :return: mapping of piece name ('_' for an empty square) to its int8 board code
+        """
+        return cls._piece_codes
+
+    @classmethod
+    def encode_board(cls, board):
+        """
+        :param board: 8x8 list of piece names, as returned by Chessboard.get_board
+        :return: (64,) int8 array of board codes
+        """
+        piece_codes = cls._piece_codes
+        return np.array([piece_codes[piece] for row in board for piece in row], dtype=np.int8)
+
+    @classmethod
+    def encode_chessboards(cls, chessboards):
+        """
+        Encodes positions held by chessboard objects
+        :param chessboards: sequence of chessboard objects
+        :return: (boards, sides, reserves, unlocked) arrays, see the class description
+        """
+        count = len(chessboards)
+        boards = np.empty((count, 64), dtype=np.int8)
+        sides = np.empty(count, dtype=np.int8)
+        reserves = np.empty((count, 4), dtype=np.int8)
+        unlocked = np.empty((count, 2), dtype=bool)
+        for index, chessboard in enumerate(chessboards):
+            boards[index] = cls.encode_board(chessboard.get_board())
+            material_ledger = chessboard.get_game_manager().get_material_ledger()
+            sides[index] = 1 if chessboard.get_game_manager().get_current_player() == 'WHITE' else -1
+            reserves[index] = [material_ledger.get_in_reserve(piece) for piece in cls._reserve_order]
+            unlocked[index] = [chessboard.is_fairy_entry_unlocked(colour) for colour in ('WHITE', 'BLACK')]
+        return boards, sides, reserves, unlocked
+
+    def encode_records(self, buffer):
+        """
+        Decodes back to back binary position records (see PositionNotation) without a Python loop per position
+        :param buffer: bytes-like object holding a whole number of records
+        :return: (boards, sides, reserves, unlocked) arrays, see the class description
+        """
+        record_dtype = np.dtype([('occupied', '<u8'), ('codes', 'u1', 18), ('flags', 'u1'), ('turn', '<u2'),
+                                 ('padding', 'u1', 3)])
+        records = np.frombuffer(buffer, dtype=record_dtype)
+
+        # Occupied squares in square order, each one takes the next 4-bit code from the record
+        occupied = np.unpackbits(records['occupied'].astype('<u8').view(np.uint8).reshape(-1, 8), axis=1,
+                                 bitorder='little').astype(bool)
+        code_bytes = records['codes']
+        nibbles = np.empty((len(records), 36), dtype=np.uint8)
+        nibbles[:, 0::2] = code_bytes & 15
+        nibbles[:, 1::2] = code_bytes >> 4
+        slots = np.cumsum(occupied, axis=1) - 1
+        pieces = np.take_along_axis(nibbles, np.clip(slots, 0, 35), axis=1)
+        boards = np.where(occupied, self._record_codes[pieces], 0).astype(np.int8)
+
+        flag_bits = PositionNotation.get_flag_bits()
+        flags = records['flags']
+        sides = np.where(flags & flag_bits['BLACK_TO_MOVE'], -1, 1).astype(np.int8)
+        reserves = np.stack([(flags & flag_bits[piece]) == 0 for piece in self._reserve_order], axis=1)
+        unlocked = np.stack([(flags & flag_bits[colour]) != 0 for colour in ('WHITE', 'BLACK')], axis=1)
+        return boards, sides, reserves.astype(np.int8), unlocked
+
+    def evaluate(self, boards, sides=None, reserves=None, unlocked=None):
+        """
+        Scores a batch of positions
+        :param boards: (N, 64) int8 array of board codes
+        :param sides: (N,) int8 array, 1 for White to move and -1 for Black, White to move if not given
+        :param reserves: (N, 4) array of F, H, f and h in reserve, none in reserve if not given
+        :param unlocked: (N, 2) bool array of fairy piece entry unlocked for White and Black, locked if not given
+        :return: (N,) int64 array of scores in centipawns, positive when the player to move is better
+        """
+        boards = np.asarray(boards, dtype=np.int8)
+        if boards.ndim != 2 or boards.shape[1] != 64:
+            raise ValueError(f"Boards must be an (N, 64) array, not {boards.shape}")
+        count = len(boards)
+        scores = np.empty(count, dtype=np.int64)
+        squares = np.arange(64)
+        for start in range(0, count, self._chunk_size):
+            chunk = boards[start:start + self._chunk_size].astype(np.intp) + 8
+            scores[start:start + len(chunk)] = self._square_values[chunk, squares].sum(axis=1)
+
+        if reserves is not None:
+            reserves = np.asarray(reserves, dtype=np.int64)
+            unlocked = np.zeros((count, 2), dtype=bool) if unlocked is None else np.asarray(unlocked, dtype=bool)
+            reserve_values = self._reserve_values[unlocked.astype(np.intp)]
+            scores += reserve_values[:, 0] * (reserves[:, 0] + reserves[:, 1])
+            scores -= reserve_values[:, 1] * (reserves[:, 2] + reserves[:, 3])
+
+        if sides is not None:
+            scores *= np.asarray(sides, dtype=np.int64)
+        return scores
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status
+    """
+    parser = argparse.ArgumentParser(description="Score a file of positions with the vectorized evaluator")
+    parser.add_argument('positions', help="file of positions, binary records unless --text is given")
+    parser.add_argument('--text', action='store_true', help="the file holds one text position per line")
+    parser.add_argument('--output', help="write one score per line to this file instead of stdout")
+    parser.add_argument('--compare', action='store_true',
+                        help="also score every position one at a time with Evaluator, check the scores match and "
+                             "report the speedup")
+    args = parser.parse_args(argv)
+
+    batch_evaluator = BatchEvaluator()
+    if args.text:
+        with open(args.positions) as positions_file:
+            parsed_positions = [PositionNotation.parse_text(line) for line in positions_file if line.strip()]
+        chessboards = [PositionNotation.load(parsed_position) for parsed_position in parsed_positions]
+        start_time = time.perf_counter()
+        arrays = BatchEvaluator.encode_chessboards(chessboards)
+    else:
+        with open(args.positions, 'rb') as positions_file:
+            buffer = positions_file.read()
+        # Decoding the records is part of the batch time, the one at a time time excludes building the chessboards
+        start_time = time.perf_counter()
+        arrays = batch_evaluator.encode_records(buffer)
+    scores = batch_evaluator.evaluate(*arrays)
+    batch_elapsed = time.perf_counter() - start_time
+
+    if args.output:
+        np.savetxt(args.output, scores, fmt='%d')
+    else:
+        np.savetxt(sys.stdout, scores, fmt='%d')
+
+    if args.compare:
+        if not args.text:
+            chessboards = [PositionNotation.load(parsed_position)
+                           for parsed_position in PositionNotation.iter_bytes(buffer)]
+        evaluator = Evaluator()
+        start_time = time.perf_counter()
+        expected = [evaluator.evaluate(chessboard) for chessboard in chessboards]
+        single_elapsed = time.perf_counter() - start_time
+        mismatches = int(np.count_nonzero(scores != np.array(expected, dtype=np.int64)))
+        print(f"{len(scores)} positions: batch {batch_elapsed:.3f}s, one at a time {single_elapsed:.3f}s "
+              f"({single_elapsed / max(batch_elapsed, 1e-9):.1f}x), {mismatches} mismatched scores", file=sys.stderr)
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Search benchmark comparing engine settings on the Falcon - Hunter test positions
+
+import argparse
+import sys
+
+from Falcon_Hunter_Engine import MoveOrderer, SearchEngine
+from Falcon_Hunter_Perft import Perft
+
+
+class SearchBenchmark:
+    """
+    Searches each perft test position to a fixed depth under several engine settings and reports the nodes visited
+    and the time taken to reach the depth, so the effect of each search heuristic can be compared
+    Every run uses a fresh engine and transposition table so earlier runs cannot help later ones
+    """
+    # Settings compared, as MoveOrderer and SearchEngine keyword arguments
+    _settings = {
+        'all': {'orderer': {}, 'engine': {}},
+        'no-mvv-lva': {'orderer': {'mvv_lva': False}, 'engine': {}},
+        'no-killers': {'orderer': {'killers': False}, 'engine': {}},
+        'no-history': {'orderer': {'history': False}, 'engine': {}},
+        'no-ordering': {'orderer': {'mvv_lva': False, 'killers': False, 'history': False}, 'engine': {}},
+        'no-quiescence': {'orderer': {}, 'engine': {'quiescence': False}},
+        'quiescence-entries': {'orderer': {}, 'engine': {'quiescence_entries': True}},
+    }
+
+    @classmethod
+    def get_settings(cls):
+        """
+        :return: mapping of setting name to the MoveOrderer ('orderer') and SearchEngine ('engine') keyword arguments
+        it uses
+        """
+        return cls._settings
+
+    @classmethod
+    def run_search(cls, position_name, setting_name, depth):
+        """
+        :param position_name: name of a perft test position
+        :param setting_name: name of the engine setting
+        :param depth: depth to search to
+        :return: (SearchResult of a search to exactly that depth, nodes visited in quiescence)
+        """
+        chessboard = Perft.setup_position(position_name)
+        setting = cls._settings[setting_name]
+        engine = SearchEngine(time_limit=None, max_depth=depth, move_orderer=MoveOrderer(**setting['orderer']),
+                              **setting['engine'])
+        return engine.search(chessboard), engine.get_quiescence_nodes()
+
+    @classmethod
+    def run(cls, position_names, setting_names, depth, output=sys.stdout):
+        """
+        Prints one line per position and setting, then the totals for each setting compared to the first one
+        :param position_names: names of perft test positions
+        :param setting_names: names of engine settings, the first is the baseline
+        :param depth: depth to search to
+        :param output: file to print to
+        :return: mapping of setting name to (total nodes, total seconds)
+        """
+        totals = {}
+        for position_name in position_names:
+            for setting_name in setting_names:
+                result, quiescence_nodes = cls.run_search(position_name, setting_name, depth)
+                nodes, elapsed = totals.get(setting_name, (0, 0.0))
+                totals[setting_name] = (nodes + result.get_nodes(), elapsed + result.get_elapsed())
+                print(f"{position_name:14} {setting_name:18} depth {result.get_depth()}: {result.get_nodes():>9} nodes "
+                      f"({quiescence_nodes:>8} quiescence) {result.get_elapsed():8.3f}s  "
+                      f"best {result.get_best_move()} score {result.get_score()}", file=output)
+
+        baseline_nodes, baseline_elapsed = totals[setting_names[0]]
+        print(f"Totals at depth {depth}:", file=output)
+        for setting_name in setting_names:
+            nodes, elapsed = totals[setting_name]
+            print(f"  {setting_name:18} {nodes:>9} nodes ({nodes / max(baseline_nodes, 1):5.2f}x) "
+                  f"{elapsed:8.3f}s ({elapsed / max(baseline_elapsed, 1e-9):5.2f}x)", file=output)
+        return totals
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status
+    """
+    parser = argparse.ArgumentParser(description="Compare search settings by nodes and time to a fixed depth")
+    parser.add_argument('--depth', type=int, default=4, help="depth to search to (default 4)")
+    parser.add_argument('--position', default='all', choices=['all'] + sorted(Perft.get_positions()),
+                        help="test position to search (default all)")
+    parser.add_argument('--settings', nargs='+', choices=list(SearchBenchmark.get_settings()),
+                        default=list(SearchBenchmark.get_settings()),
+                        help="settings to compare, the first is the baseline (default all of them)")
+    args = parser.parse_args(argv)
+
+    position_names = sorted(Perft.get_positions()) if args.position == 'all' else [args.position]
+    SearchBenchmark.run(position_names, args.settings, args.depth)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Opening book for the Falcon - Hunter chess variant, built from archived or self-played games
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+
+from Falcon_Hunter_Archive import ArchiveReader, ArchiveWriter
+from Falcon_Hunter_Chess import Chessboard, GameError, MoveCodec, PositionNotation
+from Falcon_Hunter_Tournament import Tournament
+
+
+class OpeningBook:
+    """
+    Moves to play without searching in positions seen early in many games, keyed by position hash key
+    The book file is a 16 byte header (magic, version and entry count) followed by one 12 byte entry per book move:
+    hash key, move code and weight, sorted by hash key with the heaviest move of each position first. Entries are
+    big-endian like the position index so the raw bytes sort by key
+    The file is memory mapped and a lookup is a binary search. A move's weight is the number of games it was played in
+    plus the number of those the player making it went on to win, so moves that won more often are picked more often
+    """
+    _magic = b'FHOB'
+    _version = 1
+    _header = struct.Struct('<4sHxxQ')
+    _entry = struct.Struct('>QHH')
+    _key = struct.Struct('>Q')
+
+    def __init__(self, path, seed=None, best_only=False):
+        """
+        :param path: path of the book file
+        :param seed: seed for picking among book moves, None for a different choice every run
+        :param best_only: True to always play the heaviest move instead of picking by weight
+        """
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._entry_count = self._header.unpack_from(self._map, 0)
+        if magic != self._magic or version != self._version:
+            raise ValueError(f"{path} is not a version {self._version} opening book")
+        self._random = random.Random(seed)
+        self._best_only = best_only
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """
+        :return: number of book moves
+        """
+        return self._entry_count
+
+    def get_moves(self, chessboard):
+        """
+        :param chessboard: chessboard holding the position to look up
+        :return: list of (move, weight) tuples for the position, heaviest first, empty if it is not in the book
+        """
+        key = chessboard.get_hash_key()
+        unpack_key = self._key.unpack_from
+        unpack_entry = self._entry.unpack_from
+        header_size = self._header.size
+        entry_size = self._entry.size
+
+        low = 0
+        high = self._entry_count
+        while low < high:
+            middle = (low + high) >> 1
+            if unpack_key(self._map, header_size + middle * entry_size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        moves = []
+        for entry_number in range(low, self._entry_count):
+            entry_key, code, weight = unpack_entry(self._map, header_size + entry_number * entry_size)
+            if entry_key != key:
+                break
+            moves.append((MoveCodec.decode_move(code), weight))
+        return moves
+
+    def choose_move(self, chessboard):
+        """
+        Picks a book move for the position, book moves that are not legal on the chessboard (a hash collision) are
+        left out
+        :param chessboard: chessboard holding the position
+        :return: move to play, None if the position is not in the book
+        """
+        moves = [(move, weight) for move, weight in self.get_moves(chessboard) if chessboard.is_legal(move)]
+        if not moves:
+            return None
+        if self._best_only:
+            return moves[0][0]
+        return self._random.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+    @classmethod
+    def build(cls, archive, path, plies=12, min_games=2):
+        """
+        Collects the moves played in the first plies of every archived game
+        :param archive: ArchiveReader of the games to learn from
+        :param path: path of the book file to write
+        :param plies: number of moves from the start of each game that are added to the book
+        :param min_games: moves played in fewer games than this are left out
+        :return: number of book moves written
+        """
+        decode_move = MoveCodec.decode_move
+        counts = {}
+        for codes, result in archive:
+            chessboard = Chessboard()
+            for code in codes[:plies]:
+                player = chessboard.get_game_manager().get_current_player()
+                games, wins = counts.get((chessboard.get_hash_key(), code), (0, 0))
+                counts[chessboard.get_hash_key(), code] = (games + 1, wins + (result == f'{player}_WON'))
+                chessboard.make_move(decode_move(code))
+
+        entries = sorted(
+            (key, -min(games + wins, 0xFFFF), code)
+            for (key, code), (games, wins) in counts.items() if games >= min_games
+        )
+        with open(path, 'wb', buffering=1 << 20) as book_file:
+            book_file.write(cls._header.pack(cls._magic, cls._version, len(entries)))
+            for key, negative_weight, code in entries:
+                book_file.write(cls._entry.pack(key, code, -negative_weight))
+        return len(entries)
+
+    def close(self):
+        """
+        :return: None
+        """
+        self._map.close()
+        self._file.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status, 1 if the moves to show the book moves after are invalid
+    """
+    parser = argparse.ArgumentParser(description="Build and look into an opening book")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help="build a book from a game archive")
+    build_parser.add_argument('archive', help="game archive to learn from")
+    build_parser.add_argument('book', help="book file to write")
+    selfplay_parser = commands.add_parser('selfplay', help="play engine games and build a book from them")
+    selfplay_parser.add_argument('book', help="book file to write")
+    selfplay_parser.add_argument('--games', type=int, default=100, help="number of games to play (default 100)")
+    selfplay_parser.add_argument('--time', type=float, default=0.1, help="seconds per move (default 0.1)")
+    selfplay_parser.add_argument('--processes', type=int, help="worker processes (default one per CPU core)")
+    for command_parser in (build_parser, selfplay_parser):
+        command_parser.add_argument('--plies', type=int, default=12,
+                                    help="moves from the start of each game added to the book (default 12)")
+        command_parser.add_argument('--min-games', type=int, default=2,
+                                    help="leave out moves played in fewer games (default 2)")
+    show_parser = commands.add_parser('show', help="list the book moves for a position")
+    show_parser.add_argument('book', help="book file")
+    show_parser.add_argument('--moves', default='', help="moves from the starting position, e.g. 'e2, e4; e7, e5'")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        with ArchiveReader(args.archive) as archive:
+            entry_count = OpeningBook.build(archive, args.book, args.plies, args.min_games)
+        print(f"{entry_count} book moves from {args.archive}", file=sys.stderr)
+        return 0
+
+    if args.command == 'selfplay':
+        # The games only need to reach past the book plies, they are archived to a temporary file and learnt from
+        engine_settings = {'time_limit': args.time}
+        tournament = Tournament(engine_settings, engine_settings, args.games, processes=args.processes,
+                                max_plies=max(args.plies, 1) * 4)
+        archive_directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(args.book)))
+        archive_path = os.path.join(archive_directory, 'selfplay.fha')
+        try:
+            with ArchiveWriter(archive_path) as writer:
+                for result in tournament.run():
+                    writer.append_game(result['moves'], result['result'])
+            with ArchiveReader(archive_path) as archive:
+                entry_count = OpeningBook.build(archive, args.book, args.plies, args.min_games)
+        finally:
+            for name in os.listdir(archive_directory):
+                os.remove(os.path.join(archive_directory, name))
+            os.rmdir(archive_directory)
+        print(f"{entry_count} book moves from {args.games} self-play games", file=sys.stderr)
+        return 0
+
+    chessboard = Chessboard()
+    try:
+        chessboard.apply_moves(PositionNotation.parse_moves(args.moves) if args.moves.strip() else [])
+    except GameError as error:
+        print(f"Invalid moves: {error}", file=sys.stderr)
+        return 1
+    with OpeningBook(args.book) as book:
+        for (source, destination), weight in book.get_moves(chessboard):
+            print(f"{source.lower() if len(source) == 2 else source}, {destination.lower()}\t{weight}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
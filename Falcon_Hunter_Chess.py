@@ -2,59 +2,195 @@
 # Github Username: ARamanadham
 # Description: A functional chess game with slightly modified ruleset (see README for more information)
 
+import enum
+import random
+import struct
+import sys
+
 class GameError(Exception):
     """Custom exception class for Chessboard-related errors"""
     pass
 
 
+class MoveStatus(enum.IntEnum):
+    """
+    Reason codes returned by the non-raising legality check, LEGAL is 0 so any other code is a rejection
+    """
+    LEGAL = 0
+    GAME_OVER = 1
+    OFF_BOARD = 2
+    NO_PIECE = 3
+    OPPONENTS_PIECE = 4
+    OWN_PIECE_AT_DESTINATION = 5
+    INVALID_PIECE_MOVE = 6
+    PATH_BLOCKED = 7
+    NOT_A_FAIRY_PIECE = 8
+    FAIRY_PIECE_NOT_YOURS = 9
+    FAIRY_PIECE_ALREADY_ENTERED = 10
+    FAIRY_ENTRY_SQUARE = 11
+    FAIRY_ENTRY_LOCKED = 12
+
+
+class MaterialLedger:
+    """
+    Running count of every piece name captured and waiting in reserve for one game
+    Also records the turn each side first lost a Queen, Rook, Knight or Bishop, which unlocks fairy piece entry for
+    that side on its later turns. Captures and fairy piece entries update the counts as they happen so material, game
+    over and fairy piece entry questions never need to scan the board or the captured pieces lists
+    """
+    # Number of each piece a player starts the game with on the board, fairy pieces start in reserve
+    _starting_counts = {
+        'P': 8, 'R': 2, 'N': 2, 'B': 2, 'Q': 1, 'K': 1, 'F': 0, 'H': 0,
+        'p': 8, 'r': 2, 'n': 2, 'b': 2, 'q': 1, 'k': 1, 'f': 0, 'h': 0,
+    }
+    _required_pieces = {'Q', 'R', 'N', 'B', 'q', 'r', 'n', 'b'}
+
+    def __init__(self):
+        """
+        Initializes the counts for the start of a game
+        """
+        self.reset()
+
+    @classmethod
+    def get_starting_counts(cls):
+        """
+        :return: mapping of piece name to the number of that piece on the board at the start of the game
+        """
+        return cls._starting_counts
+
+    def reset(self):
+        """
+        :return: resets the counts back to the start of the game
+        """
+        self._captured = {piece: 0 for piece in MaterialLedger._starting_counts}
+        self._in_reserve = {'F': 1, 'H': 1, 'f': 1, 'h': 1}
+        self._lost_required_pieces = {'WHITE': 0, 'BLACK': 0}
+        self._unlock_turns = {'WHITE': None, 'BLACK': None}
+
+    def record_capture(self, piece_name, turn_count):
+        """
+        :param piece_name: name of the captured piece
+        :param turn_count: the turn the piece was captured on
+        :return: adds the piece to the captured counts
+        """
+        self._captured[piece_name] += 1
+        if piece_name in MaterialLedger._required_pieces:
+            colour = 'WHITE' if piece_name.isupper() else 'BLACK'
+            self._lost_required_pieces[colour] += 1
+            if self._lost_required_pieces[colour] == 1:
+                self._unlock_turns[colour] = turn_count
+
+    def restore_capture(self, piece_name):
+        """
+        :param piece_name: name of the piece being put back, used when taking back moves
+        :return: takes the piece back out of the captured counts
+        """
+        self._captured[piece_name] -= 1
+        if piece_name in MaterialLedger._required_pieces:
+            colour = 'WHITE' if piece_name.isupper() else 'BLACK'
+            self._lost_required_pieces[colour] -= 1
+            if not self._lost_required_pieces[colour]:
+                self._unlock_turns[colour] = None
+
+    def record_entry(self, fairy_piece):
+        """
+        :param fairy_piece: name of the fairy piece entered
+        :return: takes the fairy piece out of reserve
+        """
+        self._in_reserve[fairy_piece] -= 1
+
+    def restore_entry(self, fairy_piece):
+        """
+        :param fairy_piece: name of the fairy piece being taken back, used when taking back moves
+        :return: puts the fairy piece back in reserve
+        """
+        self._in_reserve[fairy_piece] += 1
+
+    def get_in_reserve(self, fairy_piece):
+        """
+        :param fairy_piece: name of the fairy piece
+        :return: 1 if the fairy piece is waiting to be entered, 0 once it has been entered
+        """
+        return self._in_reserve[fairy_piece]
+
+    def get_unlock_turn(self, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: turn that player first lost a Queen, Rook, Knight or Bishop, None if they have lost none
+        """
+        return self._unlock_turns[colour]
+
+    def is_entry_unlocked(self, colour, turn_count):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :param turn_count: turn the fairy piece would be entered on
+        :return: True if that player lost a Queen, Rook, Knight or Bishop before this turn
+        """
+        unlock_turn = self._unlock_turns[colour]
+        return unlock_turn is not None and unlock_turn < turn_count
+
+    def is_king_captured(self, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: True if that player's King has been captured
+        """
+        return self._captured['K' if colour == 'WHITE' else 'k'] > 0
+
+
 class GameManager:
     """
-    Helper class made up of class methods designed to:
+    Helper class holding the state of a single game, every game gets its own instance:
     Keep track of the turn count
     Keep track of current player
-    Sets of piece names for each player
     A list of tuples indicated captured pieces and the turn they were captured on for each player
-    Hold a mapping of rows/column labels for 0-based indexing
+    A material ledger counting the pieces on the board, captured and in reserve
     The overall state of the game
+    Class methods shared by every game:
+    Sets of piece names for each player
+    Hold a mapping of rows/column labels and square names for 0-based indexing
     """
-    # pre-initialized variables
-    _current_player = 'WHITE'
-    _turn_count = 1
+    # Constants shared by every game
     _white_pieces = {'P', 'R', 'N', 'B', 'Q', 'K', 'F', 'H'}
     _black_pieces = {'p', 'r', 'n', 'b', 'q', 'k', 'f', 'h'}
-    _captured_white_pieces = []
-    _captured_black_pieces = []
     _column_mapping = {'A': 0, 'B': 1, 'C': 2, 'D': 3, 'E': 4, 'F': 5, 'G': 6, 'H': 7}
     _row_mapping = {'1': 7, '2': 6, '3': 5, '4': 4, '5': 3, '6': 2, '7': 1, '8': 0}
-    _game_state = 'UNFINISHED'
+    _square_names = [column + row for row in '87654321' for column in 'ABCDEFGH']
+    _square_indexes = {name: index for index, name in enumerate(_square_names)}
 
-    @classmethod
-    def set_current_player(cls):
+    def __init__(self):
+        """
+        Initializes the per-game state for a new game
+        """
+        self._current_player = 'WHITE'
+        self._turn_count = 1
+        self._captured_white_pieces = []
+        self._captured_black_pieces = []
+        self._material_ledger = MaterialLedger()
+        self._game_state = 'UNFINISHED'
+
+    def set_current_player(self):
         """
         :return: Updates the current player based on the turn count, odd turns are white players turns, evens are black
         """
-        cls._current_player = 'WHITE' if cls._turn_count % 2 == 1 else 'BLACK'
+        self._current_player = 'WHITE' if self._turn_count % 2 == 1 else 'BLACK'
 
-    @classmethod
-    def get_current_player(cls):
+    def get_current_player(self):
         """
         :return: 'WHITE' or 'BLACK' depending on whose turn it is
         """
-        return cls._current_player
+        return self._current_player
 
-    @classmethod
-    def set_turn_count(cls):
+    def set_turn_count(self):
         """
         :return: Increments the turn count by 1
         """
-        cls._turn_count += 1
+        self._turn_count += 1
 
-    @classmethod
-    def get_turn_count(cls):
+    def get_turn_count(self):
         """
         :return: Current turn number
         """
-        return cls._turn_count
+        return self._turn_count
 
     @classmethod
     def get_white_pieces(cls):
@@ -70,32 +206,48 @@ class GameManager:
         """
         return cls._black_pieces
 
-    @classmethod
-    def set_captured_pieces(cls, piece_name, turn_count):
+    def set_captured_pieces(self, piece_name, turn_count):
         """
         adds a tuple (piece_name, turn_count) to the appropriate captured pieces dictionary
         :param piece_name: Name of the piece that was captured, uppercase indicates white player piece, lowercase black
         :param turn_count: The turn the piece was captured on
         :return: updates the appropriate captured pieces list
         """
-        if piece_name in cls._white_pieces:
-            cls._captured_white_pieces.append((piece_name, turn_count))
+        if piece_name in self._white_pieces:
+            self._captured_white_pieces.append((piece_name, turn_count))
         else:
-            cls._captured_black_pieces.append((piece_name, turn_count))
+            self._captured_black_pieces.append((piece_name, turn_count))
+        self._material_ledger.record_capture(piece_name, turn_count)
 
-    @classmethod
-    def get_captured_white_pieces(cls):
+    def remove_captured_pieces(self, piece_name, captured_count):
+        """
+        Trims the captured pieces list the piece belongs to back to an earlier length, used when taking back moves
+        :param piece_name: Name of the captured piece, selects the white or black captured pieces list
+        :param captured_count: length the list had before the piece was captured
+        :return: updates the appropriate captured pieces list
+        """
+        captured_pieces = self._captured_white_pieces if piece_name in self._white_pieces else self._captured_black_pieces
+        for piece, _ in captured_pieces[captured_count:]:
+            self._material_ledger.restore_capture(piece)
+        del captured_pieces[captured_count:]
+
+    def get_captured_white_pieces(self):
         """
         :return: a list of tuples containing piece name + turn the piece was captured on
         """
-        return cls._captured_white_pieces
+        return self._captured_white_pieces
 
-    @classmethod
-    def get_captured_black_pieces(cls):
+    def get_captured_black_pieces(self):
         """
         :return: a list of tuples containing piece name + turn the piece was captured on
         """
-        return cls._captured_black_pieces
+        return self._captured_black_pieces
+
+    def get_material_ledger(self):
+        """
+        :return: MaterialLedger counting this game's pieces
+        """
+        return self._material_ledger
 
     @classmethod
     def get_column_mapping(cls):
@@ -112,34 +264,58 @@ class GameManager:
         return cls._row_mapping
 
     @classmethod
-    def set_game_state(cls):
+    def get_square_names(cls):
+        """
+        :return: list of square names indexed by 0-based square index (row * 8 + column), 'A8' is index 0
+        """
+        return cls._square_names
+
+    @classmethod
+    def get_square_index_mapping(cls):
+        """
+        :return: mapping of square names to 0-based square index (row * 8 + column)
+        """
+        return cls._square_indexes
+
+    def set_game_state(self):
         """
         :return: Updates the state of the game based on captured pieces
         """
         game_state = 'UNFINISHED'
-        if any(piece[0] == 'K' for piece in cls._captured_white_pieces):
+        if self._material_ledger.is_king_captured('WHITE'):
             game_state = 'BLACK_WON'
-        if any(piece[0] == 'k' for piece in cls._captured_black_pieces):
+        if self._material_ledger.is_king_captured('BLACK'):
             game_state = 'WHITE_WON'
-        cls._game_state = game_state
+        self._game_state = game_state
 
-    @classmethod
-    def get_game_state(cls):
+    def get_game_state(self):
         """
         :return: 'UNFINISHED', 'WHITE_WON', 'BLACK_WON'
         """
-        return cls._game_state
+        return self._game_state
 
-    @classmethod
-    def reset_game(cls):
+    def restore_turn(self, turn_count, current_player, game_state):
         """
-        :return: resets game everytime a new instance of the game is called
+        Restores the turn information saved before a move, used when taking back moves
+        :param turn_count: turn number to go back to
+        :param current_player: 'WHITE' or 'BLACK'
+        :param game_state: 'UNFINISHED', 'WHITE_WON', 'BLACK_WON'
+        :return: updates turn count, current player and game state
         """
-        cls._current_player = 'WHITE'
-        cls._turn_count = 1
-        cls._captured_white_pieces = []
-        cls._captured_black_pieces = []
-        cls._game_state = 'UNFINISHED'
+        self._turn_count = turn_count
+        self._current_player = current_player
+        self._game_state = game_state
+
+    def reset_game(self):
+        """
+        :return: resets the game back to its starting state
+        """
+        self._current_player = 'WHITE'
+        self._turn_count = 1
+        self._captured_white_pieces = []
+        self._captured_black_pieces = []
+        self._material_ledger.reset()
+        self._game_state = 'UNFINISHED'
 
 
 class Pieces:
@@ -149,10 +325,12 @@ class Pieces:
     The name of the piece and the expected movement of the piece. It does not check if the move can be made
     """
 
-    def __init__(self):
+    def __init__(self, game_manager):
         """
         Initializes variables for row/column mapping and player pieces
+        :param game_manager: GameManager holding the state of the game the pieces belong to
         """
+        self._game_manager = game_manager
         self._columns = GameManager.get_column_mapping()
         self._rows = GameManager.get_row_mapping()
         self._white_pieces = GameManager.get_white_pieces()
@@ -169,8 +347,8 @@ class Pieces:
         """
         # Checking that if there is a piece at the dest_square, that it does not belong to current player
         if (
-                (GameManager.get_current_player() == 'WHITE' and dest_piece.isupper()) or
-                (GameManager.get_current_player() == 'BLACK' and dest_piece.islower())
+                (self._game_manager.get_current_player() == 'WHITE' and dest_piece.isupper()) or
+                (self._game_manager.get_current_player() == 'BLACK' and dest_piece.islower())
         ):
             raise GameError(f"Move cannot be made the {dest_piece} at {dest_square} belongs to you.")
 
@@ -208,7 +386,7 @@ class Pieces:
         dest_row = self._rows[destination[1]]
 
         # Determine the direction based on current player, since rows are mapped in reverse White direction is neg
-        if GameManager.get_current_player() == 'WHITE':
+        if self._game_manager.get_current_player() == 'WHITE':
             direction = -1
         else:
             direction = 1
@@ -218,8 +396,8 @@ class Pieces:
             if dest_row == source_row + direction and dest_piece == '_':
                 return True
             elif (
-                    (GameManager.get_current_player() == 'WHITE' and source_row == 6) or
-                    (GameManager.get_current_player() == 'BLACK' and source_row == 1)
+                    (self._game_manager.get_current_player() == 'WHITE' and source_row == 6) or
+                    (self._game_manager.get_current_player() == 'BLACK' and source_row == 1)
             ):
                 # checking that no piece is in the way
                 if dest_row == source_row + 2 * direction and dest_piece == '_':
@@ -229,8 +407,8 @@ class Pieces:
         if abs(dest_col - source_col) == 1 and dest_row == source_row + direction:
             if dest_piece != '_':
                 if (
-                        (GameManager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
-                        (GameManager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
+                        (self._game_manager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
+                        (self._game_manager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
                 ):
                     return True
         raise GameError("Not a valid Pawn move")
@@ -254,14 +432,14 @@ class Pieces:
         if source_row == dest_row:
             # check piece at destination does not belong to the current player
             if (
-                    (GameManager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
-                    (GameManager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
+                    (self._game_manager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
+                    (self._game_manager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
             ):
                 return True
         elif source_col == dest_col:
             if (
-                    (GameManager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
-                    (GameManager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
+                    (self._game_manager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
+                    (self._game_manager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
             ):
                 return True
         else:
@@ -286,8 +464,8 @@ class Pieces:
         if abs(dest_row - source_row) == abs(dest_col - source_col):
             # check piece at destination does not belong to the current player
             if (
-                    (GameManager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
-                    (GameManager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
+                    (self._game_manager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
+                    (self._game_manager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
             ):
                 return True
         else:
@@ -313,8 +491,8 @@ class Pieces:
 
         if (row_diff == 2 and col_diff == 1) or (row_diff == 1 and col_diff == 2):
             if (
-                    (GameManager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
-                    (GameManager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
+                    (self._game_manager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
+                    (self._game_manager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
             ):
                 return True
         else:
@@ -329,12 +507,18 @@ class Pieces:
         :param dest_piece: Piece at destination
         :return: True if valid move, False otherwise
         """
+        # Row and column mapping for source and destination squares
+        source_col = self._columns[source[0]]
+        source_row = self._rows[source[1]]
+        dest_col = self._columns[destination[0]]
+        dest_row = self._rows[destination[1]]
+
         # Checks if movement is like a rook
-        if self.valid_rook_move(source, destination, dest_piece):
-            return True
+        if source_row == dest_row or source_col == dest_col:
+            return self.valid_rook_move(source, destination, dest_piece)
         # Checks if movement is like a bishop
-        elif self.valid_bishop_move(source, destination, dest_piece):
-            return True
+        elif abs(dest_row - source_row) == abs(dest_col - source_col):
+            return self.valid_bishop_move(source, destination, dest_piece)
         else:
             raise GameError("Not a valid Queen move")
 
@@ -358,8 +542,8 @@ class Pieces:
 
         if row_diff <= 1 and col_diff <= 1:
             if (
-                    (GameManager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
-                    (GameManager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
+                    (self._game_manager.get_current_player() == 'WHITE' and dest_piece not in self._white_pieces) or
+                    (self._game_manager.get_current_player() == 'BLACK' and dest_piece not in self._black_pieces)
             ):
                 return True
         else:
@@ -378,7 +562,7 @@ class Pieces:
         dest_row = self._rows[destination[1]]
 
         # determine the 'forward' direction based on current player
-        if GameManager.get_current_player() == 'WHITE':
+        if self._game_manager.get_current_player() == 'WHITE':
             direction = -1
         else:
             direction = 1
@@ -410,7 +594,7 @@ class Pieces:
         dest_row = self._rows[destination[1]]
 
         # determine the 'forward' direction based on current player
-        if GameManager.get_current_player() == 'WHITE':
+        if self._game_manager.get_current_player() == 'WHITE':
             direction = -1
         else:
             direction = 1
@@ -434,10 +618,16 @@ class PathChecker:
     """
     Checks the path between source and destination squares to determine if the move can be made
     """
-    @staticmethod
-    def get_valid_path(chessboard, source, dest):
+
+    def __init__(self, game_manager):
         """
-        Static Method to determine the type of movement and calls the valid check move method
+        :param game_manager: GameManager holding the state of the game the paths are checked for
+        """
+        self._game_manager = game_manager
+
+    def get_valid_path(self, chessboard, source, dest):
+        """
+        Determines the type of movement and calls the valid check move method
         :param chessboard: chessboard object
         :param source: location we are moving from
         :param dest: location we are moving to
@@ -448,8 +638,8 @@ class PathChecker:
             if chessboard.get_piece(dest) == '_':
                 return True
             elif(
-                    (GameManager.get_current_player() == 'WHITE' and chessboard.get_piece(dest).islower()) or
-                    (GameManager.get_current_player() == 'BLACK' and chessboard.get_piece(dest).isupper())
+                    (self._game_manager.get_current_player() == 'WHITE' and chessboard.get_piece(dest).islower()) or
+                    (self._game_manager.get_current_player() == 'BLACK' and chessboard.get_piece(dest).isupper())
             ):
                 return True
         else:
@@ -461,20 +651,19 @@ class PathChecker:
 
             # Check vertical path
             if source_col == dest_col:
-                return PathChecker.check_vertical(chessboard, source, dest)
+                return self.check_vertical(chessboard, source, dest)
 
             # Check horizontal Path
             if source_row == dest_row:
-                return PathChecker.check_horizontal(chessboard, source, dest)
+                return self.check_horizontal(chessboard, source, dest)
 
             # Check diagonal path
             if abs(dest_col - source_col) == abs(dest_row - source_row):
-                return PathChecker.check_diagonal(chessboard, source, dest)
+                return self.check_diagonal(chessboard, source, dest)
 
-    @staticmethod
-    def check_vertical(chessboard, source, dest):
+    def check_vertical(self, chessboard, source, dest):
         """
-        Checks each row from the source to the destination to check if the path is clear
+        Checks the squares in the column between the source and the destination to check if the path is clear
         :param chessboard: chessboard object
         :param source: square we are moving from
         :param dest: square we are moving to
@@ -482,39 +671,31 @@ class PathChecker:
         """
         dest_row = GameManager.get_row_mapping()[dest[1]]
         src_row = GameManager.get_row_mapping()[source[1]]
-        src_col = GameManager.get_column_mapping()[source[0]]
 
         # if we are only moving one row, check destination is empty or that piece belongs to the opponent
         if abs(dest_row - src_row) == 1:
             if chessboard.get_piece(dest) == '_':
                 return True
             elif(
-                    (GameManager.get_current_player() == 'WHITE' and chessboard.get_piece(dest).islower()) or
-                    (GameManager.get_current_player() == 'BLACK' and chessboard.get_piece(dest).isupper())
+                    (self._game_manager.get_current_player() == 'WHITE' and chessboard.get_piece(dest).islower()) or
+                    (self._game_manager.get_current_player() == 'BLACK' and chessboard.get_piece(dest).isupper())
             ):
                 return True
             else:
                 return False
         else:
-            # Set the movement direction
-            direction = 1 if dest_row > src_row else -1
+            # Any piece on the squares between source and destination blocks the move
+            return not chessboard.get_position().get_occupied() & AttackTables.get_between(
+                GameManager.get_square_index_mapping()[source], GameManager.get_square_index_mapping()[dest])
 
-            # Iterate through each row in the column starting at one after the source row checking for obstructions
-            for row in range(src_row + direction, dest_row, direction):
-                if chessboard.get_board()[row][src_col] != '_':
-                    return False
-            return True
-
-    @staticmethod
-    def check_horizontal(chessboard, source, dest):
+    def check_horizontal(self, chessboard, source, dest):
         """
-        Checks each column from the source to the destination to check if the path is clear
+        Checks the squares in the row between the source and the destination to check if the path is clear
         :param chessboard: chessboard object
         :param source: square we are moving from
         :param dest: square we are moving to
         :return: True if path is clear, False otherwise
         """
-        src_row = GameManager.get_row_mapping()[source[1]]
         src_col = GameManager.get_column_mapping()[source[0]]
         dest_col = GameManager.get_column_mapping()[dest[0]]
 
@@ -523,26 +704,20 @@ class PathChecker:
             if chessboard.get_piece(dest) == '_':
                 return True
             elif(
-                    (GameManager.get_current_player() == 'WHITE' and chessboard.get_piece(dest).islower()) or
-                    (GameManager.get_current_player() == 'BLACK' and chessboard.get_piece(dest).isupper())
+                    (self._game_manager.get_current_player() == 'WHITE' and chessboard.get_piece(dest).islower()) or
+                    (self._game_manager.get_current_player() == 'BLACK' and chessboard.get_piece(dest).isupper())
             ):
                 return True
             else:
                 return False
         else:
-            # Setting movement direction
-            direction = 1 if dest_col > src_col else -1
-
-            # Iterate through each column in the row, starting at one after the source col checking for any obstructions
-            for col in range(src_col + direction, dest_col, direction):
-                if chessboard.get_board()[src_row][col] != '_':
-                    return False
-            return True
+            # Any piece on the squares between source and destination blocks the move
+            return not chessboard.get_position().get_occupied() & AttackTables.get_between(
+                GameManager.get_square_index_mapping()[source], GameManager.get_square_index_mapping()[dest])
 
-    @staticmethod
-    def check_diagonal(chessboard, source, dest):
+    def check_diagonal(self, chessboard, source, dest):
         """
-        Checks the diagonal from the source to the destination to check if the path is clear
+        Checks the squares on the diagonal between the source and the destination to check if the path is clear
         :param chessboard: chessboard object
         :param source: square we are moving from
         :param dest: square we are moving to
@@ -558,24 +733,860 @@ class PathChecker:
             if chessboard.get_piece(dest) == '_':
                 return True
             elif(
-                    (GameManager.get_current_player() == 'WHITE' and chessboard.get_piece(dest).islower()) or
-                    (GameManager.get_current_player() == 'BLACK' and chessboard.get_piece(dest).isupper())
+                    (self._game_manager.get_current_player() == 'WHITE' and chessboard.get_piece(dest).islower()) or
+                    (self._game_manager.get_current_player() == 'BLACK' and chessboard.get_piece(dest).isupper())
             ):
                 return True
             else:
                 return False
         else:
-            # Determine movement direction
-            col_direction = 1 if dest_col > src_col else -1
-            row_direction = 1 if dest_row > src_row else -1
-
-            # Iterate over each diagonal between the source and destination checking for obstructions
-            for diagonal in range(1, abs(dest_col - src_col)):
-                current_col = src_col + diagonal * col_direction
-                current_row = src_row + diagonal * row_direction
-                if chessboard.get_board()[current_row][current_col] != '_':
-                    return False
-            return True
+            # Any piece on the squares between source and destination blocks the move
+            return not chessboard.get_position().get_occupied() & AttackTables.get_between(
+                GameManager.get_square_index_mapping()[source], GameManager.get_square_index_mapping()[dest])
+
+
+class AttackTables:
+    """
+    Precomputed 64-bit attack and ray masks used by the bitboard position
+    Bit n of a mask is square index n (row * 8 + column), so bit 0 is A8 and bit 63 is H1
+    """
+    # Ray directions as (row, column) steps, rows are mapped in reverse so North (towards rank 8) is -1
+    NORTH, SOUTH, EAST, WEST, NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST = range(8)
+    _direction_steps = ((-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1, -1), (1, 1), (1, -1))
+
+    # Square indexes increase along these rays, so the closest blocker is the lowest set bit
+    _increasing_directions = (False, True, True, False, False, False, True, True)
+
+    _full_mask = (1 << 64) - 1
+
+    # Direction sets per piece, Falcons and Hunters depend on which way is forward for the colour
+    _rook_directions = (NORTH, SOUTH, EAST, WEST)
+    _bishop_directions = (NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST)
+    _queen_directions = _rook_directions + _bishop_directions
+    _falcon_directions = {
+        'WHITE': (NORTH_EAST, NORTH_WEST, SOUTH),
+        'BLACK': (SOUTH_EAST, SOUTH_WEST, NORTH),
+    }
+    _hunter_directions = {
+        'WHITE': (NORTH, SOUTH_EAST, SOUTH_WEST),
+        'BLACK': (SOUTH, NORTH_EAST, NORTH_WEST),
+    }
+
+    # Filled in by build()
+    _rays = []
+    _knight_attacks = []
+    _king_attacks = []
+    _pawn_attacks = {}
+    _pawn_pushes = {}
+    _between = []
+    _home_ranks = {}
+    _slider_reach = {}
+
+    @classmethod
+    def build(cls):
+        """
+        Fills in every table, called once when the module is imported
+        :return: None
+        """
+        cls._rays = [[cls._ray_mask(square, step) for square in range(64)] for step in cls._direction_steps]
+        cls._knight_attacks = [
+            cls._step_mask(square, ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)))
+            for square in range(64)
+        ]
+        cls._king_attacks = [cls._step_mask(square, cls._direction_steps) for square in range(64)]
+
+        # Pawns capture diagonally forward and push one square forward, White moves towards row 0
+        cls._pawn_attacks = {
+            'WHITE': [cls._step_mask(square, ((-1, -1), (-1, 1))) for square in range(64)],
+            'BLACK': [cls._step_mask(square, ((1, -1), (1, 1))) for square in range(64)],
+        }
+        cls._pawn_pushes = {
+            'WHITE': [cls._step_mask(square, ((-1, 0),)) for square in range(64)],
+            'BLACK': [cls._step_mask(square, ((1, 0),)) for square in range(64)],
+        }
+
+        # Squares strictly between two squares sharing a column, row or diagonal, 0 otherwise
+        cls._between = [[0] * 64 for _ in range(64)]
+        for source in range(64):
+            for direction in range(8):
+                ray = cls._rays[direction][source]
+                while ray:
+                    dest_bit = ray & -ray if cls._increasing_directions[direction] else 1 << (ray.bit_length() - 1)
+                    dest = dest_bit.bit_length() - 1
+                    cls._between[source][dest] = cls._rays[direction][source] & ~cls._rays[direction][dest] & ~dest_bit
+                    ray ^= dest_bit
+
+        # Fairy pieces may only be entered on the home two ranks
+        cls._home_ranks = {'WHITE': 0xFFFF << 48, 'BLACK': 0xFFFF}
+
+        # Squares each sliding piece reaches on an empty board
+        for piece in 'RBQFHrbqfh':
+            cls._slider_reach[piece] = [
+                cls.slider_attacks(square, cls.get_piece_directions(piece), 0) for square in range(64)
+            ]
+
+    @staticmethod
+    def _step_mask(square, steps):
+        """
+        :param square: square index the piece is on
+        :param steps: (row, column) steps the piece can make
+        :return: mask of the squares reached by one step that stay on the board
+        """
+        row, col = divmod(square, 8)
+        mask = 0
+        for row_step, col_step in steps:
+            if 0 <= row + row_step < 8 and 0 <= col + col_step < 8:
+                mask |= 1 << ((row + row_step) * 8 + col + col_step)
+        return mask
+
+    @staticmethod
+    def _ray_mask(square, step):
+        """
+        :param square: square index the ray starts from
+        :param step: (row, column) step repeated along the ray
+        :return: mask of every square on the ray up to the edge of the board, excluding the start square
+        """
+        row, col = divmod(square, 8)
+        mask = 0
+        row += step[0]
+        col += step[1]
+        while 0 <= row < 8 and 0 <= col < 8:
+            mask |= 1 << (row * 8 + col)
+            row += step[0]
+            col += step[1]
+        return mask
+
+    @classmethod
+    def slider_attacks(cls, square, directions, occupied):
+        """
+        Finds every square a sliding piece reaches, stopping at (and including) the first piece on each ray
+        :param square: square index the piece is on
+        :param directions: ray directions the piece slides along
+        :param occupied: mask of every occupied square
+        :return: mask of attacked squares
+        """
+        rays = cls._rays
+        attacks = 0
+        for direction in directions:
+            ray = rays[direction][square]
+            blockers = ray & occupied
+            if blockers:
+                # Cut the ray off behind the closest blocker
+                if cls._increasing_directions[direction]:
+                    first_blocker = (blockers & -blockers).bit_length() - 1
+                else:
+                    first_blocker = blockers.bit_length() - 1
+                ray ^= rays[direction][first_blocker]
+            attacks |= ray
+        return attacks
+
+    @classmethod
+    def get_piece_directions(cls, piece):
+        """
+        :param piece: name of a sliding piece (R, B, Q, F, H in either case)
+        :return: tuple of ray directions the piece slides along
+        """
+        kind = piece.upper()
+        if kind == 'R':
+            return cls._rook_directions
+        if kind == 'B':
+            return cls._bishop_directions
+        if kind == 'Q':
+            return cls._queen_directions
+        colour = 'WHITE' if piece.isupper() else 'BLACK'
+        if kind == 'F':
+            return cls._falcon_directions[colour]
+        return cls._hunter_directions[colour]
+
+    @classmethod
+    def get_knight_attacks(cls):
+        """
+        :return: list of knight attack masks indexed by square
+        """
+        return cls._knight_attacks
+
+    @classmethod
+    def get_king_attacks(cls):
+        """
+        :return: list of king attack masks indexed by square
+        """
+        return cls._king_attacks
+
+    @classmethod
+    def get_pawn_attacks(cls, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: list of pawn capture masks indexed by square
+        """
+        return cls._pawn_attacks[colour]
+
+    @classmethod
+    def get_pawn_pushes(cls, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: list of single square pawn push masks indexed by square
+        """
+        return cls._pawn_pushes[colour]
+
+    @classmethod
+    def get_between(cls, source, dest):
+        """
+        :param source: square index
+        :param dest: square index
+        :return: mask of squares strictly between source and dest, 0 if they do not share a line
+        """
+        return cls._between[source][dest]
+
+    @classmethod
+    def get_home_ranks(cls, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: mask of the colour's home two ranks
+        """
+        return cls._home_ranks[colour]
+
+    @classmethod
+    def get_full_mask(cls):
+        """
+        :return: mask with all 64 squares set
+        """
+        return cls._full_mask
+
+    @classmethod
+    def get_slider_reach(cls, piece):
+        """
+        :param piece: name of a sliding piece (R, B, Q, F, H in either case)
+        :return: list of masks indexed by square of every square the piece reaches on an empty board
+        """
+        return cls._slider_reach[piece]
+
+
+AttackTables.build()
+
+
+class BitboardPosition:
+    """
+    Bitboard backed piece placement for a chessboard
+    Keeps a 64-bit occupancy mask for each colour, next to the 8x8 board of piece names so
+    single squares can still be read directly. A set of square indexes for every piece name lists where that piece
+    is, so a side's pieces can be visited without scanning the board
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty board and empty masks
+        """
+        self._board = [['_' for _ in range(8)] for _ in range(8)]
+        self._piece_squares = {piece: set() for piece in 'PRNBQKFHprnbqkfh'}
+        self._colour_masks = {'WHITE': 0, 'BLACK': 0}
+
+    def clear(self):
+        """
+        Removes every piece, the board lists are emptied in place so existing references stay valid
+        :return: None
+        """
+        for row in self._board:
+            row[:] = ['_'] * 8
+        for squares in self._piece_squares.values():
+            squares.clear()
+        self._colour_masks['WHITE'] = 0
+        self._colour_masks['BLACK'] = 0
+
+    def put_piece(self, square, piece):
+        """
+        Places a piece on an empty square
+        :param square: square index
+        :param piece: name of the piece
+        :return: None
+        """
+        bit = 1 << square
+        self._board[square >> 3][square & 7] = piece
+        self._piece_squares[piece].add(square)
+        self._colour_masks['WHITE' if piece.isupper() else 'BLACK'] |= bit
+
+    def remove_piece(self, square):
+        """
+        Removes the piece on a square
+        :param square: square index
+        :return: name of the removed piece, '_' if the square was empty
+        """
+        row = self._board[square >> 3]
+        piece = row[square & 7]
+        if piece != '_':
+            bit = 1 << square
+            row[square & 7] = '_'
+            self._piece_squares[piece].discard(square)
+            self._colour_masks['WHITE' if piece.isupper() else 'BLACK'] ^= bit
+        return piece
+
+    def move_piece(self, source, dest):
+        """
+        Moves the piece on source to dest, removing anything already on dest
+        :param source: square index being moved from
+        :param dest: square index being moved to
+        :return: name of the captured piece, '_' if dest was empty
+        """
+        captured_piece = self.remove_piece(dest)
+        self.put_piece(dest, self.remove_piece(source))
+        return captured_piece
+
+    def get_piece_at(self, square):
+        """
+        :param square: square index
+        :return: name of the piece on the square, '_' if empty
+        """
+        return self._board[square >> 3][square & 7]
+
+    def get_piece_squares(self, piece):
+        """
+        :param piece: name of the piece
+        :return: set of the square indexes holding that piece, kept up to date as pieces move so it must not be changed
+        """
+        return self._piece_squares[piece]
+
+    def get_colour_mask(self, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: mask of every square holding one of that colour's pieces
+        """
+        return self._colour_masks[colour]
+
+    def get_occupied(self):
+        """
+        :return: mask of every occupied square
+        """
+        return self._colour_masks['WHITE'] | self._colour_masks['BLACK']
+
+    def get_board(self):
+        return self._board
+
+
+class ZobristKeys:
+    """
+    Random 64-bit keys used to build position hash keys
+    A position's key is the XOR of the keys for every piece on its square, the side to move, every fairy piece already
+    entered and every side that has unlocked fairy piece entry. The keys come from a fixed seed so hash keys are the
+    same in every process and can be stored in files
+    """
+    _seed = 0x46484348
+    _piece_keys = {}
+    _side_key = 0
+    _fairy_keys = {}
+    _unlock_keys = {}
+
+    @classmethod
+    def build(cls):
+        """
+        Fills in every key, called once when the module is imported
+        :return: None
+        """
+        generator = random.Random(cls._seed)
+        cls._piece_keys = {piece: [generator.getrandbits(64) for _ in range(64)] for piece in 'PRNBQKFHprnbqkfh'}
+        cls._side_key = generator.getrandbits(64)
+        cls._fairy_keys = {piece: generator.getrandbits(64) for piece in 'FHfh'}
+        cls._unlock_keys = {colour: generator.getrandbits(64) for colour in ('WHITE', 'BLACK')}
+
+    @classmethod
+    def get_piece_keys(cls):
+        """
+        :return: mapping of piece name to a list of keys indexed by square
+        """
+        return cls._piece_keys
+
+    @classmethod
+    def get_side_key(cls):
+        """
+        :return: key included when it is the Black players turn
+        """
+        return cls._side_key
+
+    @classmethod
+    def get_fairy_keys(cls):
+        """
+        :return: mapping of fairy piece name to the key included once it has been entered
+        """
+        return cls._fairy_keys
+
+    @classmethod
+    def get_unlock_keys(cls):
+        """
+        :return: mapping of 'WHITE'/'BLACK' to the key included once that side may enter fairy pieces
+        """
+        return cls._unlock_keys
+
+
+ZobristKeys.build()
+
+
+class MoveGenerator:
+    """
+    Generates every legal move for the side to move in a single pass over the bitboards
+    Moves use the same notation the chessboard accepts:
+    Regular moves are (source, destination) tuples, for example ('E2', 'E4')
+    Fairy piece entries are (piece name, entry square) tuples, for example ('F', 'E2') or ('h', 'D7')
+    """
+
+    @staticmethod
+    def generate_moves(chessboard, captures_only=False):
+        """
+        Lists every move the current player could make, matching what set_piece and set_fairy_piece allow
+        :param chessboard: chessboard object
+        :param captures_only: True to list only moves capturing an opponent's piece, without fairy piece entries
+        :return: list of (source, destination) tuples, empty once the game is over
+        """
+        game_manager = chessboard.get_game_manager()
+        if game_manager.get_game_state() != 'UNFINISHED':
+            return []
+
+        position = chessboard.get_position()
+        names = GameManager.get_square_names()
+        current_player = game_manager.get_current_player()
+        if current_player == 'WHITE':
+            own_pieces = 'PNKRBQFH'
+            opponent = 'BLACK'
+            pawn_step = -8
+            pawn_rank = 0xFF << 48
+        else:
+            own_pieces = 'pnkrbqfh'
+            opponent = 'WHITE'
+            pawn_step = 8
+            pawn_rank = 0xFF << 8
+
+        own_mask = position.get_colour_mask(current_player)
+        opponent_mask = position.get_colour_mask(opponent)
+        occupied = own_mask | opponent_mask
+        empty = AttackTables.get_full_mask() ^ occupied
+        targets_mask = opponent_mask if captures_only else AttackTables.get_full_mask() ^ own_mask
+
+        moves = []
+        for piece in own_pieces:
+            piece_squares = position.get_piece_squares(piece)
+            if not piece_squares:
+                continue
+            kind = piece.upper()
+            if kind == 'P':
+                pushes = AttackTables.get_pawn_pushes(current_player)
+                captures = AttackTables.get_pawn_attacks(current_player)
+            elif kind == 'N':
+                attacks = AttackTables.get_knight_attacks()
+            elif kind == 'K':
+                attacks = AttackTables.get_king_attacks()
+            else:
+                directions = AttackTables.get_piece_directions(piece)
+
+            for source in piece_squares:
+                if kind == 'P':
+                    # Forward pushes need empty squares, the double push also needs the square it passes over
+                    targets = 0 if captures_only else pushes[source] & empty
+                    if targets and pawn_rank >> source & 1 and empty >> (source + 2 * pawn_step) & 1:
+                        targets |= 1 << (source + 2 * pawn_step)
+                    # Diagonal captures need an opponent's piece
+                    targets |= captures[source] & opponent_mask
+                elif kind == 'N' or kind == 'K':
+                    targets = attacks[source] & targets_mask
+                else:
+                    # Sliders stop at the first piece on each ray, opponent's pieces can be captured
+                    targets = AttackTables.slider_attacks(source, directions, occupied) & targets_mask
+
+                source_name = names[source]
+                while targets:
+                    target_bit = targets & -targets
+                    targets ^= target_bit
+                    moves.append((source_name, names[target_bit.bit_length() - 1]))
+
+        if not captures_only:
+            moves.extend(MoveGenerator.generate_fairy_entries(chessboard))
+        return moves
+
+    @staticmethod
+    def is_legal(chessboard, move):
+        """
+        Checks a single move without raising exceptions or building error messages, for hot paths like bots
+        :param chessboard: chessboard object
+        :param move: (source, destination) tuple, or (fairy piece, entry square) tuple
+        :return: True if the current player can make the move
+        """
+        return MoveGenerator.check_move(chessboard, move) == MoveStatus.LEGAL
+
+    @staticmethod
+    def check_move(chessboard, move):
+        """
+        Checks a single move using only mask lookups, agreeing with set_piece / set_fairy_piece and generate_moves
+        :param chessboard: chessboard object
+        :param move: (source, destination) tuple, or (fairy piece, entry square) tuple
+        :return: MoveStatus.LEGAL, or the MoveStatus reason the move is rejected
+        """
+        game_manager = chessboard.get_game_manager()
+        if game_manager.get_game_state() != 'UNFINISHED':
+            return MoveStatus.GAME_OVER
+
+        source, destination = move
+        square_indexes = GameManager.get_square_index_mapping()
+        dest = square_indexes.get(destination)
+        if dest is None:
+            return MoveStatus.OFF_BOARD
+
+        position = chessboard.get_position()
+        current_player = game_manager.get_current_player()
+        occupied = position.get_occupied()
+
+        # Fairy piece entries
+        if len(source) == 1:
+            if source not in 'FHfh':
+                return MoveStatus.NOT_A_FAIRY_PIECE
+            if source.isupper() != (current_player == 'WHITE'):
+                return MoveStatus.FAIRY_PIECE_NOT_YOURS
+            if source in chessboard.get_entered_fairy_pieces():
+                return MoveStatus.FAIRY_PIECE_ALREADY_ENTERED
+            if not AttackTables.get_home_ranks(current_player) >> dest & 1 or occupied >> dest & 1:
+                return MoveStatus.FAIRY_ENTRY_SQUARE
+            if not chessboard.get_enterable_fairy_pieces():
+                return MoveStatus.FAIRY_ENTRY_LOCKED
+            return MoveStatus.LEGAL
+
+        src = square_indexes.get(source)
+        if src is None:
+            return MoveStatus.OFF_BOARD
+        piece = position.get_piece_at(src)
+        if piece == '_':
+            return MoveStatus.NO_PIECE
+        own_mask = position.get_colour_mask(current_player)
+        if not own_mask >> src & 1:
+            return MoveStatus.OPPONENTS_PIECE
+        if own_mask >> dest & 1:
+            return MoveStatus.OWN_PIECE_AT_DESTINATION
+
+        if piece == 'P' or piece == 'p':
+            # Pushes need an empty destination, the double push an empty square in between, captures an opponent
+            pawn_step = -8 if current_player == 'WHITE' else 8
+            if dest == src + pawn_step:
+                return MoveStatus.INVALID_PIECE_MOVE if occupied >> dest & 1 else MoveStatus.LEGAL
+            if dest == src + 2 * pawn_step and (src >> 3) == (6 if current_player == 'WHITE' else 1):
+                if occupied >> dest & 1:
+                    return MoveStatus.INVALID_PIECE_MOVE
+                return MoveStatus.PATH_BLOCKED if occupied >> (src + pawn_step) & 1 else MoveStatus.LEGAL
+            if AttackTables.get_pawn_attacks(current_player)[src] >> dest & 1 and occupied >> dest & 1:
+                return MoveStatus.LEGAL
+            return MoveStatus.INVALID_PIECE_MOVE
+
+        if piece == 'N' or piece == 'n':
+            return MoveStatus.LEGAL if AttackTables.get_knight_attacks()[src] >> dest & 1 \
+                else MoveStatus.INVALID_PIECE_MOVE
+        if piece == 'K' or piece == 'k':
+            return MoveStatus.LEGAL if AttackTables.get_king_attacks()[src] >> dest & 1 \
+                else MoveStatus.INVALID_PIECE_MOVE
+
+        # Sliding pieces need the destination on one of their rays and nothing in between
+        if not AttackTables.get_slider_reach(piece)[src] >> dest & 1:
+            return MoveStatus.INVALID_PIECE_MOVE
+        if occupied & AttackTables.get_between(src, dest):
+            return MoveStatus.PATH_BLOCKED
+        return MoveStatus.LEGAL
+
+    @staticmethod
+    def generate_fairy_entries(chessboard):
+        """
+        Lists every fairy piece entry the current player could make
+        :param chessboard: chessboard object
+        :return: list of (piece name, entry square) tuples
+        """
+        fairy_pieces = chessboard.get_enterable_fairy_pieces()
+        if not fairy_pieces:
+            return []
+
+        position = chessboard.get_position()
+        names = GameManager.get_square_names()
+        home_ranks = AttackTables.get_home_ranks(chessboard.get_game_manager().get_current_player())
+        empty_squares = home_ranks & ~position.get_occupied()
+
+        entries = []
+        for fairy_piece in fairy_pieces:
+            squares = empty_squares
+            while squares:
+                square_bit = squares & -squares
+                squares ^= square_bit
+                entries.append((fairy_piece, names[square_bit.bit_length() - 1]))
+        return entries
+
+
+class MoveCodec:
+    """
+    Packs moves into 16-bit integers for compact storage
+    Bits 0-5 hold the source square index, bits 6-11 the destination square index and bits 12-14 the fairy piece
+    being entered (1-4 for F, H, f, h), with a source of 0 for entries. Code 0 is never a legal move and means no move
+    """
+    _fairy_codes = {'F': 1, 'H': 2, 'f': 3, 'h': 4}
+    _fairy_pieces = ['', 'F', 'H', 'f', 'h']
+
+    @classmethod
+    def encode_move(cls, move):
+        """
+        :param move: (source, destination) tuple, or (fairy piece, entry square) tuple
+        :return: 16-bit move code
+        """
+        source, destination = move
+        square_indexes = GameManager.get_square_index_mapping()
+        if len(source) == 1:
+            return square_indexes[destination] << 6 | cls._fairy_codes[source] << 12
+        return square_indexes[source] | square_indexes[destination] << 6
+
+    @classmethod
+    def decode_move(cls, code):
+        """
+        :param code: 16-bit move code
+        :return: (source, destination) tuple, or (fairy piece, entry square) tuple, None for code 0
+        """
+        if not code:
+            return None
+        names = GameManager.get_square_names()
+        fairy_code = code >> 12
+        if fairy_code:
+            return cls._fairy_pieces[fairy_code], names[code >> 6 & 63]
+        return names[code & 63], names[code >> 6 & 63]
+
+
+class PositionNotation:
+    """
+    Saves and loads positions as text or as fixed-size binary records
+    The text form extends FEN with fields for the fairy pieces still in reserve and the sides allowed to enter them:
+    <placement> <side to move> <reserve> <entry unlocked> <turn>, the starting position is
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w FHfh - 1'. Placement lists ranks 8 to 1 as in FEN, the reserve
+    lists the fairy pieces not yet entered, entry unlocked is 'W', 'B', 'WB' or '-' and the turn is the turn count,
+    which goes up by one every move
+    The binary form is 32 bytes: the occupancy mask (8 bytes), a 4-bit piece code per occupied square in square order
+    (18 bytes, room for all 36 pieces), a flags byte for the side to move, entered fairy pieces and unlocked sides, the
+    turn count (2 bytes) and 3 bytes of padding
+    Parsed positions are (placement, current player, turn count, entered fairy pieces, unlocked sides) tuples, with
+    placement a list of 64 piece names indexed by square, that load copies onto a chessboard
+    """
+    _pieces = 'PRNBQKFHprnbqkfh'
+    _piece_codes = {piece: code for code, piece in enumerate(_pieces)}
+    _record = struct.Struct('<Q18sBH3x')
+    _black_to_move_flag = 1
+    _fairy_flags = {'F': 2, 'H': 4, 'f': 8, 'h': 16}
+    _unlock_flags = {'WHITE': 32, 'BLACK': 64}
+    _unlock_letters = {'WHITE': 'W', 'BLACK': 'B'}
+
+    @classmethod
+    def get_record_size(cls):
+        """
+        :return: number of bytes in a binary position record
+        """
+        return cls._record.size
+
+    @classmethod
+    def get_piece_order(cls):
+        """
+        :return: piece names in the order of their 4-bit codes in a binary position record
+        """
+        return cls._pieces
+
+    @classmethod
+    def get_flag_bits(cls):
+        """
+        :return: mapping of 'BLACK_TO_MOVE', entered fairy piece name and unlocked colour to its bit in the flags byte
+        """
+        return {'BLACK_TO_MOVE': cls._black_to_move_flag, **cls._fairy_flags, **cls._unlock_flags}
+
+    @classmethod
+    def parse_move(cls, text):
+        """
+        Reads a move in the notation players type, e.g. 'e2, e4', or 'F, e2' to enter a fairy piece
+        :param text: move text
+        :return: (source, destination) tuple with uppercase squares, fairy piece names keep their case
+        """
+        squares = text.split(',')
+        if len(squares) != 2:
+            raise GameError(f"A move needs a source and a destination separated by a comma: {text.strip()}")
+        source = squares[0].strip()
+        destination = squares[1].strip().upper()
+        # Fairy piece names keep their case, it decides whose piece is entered
+        if len(source) != 1:
+            source = source.upper()
+        elif source not in cls._fairy_flags:
+            raise GameError(f"{source} is not one of the valid fairy pieces (F/H for white, f/h for black)")
+        return source, destination
+
+    @classmethod
+    def parse_moves(cls, text):
+        """
+        :param text: moves separated by ';', e.g. 'e2, e4; e7, e5'
+        :return: list of (source, destination) tuples, see parse_move
+        """
+        return [cls.parse_move(move_text) for move_text in text.split(';') if move_text.strip()]
+
+    @classmethod
+    def to_text(cls, chessboard):
+        """
+        :param chessboard: chessboard object
+        :return: text form of the chessboard's position
+        """
+        ranks = []
+        for row in chessboard.get_board():
+            rank = ''
+            empty = 0
+            for piece in row:
+                if piece == '_':
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += piece
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+
+        game_manager = chessboard.get_game_manager()
+        side = 'w' if game_manager.get_current_player() == 'WHITE' else 'b'
+        entered_fairy_pieces = chessboard.get_entered_fairy_pieces()
+        reserve = ''.join(piece for piece in 'FHfh' if piece not in entered_fairy_pieces) or '-'
+        unlocked = ''.join(letter for colour, letter in cls._unlock_letters.items()
+                           if chessboard.is_fairy_entry_unlocked(colour)) or '-'
+        return f"{'/'.join(ranks)} {side} {reserve} {unlocked} {game_manager.get_turn_count()}"
+
+    @classmethod
+    def parse_text(cls, text):
+        """
+        :param text: text form of a position
+        :return: parsed position tuple
+        """
+        fields = text.split()
+        if len(fields) != 5:
+            raise GameError(f"A position needs 5 fields: placement, side, reserve, entry unlocked and turn: {text}")
+        placement_text, side, reserve, unlocked_text, turn_text = fields
+
+        ranks = placement_text.split('/')
+        if len(ranks) != 8:
+            raise GameError(f"The placement needs 8 ranks: {placement_text}")
+        placement = []
+        for rank in ranks:
+            rank_start = len(placement)
+            for character in rank:
+                if character in '12345678':
+                    placement.extend('_' * int(character))
+                elif character in cls._piece_codes:
+                    placement.append(character)
+                else:
+                    raise GameError(f"{character} is not a piece name")
+            if len(placement) - rank_start != 8:
+                raise GameError(f"The rank {rank} does not have 8 squares")
+
+        if side not in ('w', 'b'):
+            raise GameError(f"The side to move must be 'w' or 'b', not {side}")
+        if reserve != '-' and any(piece not in 'FHfh' for piece in reserve):
+            raise GameError(f"The reserve can only hold the fairy pieces F, H, f and h, not {reserve}")
+        if unlocked_text != '-' and any(letter not in 'WB' for letter in unlocked_text):
+            raise GameError(f"Entry unlocked must be 'W', 'B', 'WB' or '-', not {unlocked_text}")
+        if not turn_text.isdigit():
+            raise GameError(f"The turn must be a number, not {turn_text}")
+
+        entered_fairy_pieces = [piece for piece in 'FHfh' if piece not in reserve]
+        unlocked = {colour for colour, letter in cls._unlock_letters.items() if letter in unlocked_text}
+        return placement, 'WHITE' if side == 'w' else 'BLACK', int(turn_text), entered_fairy_pieces, unlocked
+
+    @classmethod
+    def to_bytes(cls, chessboard):
+        """
+        :param chessboard: chessboard object
+        :return: binary record of the chessboard's position
+        """
+        position = chessboard.get_position()
+        occupied = position.get_occupied()
+        codes = 0
+        shift = 0
+        remaining = occupied
+        while remaining:
+            bit = remaining & -remaining
+            codes |= cls._piece_codes[position.get_piece_at(bit.bit_length() - 1)] << shift
+            shift += 4
+            remaining ^= bit
+
+        game_manager = chessboard.get_game_manager()
+        flags = cls._black_to_move_flag if game_manager.get_current_player() == 'BLACK' else 0
+        for piece in chessboard.get_entered_fairy_pieces():
+            flags |= cls._fairy_flags[piece]
+        for colour, flag in cls._unlock_flags.items():
+            if chessboard.is_fairy_entry_unlocked(colour):
+                flags |= flag
+        if game_manager.get_turn_count() > 0xFFFF:
+            raise GameError(f"Turn {game_manager.get_turn_count()} is too large for a binary position record")
+        return cls._record.pack(occupied, codes.to_bytes(18, 'little'), flags, game_manager.get_turn_count())
+
+    @classmethod
+    def parse_bytes(cls, data):
+        """
+        :param data: binary position record
+        :return: parsed position tuple
+        """
+        return cls._decode_record(cls._record.unpack(data))
+
+    @classmethod
+    def iter_bytes(cls, buffer):
+        """
+        Parses back to back binary records, for example the contents of a file of positions
+        :param buffer: bytes-like object holding a whole number of records
+        :return: generator of parsed position tuples
+        """
+        for record in cls._record.iter_unpack(buffer):
+            yield cls._decode_record(record)
+
+    @classmethod
+    def _decode_record(cls, record):
+        """
+        :param record: unpacked fields of a binary position record
+        :return: parsed position tuple
+        """
+        occupied, code_bytes, flags, turn_count = record
+        codes = int.from_bytes(code_bytes, 'little')
+        placement = ['_'] * 64
+        while occupied:
+            bit = occupied & -occupied
+            placement[bit.bit_length() - 1] = cls._pieces[codes & 15]
+            codes >>= 4
+            occupied ^= bit
+
+        current_player = 'BLACK' if flags & cls._black_to_move_flag else 'WHITE'
+        entered_fairy_pieces = [piece for piece, flag in cls._fairy_flags.items() if flags & flag]
+        unlocked = {colour for colour, flag in cls._unlock_flags.items() if flags & flag}
+        return placement, current_player, turn_count, entered_fairy_pieces, unlocked
+
+    @classmethod
+    def load(cls, parsed_position, chessboard=None):
+        """
+        Sets up a parsed position, reusing a chessboard saves building a new one for every position
+        :param parsed_position: tuple from parse_text, parse_bytes or iter_bytes
+        :param chessboard: chessboard to set up, a new one is created if not given
+        :return: chessboard holding the position
+        """
+        placement, current_player, turn_count, entered_fairy_pieces, unlocked = parsed_position
+        if chessboard is None:
+            chessboard = Chessboard()
+        chessboard.load_position(placement, current_player, turn_count, entered_fairy_pieces)
+
+        # Entry is unlocked exactly when a Queen, Rook, Knight or Bishop is missing from the board
+        for colour in cls._unlock_letters:
+            if chessboard.is_fairy_entry_unlocked(colour) != (colour in unlocked):
+                raise GameError(f"Fairy piece entry for {colour} does not match the pieces missing from the board")
+        return chessboard
+
+    @classmethod
+    def from_text(cls, text, chessboard=None):
+        """
+        :param text: text form of a position
+        :param chessboard: chessboard to set up, a new one is created if not given
+        :return: chessboard holding the position
+        """
+        return cls.load(cls.parse_text(text), chessboard)
+
+    @classmethod
+    def from_bytes(cls, data, chessboard=None):
+        """
+        :param data: binary position record
+        :param chessboard: chessboard to set up, a new one is created if not given
+        :return: chessboard holding the position
+        """
+        return cls.load(cls.parse_bytes(data), chessboard)
 
 
 class Chessboard:
@@ -585,14 +1596,19 @@ class Chessboard:
     It should also check if a fairy piece can be entered onto the board
     """
 
-    def __init__(self):
+    def __init__(self, game_manager=None):
         """
         Initializes instance of the pieces class
         Initialize variables necessary for method implementation
         Initializes and empty list to keep track of fairy pieces
+        :param game_manager: GameManager holding the state of this board's game, a new game is started if not given
         """
-        # Initializes instance of pieces class
-        self._pieces = Pieces()
+        # Per-game state, shared with the pieces and path checker of this board only
+        self._game_manager = game_manager if game_manager is not None else GameManager()
+
+        # Initializes instance of pieces and path checker classes
+        self._pieces = Pieces(self._game_manager)
+        self._path_checker = PathChecker(self._game_manager)
 
         # Get row and column mappings from game manager
         self._columns = GameManager.get_column_mapping()
@@ -602,12 +1618,15 @@ class Chessboard:
         self._white_pieces = GameManager.get_white_pieces()
         self._black_pieces = GameManager.get_black_pieces()
 
-        # Initialize empty list to keep track of entered fairy pieces and checked required pieces
+        # Initialize empty list to keep track of entered fairy pieces
         self._entered_fairy_pieces = []
-        self._checked_pieces = []
 
-        # Initializes the chessboard as an empty 2D list and calls the filling method
-        self._board = [['_' for _ in range(8)] for _ in range(8)]
+        # Stack of undo entries, one per move made
+        self._undo_stack = []
+
+        # Initializes the bitboard position backing the chessboard, _board is the position's 2D list of piece names
+        self._position = BitboardPosition()
+        self._board = self._position.get_board()
         self.initialize_board()
 
     def initialize_board(self):
@@ -617,17 +1636,74 @@ class Chessboard:
         Black Player pieces are lowercase
         :return: starting chessboard
         """
-        # Black pieces
-        self._board[0] = ['r', 'n', 'b', 'q', 'k', 'b', 'n', 'r']
-        self._board[1] = ['p'] * 8
-
-        # White pieces
-        self._board[6] = ['P'] * 8
-        self._board[7] = ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']
+        self._position.clear()
+        back_rank = ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']
+        for col in range(8):
+            # Black pieces
+            self._position.put_piece(col, back_rank[col].lower())
+            self._position.put_piece(8 + col, 'p')
+
+            # White pieces
+            self._position.put_piece(48 + col, 'P')
+            self._position.put_piece(56 + col, back_rank[col])
+
+        self._hash_key = self.compute_hash_key()
+
+    def load_position(self, placement, current_player, turn_count, entered_fairy_pieces):
+        """
+        Sets up an arbitrary position and clears the move history, see PositionNotation for reading positions
+        Pieces missing from the starting set are recorded as captured on turn 0, so a side missing a Queen, Rook,
+        Knight or Bishop may enter fairy pieces. An entered fairy piece that is not on the board was captured
+        :param placement: list of 64 piece names indexed by square index, '_' for an empty square
+        :param current_player: 'WHITE' or 'BLACK', White moves on odd turns
+        :param turn_count: turn number of the position
+        :param entered_fairy_pieces: fairy pieces already entered onto the board
+        :return: None
+        """
+        if len(placement) != 64:
+            raise GameError("A position needs a piece name or '_' for each of the 64 squares")
+        if turn_count < 1 or current_player != ('WHITE' if turn_count % 2 == 1 else 'BLACK'):
+            raise GameError(f"It cannot be the {current_player} players turn on turn {turn_count}")
+
+        # Counting the pieces on the board to find the captured ones
+        counts = {}
+        for piece in placement:
+            counts[piece] = counts.get(piece, 0) + 1
+        for piece in counts:
+            if piece != '_' and piece not in self._white_pieces and piece not in self._black_pieces:
+                raise GameError(f"{piece} is not a piece name")
+
+        captured_pieces = []
+        for piece in 'PRNBQKprnbqkFHfh':
+            if piece in 'FHfh':
+                starting_count = 1 if piece in entered_fairy_pieces else 0
+            else:
+                starting_count = MaterialLedger.get_starting_counts()[piece]
+            if counts.get(piece, 0) > starting_count:
+                raise GameError(f"There are more of the piece {piece} on the board than the game allows")
+            captured_pieces.extend([piece] * (starting_count - counts.get(piece, 0)))
+
+        self._position.clear()
+        for square, piece in enumerate(placement):
+            if piece != '_':
+                self._position.put_piece(square, piece)
+        self._entered_fairy_pieces[:] = entered_fairy_pieces
+        self._undo_stack.clear()
+
+        self._game_manager.reset_game()
+        self._game_manager.restore_turn(turn_count, current_player, 'UNFINISHED')
+        material_ledger = self._game_manager.get_material_ledger()
+        for fairy_piece in entered_fairy_pieces:
+            material_ledger.record_entry(fairy_piece)
+        for piece in captured_pieces:
+            self._game_manager.set_captured_pieces(piece, 0)
+        self._game_manager.set_game_state()
+
+        self._hash_key = self.compute_hash_key()
 
     def set_piece(self, source, destination):
         """
-        Attempts to move a piece on the chessboard and if the move is a valid move, updates the board
+        Attempts to move a piece on the chessboard and if the move is a valid move, updates the board and passes the turn
         :param source: Square we are moving from
         :param destination: Square we are moving to
         :return: updated move on the chessboard if possible, false otherwise
@@ -638,7 +1714,7 @@ class Chessboard:
 
         source_piece = self.get_piece(source)
         dest_piece = self.get_piece(destination)
-        current_player = GameManager.get_current_player()
+        current_player = self._game_manager.get_current_player()
 
         # Validation test 2 - If the source piece is '_' we aren't making a valid move
         if source_piece == '_':
@@ -655,37 +1731,26 @@ class Chessboard:
         self._pieces.get_valid_move(source_piece, dest_piece, source, destination)
 
         # Validation test 5 - Checking that there is no obstructions in the path
-        if not PathChecker.get_valid_path(self, source, destination):
+        if not self._path_checker.get_valid_path(self, source, destination):
             raise GameError("Move cannot be made, a piece is in the way")
 
-        # splitting the source and destination into columns and rows for move indexing
-        source_col = GameManager.get_column_mapping()[source[0]]
-        source_row = self._rows[source[1]]
-        dest_col = self._columns[destination[0]]
-        dest_row = self._rows[destination[1]]
-
-        # Setting the source to '_', updating captured pieces list, and moving piece into the destination
-        self._board[source_row][source_col] = '_'
-        if dest_piece != '_':
-            GameManager.set_captured_pieces(dest_piece, GameManager.get_turn_count())
-
-        self._board[dest_row][dest_col] = source_piece
+        # Moving the piece into the destination, updating captured pieces list and passing the turn
+        self.make_move((source, destination))
 
         return True
 
     def set_fairy_piece(self, fairy_piece, destination):
         """
-        Attempts to enter a fairy piece onto the chessboard
+        Attempts to enter a fairy piece onto the chessboard, passing the turn if it was entered
         :param fairy_piece: name of piece being entered
         :param destination: location on chessboard the piece is being placed onto
         :return: Sets fairy piece on the chessboard if possible, False otherwise
         """
         # Current player information
-        current_player = GameManager.get_current_player()
-
-        # Setting required captured piece list
-        required_pieces = ['Q', 'R', 'N', 'B'] if current_player == 'WHITE' else ['q', 'r', 'n', 'b']
+        current_player = self._game_manager.get_current_player()
 
+        # Entry needs a Queen, Rook, Knight or Bishop lost on an earlier turn, looked up in the material ledger
+        material_ledger = self._game_manager.get_material_ledger()
 
         # Ensure square we are place the fairy piece at is on the chessboard
         if not self.valid_square(destination):
@@ -706,28 +1771,203 @@ class Chessboard:
             else:
                 if current_player == 'WHITE':
                     if row in [6, 7] and self.get_piece(destination) == '_':
-                        for required_piece in required_pieces:
-                            for piece, turn_count in GameManager.get_captured_white_pieces():
-                                if piece == required_piece and turn_count < GameManager.get_turn_count():
-                                    self._entered_fairy_pieces.append(fairy_piece)
-                                    self._board[row][col] = fairy_piece
-                                    return True
+                        if material_ledger.is_entry_unlocked('WHITE', self._game_manager.get_turn_count()):
+                            self.make_move((fairy_piece, destination))
+                            return True
                     else:
                         raise GameError(f"Fairy pieces can only be entered on a blank square in your home two ranks")
                 else:
                     if row in [0, 1] and self.get_piece(destination) == '_':
-                        for required_piece in required_pieces:
-                            for piece, turn_count in GameManager.get_captured_black_pieces():
-                                if piece == required_piece and turn_count < GameManager.get_turn_count():
-
-                                    self._entered_fairy_pieces.append(fairy_piece)
-                                    self._board[row][col] = fairy_piece
-                                    return True
+                        if material_ledger.is_entry_unlocked('BLACK', self._game_manager.get_turn_count()):
+                            self.make_move((fairy_piece, destination))
+                            return True
                     else:
                         raise GameError(f"Fairy pieces can only be entered on a blank square in your home two ranks")
         else:
             raise GameError(f"The fairy piece {fairy_piece} does not belong to you!")
 
+    def make_move(self, move):
+        """
+        Makes a move without validating it and records an undo entry, moves should come from generate_moves
+        Passes the turn to the other player and updates the game state when a piece is captured
+        :param move: (source, destination) tuple, or (fairy piece, entry square) tuple for a fairy piece entry
+        :return: None
+        """
+        source, destination = move
+        square_indexes = GameManager.get_square_index_mapping()
+        piece_keys = ZobristKeys.get_piece_keys()
+        dest = square_indexes[destination]
+        turn_count = self._game_manager.get_turn_count()
+        entered_count = len(self._entered_fairy_pieces)
+        captured_piece = '_'
+        captured_count = 0
+        hash_key = self._hash_key ^ ZobristKeys.get_side_key()
+
+        if len(source) == 1:
+            # Fairy piece entry, the entered list length is enough to undo it
+            self._position.put_piece(dest, source)
+            self._entered_fairy_pieces.append(source)
+            self._game_manager.get_material_ledger().record_entry(source)
+            hash_key ^= piece_keys[source][dest] ^ ZobristKeys.get_fairy_keys()[source]
+        else:
+            source_index = square_indexes[source]
+            moved_piece = self._position.get_piece_at(source_index)
+            captured_piece = self._position.move_piece(source_index, dest)
+            hash_key ^= piece_keys[moved_piece][source_index] ^ piece_keys[moved_piece][dest]
+            if captured_piece != '_':
+                if captured_piece in self._white_pieces:
+                    captured_colour = 'WHITE'
+                    captured_count = len(self._game_manager.get_captured_white_pieces())
+                else:
+                    captured_colour = 'BLACK'
+                    captured_count = len(self._game_manager.get_captured_black_pieces())
+                self._game_manager.set_captured_pieces(captured_piece, turn_count)
+                hash_key ^= piece_keys[captured_piece][dest]
+
+                # The first Queen, Rook, Knight or Bishop lost unlocks fairy piece entry for that side
+                if (captured_piece in 'QRNBqrnb' and
+                        self._game_manager.get_material_ledger().get_unlock_turn(captured_colour) == turn_count):
+                    hash_key ^= ZobristKeys.get_unlock_keys()[captured_colour]
+
+        # Undo entry: move, captured piece, captured list length, fairy entry state, turn, player, game state and key
+        self._undo_stack.append((
+            move, captured_piece, captured_count, entered_count,
+            turn_count, self._game_manager.get_current_player(), self._game_manager.get_game_state(), self._hash_key
+        ))
+        self._hash_key = hash_key
+
+        self._game_manager.set_turn_count()
+        self._game_manager.set_current_player()
+        if captured_piece != '_':
+            self._game_manager.set_game_state()
+
+    def unmake_move(self):
+        """
+        Takes back the last move made, restoring the board, captured pieces, fairy pieces and turn information
+        :return: the move that was taken back
+        """
+        if not self._undo_stack:
+            raise GameError("There are no moves to take back")
+
+        (move, captured_piece, captured_count, entered_count,
+         turn_count, current_player, game_state, self._hash_key) = self._undo_stack.pop()
+        source, destination = move
+        square_indexes = GameManager.get_square_index_mapping()
+        dest = square_indexes[destination]
+
+        if len(source) == 1:
+            self._position.remove_piece(dest)
+            del self._entered_fairy_pieces[entered_count:]
+            self._game_manager.get_material_ledger().restore_entry(source)
+        else:
+            self._position.move_piece(dest, square_indexes[source])
+            if captured_piece != '_':
+                self._position.put_piece(dest, captured_piece)
+                self._game_manager.remove_captured_pieces(captured_piece, captured_count)
+
+        self._game_manager.restore_turn(turn_count, current_player, game_state)
+        return move
+
+    def compute_hash_key(self):
+        """
+        Builds the position hash key from scratch by scanning the board, make_move and unmake_move keep the stored
+        key up to date incrementally so this is only needed when a board is set up
+        :return: 64-bit position hash key
+        """
+        piece_keys = ZobristKeys.get_piece_keys()
+        hash_key = 0
+        for piece, keys in piece_keys.items():
+            for square in self._position.get_piece_squares(piece):
+                hash_key ^= keys[square]
+        if self._game_manager.get_current_player() == 'BLACK':
+            hash_key ^= ZobristKeys.get_side_key()
+        for fairy_piece in self._entered_fairy_pieces:
+            hash_key ^= ZobristKeys.get_fairy_keys()[fairy_piece]
+        for colour in ('WHITE', 'BLACK'):
+            if self.is_fairy_entry_unlocked(colour):
+                hash_key ^= ZobristKeys.get_unlock_keys()[colour]
+        return hash_key
+
+    def get_hash_key(self):
+        """
+        :return: 64-bit hash key of the current position, covering piece placement, side to move and fairy piece
+        entry state
+        """
+        return self._hash_key
+
+    def get_move_history(self):
+        """
+        :return: list of moves made so far that can be taken back, oldest first
+        """
+        return [entry[0] for entry in self._undo_stack]
+
+    def get_entered_fairy_pieces(self):
+        """
+        :return: list of fairy pieces that have been entered onto the board, including ones since captured
+        """
+        return self._entered_fairy_pieces
+
+    def is_fairy_entry_unlocked(self, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: True once that player has lost a Queen, Rook, Knight or Bishop
+        """
+        return self._game_manager.get_material_ledger().get_unlock_turn(colour) is not None
+
+    def get_enterable_fairy_pieces(self):
+        """
+        Checks which fairy pieces the current player is allowed to enter this turn
+        A fairy piece can be entered if it has not been entered yet and the player lost a Queen, Rook, Knight or Bishop
+        on an earlier turn
+        :return: list of fairy piece names, empty if no entry is possible
+        """
+        current_player = self._game_manager.get_current_player()
+        fairy_pieces = ['F', 'H'] if current_player == 'WHITE' else ['f', 'h']
+        material_ledger = self._game_manager.get_material_ledger()
+        if not material_ledger.is_entry_unlocked(current_player, self._game_manager.get_turn_count()):
+            return []
+        return [piece for piece in fairy_pieces if material_ledger.get_in_reserve(piece)]
+
+    def generate_moves(self):
+        """
+        :return: list of every move the current player can make, see MoveGenerator.generate_moves
+        """
+        return MoveGenerator.generate_moves(self)
+
+    def generate_captures(self):
+        """
+        :return: list of every move the current player can make that captures a piece, see MoveGenerator.generate_moves
+        """
+        return MoveGenerator.generate_moves(self, captures_only=True)
+
+    def is_legal(self, move):
+        """
+        :param move: (source, destination) tuple, or (fairy piece, entry square) tuple
+        :return: True if the current player can make the move, never raises, see MoveGenerator.is_legal
+        """
+        return MoveGenerator.check_move(self, move) == MoveStatus.LEGAL
+
+    def check_move(self, move):
+        """
+        :param move: (source, destination) tuple, or (fairy piece, entry square) tuple
+        :return: MoveStatus reason code, never raises, see MoveGenerator.check_move
+        """
+        return MoveGenerator.check_move(self, move)
+
+    def apply_moves(self, moves):
+        """
+        Plays a list of moves, checking each one first so a rejected move is never skipped without notice
+        :param moves: list of (source, destination) tuples, or (fairy piece, entry square) tuples
+        :return: None, GameError is raised for the first move that is not legal, with its ply and MoveStatus reason
+        """
+        for ply, move in enumerate(moves, 1):
+            status = MoveGenerator.check_move(self, move)
+            if status != MoveStatus.LEGAL:
+                source, destination = move
+                raise GameError(f"Move {ply} ({source.lower() if len(source) == 2 else source}, "
+                                f"{destination.lower()}) is illegal: {status.name}")
+            self.make_move(move)
+
     def get_piece(self, square):
         """
         Checks if a square on the chessboard contains a piece or not
@@ -745,27 +1985,170 @@ class Chessboard:
         :param square: location on the board we are checking
         :return: True if square is on the chessboard
         """
-        if square[0] not in self._columns or square[1] not in self._rows:
+        if len(square) != 2 or square[0] not in self._columns or square[1] not in self._rows:
             return False
         return True
 
+    def get_piece_squares(self, piece):
+        """
+        :param piece: name of the piece, uppercase for White, lowercase for Black
+        :return: set of the square indexes holding that piece, see BitboardPosition.get_piece_squares
+        """
+        return self._position.get_piece_squares(piece)
+
+    def has_king(self, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: True if that player's King is still on the board
+        """
+        return bool(self._position.get_piece_squares('K' if colour == 'WHITE' else 'k'))
+
     def get_board(self):
         return self._board
 
+    def get_game_manager(self):
+        """
+        :return: GameManager holding the state of this board's game
+        """
+        return self._game_manager
+
+    def get_position(self):
+        """
+        :return: bitboard position backing the chessboard
+        """
+        return self._position
+
+
+class BoardRenderer:
+    """
+    Draws the chessboard for the terminal, building each frame as one string written with a single call
+    Modes:
+    'plain' writes the full board every time
+    'ansi' draws the board once at the top of the screen and afterwards only redraws the squares that changed, with
+    the rest of the output scrolling below the board
+    'quiet' draws nothing, for automated play
+    """
+    _modes = ('plain', 'ansi', 'quiet')
+
+    # Screen line of the first rank and screen column of the a-file in the ansi mode, both 1-based
+    _first_rank_line = 4
+    _first_file_column = 6
+
+    def __init__(self, mode='plain', output=None):
+        """
+        :param mode: 'plain', 'ansi' or 'quiet'
+        :param output: file to write frames to, standard output if not given
+        """
+        if mode not in BoardRenderer._modes:
+            raise GameError(f"Unknown display mode {mode}, choose one of {', '.join(BoardRenderer._modes)}")
+        self._mode = mode
+        self._output = output if output is not None else sys.stdout
+
+        # Pieces shown on the screen in the ansi mode, indexed by square, None until the first full frame
+        self._shown_squares = None
+
+    @classmethod
+    def get_modes(cls):
+        """
+        :return: tuple of display mode names
+        """
+        return cls._modes
+
+    def get_mode(self):
+        """
+        :return: display mode name
+        """
+        return self._mode
+
+    @staticmethod
+    def render_frame(board):
+        """
+        :param board: 8x8 list of piece names
+        :return: the whole board as one string, ending with a blank line
+        """
+        column_labels = '   a b c d e f g h '
+        row_labels = ['8', '7', '6', '5', '4', '3', '2', '1']
+
+        # Top border, column labels and separator
+        lines = [' ╔' + '═══' * 7 + '╗', ' ║' + column_labels + '  ║', ' ║' + '═══' * 7 + '║']
+
+        # The board with squares and piece labels
+        for row_index, row in enumerate(board):
+            lines.append(f' ║{row_labels[row_index]}║ ' + ' '.join(row) + '   ║')
+
+        # Bottom border
+        lines.append(' ╚' + '═══' * 7 + '╝\n\n')
+        return '\n'.join(lines)
+
+    def render(self, board):
+        """
+        Writes the board in the current display mode
+        :param board: 8x8 list of piece names
+        :return: None
+        """
+        if self._mode == 'quiet':
+            return
+        if self._mode == 'plain':
+            self._output.write(self.render_frame(board))
+            self._output.flush()
+            return
+
+        squares = [piece for row in board for piece in row]
+        if self._shown_squares is None:
+            # Clear the screen, draw the board at the top and keep the scrolling text below it
+            frame = self.render_frame(board)
+            board_lines = frame.count('\n')
+            self._output.write(f'\x1b[2J\x1b[H{frame}\x1b[{board_lines + 1}r\x1b[{board_lines + 1};1H')
+        else:
+            # Save the cursor, redraw the changed squares and put the cursor back
+            changes = []
+            for square, piece in enumerate(squares):
+                if piece != self._shown_squares[square]:
+                    line = BoardRenderer._first_rank_line + (square >> 3)
+                    column = BoardRenderer._first_file_column + 2 * (square & 7)
+                    changes.append(f'\x1b[{line};{column}H{piece}')
+            if not changes:
+                return
+            self._output.write('\x1b7' + ''.join(changes) + '\x1b8')
+        self._output.flush()
+        self._shown_squares = squares
+
+    def reset(self):
+        """
+        Forgets what is on the screen, so the next ansi mode frame redraws the whole board and in ansi mode the
+        terminal's scrolling region is restored
+        :return: None
+        """
+        if self._mode == 'ansi' and self._shown_squares is not None:
+            self._output.write('\x1b[r')
+            self._output.flush()
+        self._shown_squares = None
+
 
 class ChessVar:
     """
     Responsible for running the game, allowing user to make moves, enter fairy pieces, and return the state of the game
     """
 
-    def __init__(self):
+    def __init__(self, engine_player=None, engine=None, renderer=None):
         """
-        reset GameManager everytime the game is called
+        Creates a new GameManager everytime the game is called, so every instance of ChessVar is its own game
         Initializes an instance of the chessboard to run the game
-        Resets the game everytime a new instance of ChessVar is called
+        :param engine_player: 'WHITE' or 'BLACK' to have the computer play that colour, None for two human players
+        :param engine: SearchEngine the computer plays with, a default one is created if not given
+        :param renderer: BoardRenderer drawing the board, a plain one is created if not given
         """
-        GameManager.reset_game()
-        self._chessboard = Chessboard()
+        self._game_manager = GameManager()
+        self._chessboard = Chessboard(self._game_manager)
+        self._renderer = renderer if renderer is not None else BoardRenderer()
+
+        # Seats the computer opponent, imported here since the engine module builds on this one
+        self._engine_player = engine_player
+        self._engine = engine
+        if engine_player is not None and engine is None:
+            from Falcon_Hunter_Engine import SearchEngine
+            self._engine = SearchEngine()
+
         # Calls start method for the game
         self.start_game()
 
@@ -776,18 +2159,47 @@ class ChessVar:
         print("Setting up the chessboard")
         self.print_board()
         print("Board ready: it is the White players turn to move first!\n")
-        print("If at any point you wish to exit the game, please type 'quit'\n")
+        print("If at any point you wish to exit the game, please type 'quit'")
+        print("Type 'undo' to take back the last move, or 'takeback' to take back your own last move\n")
         # Checking that the game is still ongoing
-        while GameManager.get_game_state() == "UNFINISHED":
-            self.make_move()
-        print(f"Game over! {GameManager.get_game_state()}")
+        while self._game_manager.get_game_state() == "UNFINISHED":
+            if self._game_manager.get_current_player() == self._engine_player:
+                if not self.make_engine_move():
+                    break
+            else:
+                self.make_move()
+        self._renderer.reset()
+        print(f"Game over! {self._game_manager.get_game_state()}")
+
+    def make_engine_move(self):
+        """
+        Lets the computer search for and play its move
+        :return: True if a move was made, False if the computer has no moves
+        """
+        result = self._engine.search(self._chessboard)
+        move = result.get_best_move()
+        if move is None:
+            print(f"The {self._engine_player} player has no moves left")
+            return False
+
+        source, destination = move
+        if len(source) == 1:
+            self._chessboard.set_fairy_piece(source, destination)
+        else:
+            self._chessboard.set_piece(source, destination)
+            source = source.lower()
+        print(f"Computer ({self._engine_player}) plays {source}, {destination.lower()}")
+        self.print_board()
+        return True
 
     def make_move(self):
-        if GameManager.get_turn_count() == 1:
+        if self._game_manager.get_turn_count() == 1:
             move = self.get_user_input("Please Enter your move (e.g. 'e2, e4'): ")
         else:
-            move = self.get_user_input(f"It's {GameManager.get_current_player()} players turn!" +
+            move = self.get_user_input(f"It's {self._game_manager.get_current_player()} players turn!" +
                                        " Please Enter your move (e.g. 'e2, e4'): ")
+        if move in ('undo', 'takeback'):
+            return self.take_back(move)
         try:
             source, destination = move.split(",")
             source = source.strip()
@@ -803,9 +2215,6 @@ class ChessVar:
                 source = source.upper()
                 if self._chessboard.set_piece(source, destination):
                     self.print_board()
-                    GameManager.set_turn_count()
-                    GameManager.set_current_player()
-                    GameManager.set_game_state()
                 else:
                     return False
         except GameError as e:
@@ -815,13 +2224,25 @@ class ChessVar:
         try:
             if self._chessboard.set_fairy_piece(piece, destination):
                 self.print_board()
-                GameManager.set_turn_count()
-                GameManager.set_current_player()
             else:
                 raise GameError("Fairy Piece entry requirements have not been met")
         except GameError as e:
             print(f"Invalid Move: {e}")
 
+    def take_back(self, command):
+        """
+        Takes back moves using the chessboard's undo stack
+        :param command: 'undo' takes back the last move, 'takeback' takes back the current player's own last move
+        :return: None
+        """
+        moves_to_undo = 1 if command == 'undo' else 2
+        if len(self._chessboard.get_move_history()) < moves_to_undo:
+            print("Invalid Move: There are no moves to take back")
+            return
+        for _ in range(moves_to_undo):
+            self._chessboard.unmake_move()
+        self.print_board()
+
     def get_user_input(self, prompt):
         """
         :return: user input for move
@@ -830,8 +2251,12 @@ class ChessVar:
             user_input = input(prompt)
             # allows user to quit at any point
             if user_input.lower() == 'quit':
+                self._renderer.reset()
                 print("Exiting the game.")
                 exit()
+            # Taking back moves does not need squares
+            elif user_input.strip().lower() in ('undo', 'takeback'):
+                return user_input.strip().lower()
             # Checking user input isn't blank
             elif user_input:
                 # splits input into source and destination squares
@@ -849,29 +2274,56 @@ class ChessVar:
     def print_board(self):
         """
         Handles printing the board, updates after moved pieces as well
-        :return: printed board
+        :return: printed board, drawn by the board renderer in one write
         """
-        column_labels = '   a b c d e f g h '
-        row_labels = ['8', '7', '6', '5', '4', '3', '2', '1']
-
-        # Print top border
-        print(' ╔' + '═══' * 7 + '╗')
-
-        # Print column labels
-        print(' ║' + column_labels + '  ║')
-
-        print(' ║' + '═══' * 7 + '║')
-
-        # Print the board with squares and piece labels
-        for row_index, row in enumerate(self._chessboard.get_board()):
-            print(f' ║{row_labels[row_index]}║', end=' ')
-            for square in row:
-                print(square, end=' ')
-            print('  ║')
-
-        # Print bottom border
-        print(' ╚' + '═══' * 7 + '╝\n')
+        self._renderer.render(self._chessboard.get_board())
 
 
 if __name__ == "__main__":
-    game = ChessVar()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play the Falcon - Hunter chess variant")
+    parser.add_argument('--computer', choices=['white', 'black'],
+                        help="let the computer play this colour")
+    parser.add_argument('--move-time', type=float, default=1.0,
+                        help="seconds the computer may think about each move (default 1.0)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes the computer searches with, more than 1 uses the parallel search (default 1)")
+    parser.add_argument('--book', help="opening book the computer plays from before it starts searching")
+    parser.add_argument('--tablebase', help="directory of endgame tablebases the computer plays small endings from")
+    parser.add_argument('--display', choices=BoardRenderer.get_modes(), default='plain',
+                        help="plain prints the whole board each move, ansi redraws only changed squares, "
+                             "quiet prints no boards (default plain)")
+    parser.add_argument('--profile',
+                        help="record rules engine call counts, move latencies and rejected moves, and write them to "
+                             "this file as JSON when the game ends")
+    args = parser.parse_args()
+
+    if args.profile:
+        # Run as a script this module is __main__, so its classes are not the ones Falcon_Hunter_Chess imports see
+        import atexit
+        from Falcon_Hunter_Profiler import RulesProfiler
+        rules_profiler = RulesProfiler(sys.modules[__name__])
+        rules_profiler.enable()
+        atexit.register(rules_profiler.write_json, args.profile)
+
+    board_renderer = BoardRenderer(args.display)
+    opening_book = None
+    if args.computer and args.book:
+        from Falcon_Hunter_Book import OpeningBook
+        opening_book = OpeningBook(args.book)
+    if args.computer and args.workers > 1:
+        from Falcon_Hunter_Parallel import ParallelSearch
+        with ParallelSearch(args.workers, time_limit=args.move_time, book=opening_book,
+                            tablebase=args.tablebase) as parallel_search:
+            game = ChessVar(args.computer.upper(), parallel_search, board_renderer)
+    elif args.computer:
+        from Falcon_Hunter_Engine import SearchEngine
+        endgame_tablebase = None
+        if args.tablebase:
+            from Falcon_Hunter_Tablebase import Tablebase
+            endgame_tablebase = Tablebase(args.tablebase)
+        game = ChessVar(args.computer.upper(), SearchEngine(time_limit=args.move_time, book=opening_book,
+                                                            tablebase=endgame_tablebase), board_renderer)
+    else:
+        game = ChessVar(renderer=board_renderer)
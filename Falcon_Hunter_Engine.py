@@ -0,0 +1,1009 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Computer opponent for the Falcon - Hunter chess variant (see README for more information)
+
+import random
+import struct
+import time
+
+from Falcon_Hunter_Chess import AttackTables, GameManager, MoveCodec, MoveGenerator
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+    pass
+
+
+class Evaluator:
+    """
+    Scores positions from the point of view of the player to move
+    Uses material weights and piece-square tables, with separate tables for Falcons and Hunters
+    Fairy pieces that have not been entered yet are worth part of their value while they wait in reserve
+    """
+    # Material weights, the King has no material value since capturing it ends the game
+    _piece_values = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0, 'F': 420, 'H': 420}
+
+    # Value of a fairy piece still off the board, once entry is unlocked and before then
+    _reserve_values = {'unlocked': 300, 'locked': 150}
+
+    # Piece-square tables from White's point of view, index 0 is A8 and index 63 is H1 like the chessboard
+    # Pawns are not promoted in this variant, so there is no bonus for reaching the last rank
+    _piece_square_tables = {
+        'P': [
+            0, 0, 0, 0, 0, 0, 0, 0,
+            20, 20, 20, 25, 25, 20, 20, 20,
+            10, 10, 20, 30, 30, 20, 10, 10,
+            5, 5, 10, 25, 25, 10, 5, 5,
+            0, 0, 0, 20, 20, 0, 0, 0,
+            5, -5, -10, 0, 0, -10, -5, 5,
+            5, 10, 10, -20, -20, 10, 10, 5,
+            0, 0, 0, 0, 0, 0, 0, 0,
+        ],
+        'N': [
+            -50, -40, -30, -30, -30, -30, -40, -50,
+            -40, -20, 0, 0, 0, 0, -20, -40,
+            -30, 0, 10, 15, 15, 10, 0, -30,
+            -30, 5, 15, 20, 20, 15, 5, -30,
+            -30, 0, 15, 20, 20, 15, 0, -30,
+            -30, 5, 10, 15, 15, 10, 5, -30,
+            -40, -20, 0, 5, 5, 0, -20, -40,
+            -50, -40, -30, -30, -30, -30, -40, -50,
+        ],
+        'B': [
+            -20, -10, -10, -10, -10, -10, -10, -20,
+            -10, 0, 0, 0, 0, 0, 0, -10,
+            -10, 0, 5, 10, 10, 5, 0, -10,
+            -10, 5, 5, 10, 10, 5, 5, -10,
+            -10, 0, 10, 10, 10, 10, 0, -10,
+            -10, 10, 10, 10, 10, 10, 10, -10,
+            -10, 5, 0, 0, 0, 0, 5, -10,
+            -20, -10, -10, -10, -10, -10, -10, -20,
+        ],
+        'R': [
+            0, 0, 0, 0, 0, 0, 0, 0,
+            5, 10, 10, 10, 10, 10, 10, 5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            0, 0, 0, 5, 5, 0, 0, 0,
+        ],
+        'Q': [
+            -20, -10, -10, -5, -5, -10, -10, -20,
+            -10, 0, 0, 0, 0, 0, 0, -10,
+            -10, 0, 5, 5, 5, 5, 0, -10,
+            -5, 0, 5, 5, 5, 5, 0, -5,
+            0, 0, 5, 5, 5, 5, 0, -5,
+            -10, 5, 5, 5, 5, 5, 0, -10,
+            -10, 0, 5, 0, 0, 0, 0, -10,
+            -20, -10, -10, -5, -5, -10, -10, -20,
+        ],
+        # Losing the King loses the game, so it is kept back behind its pieces
+        'K': [
+            -30, -40, -40, -50, -50, -40, -40, -30,
+            -30, -40, -40, -50, -50, -40, -40, -30,
+            -30, -40, -40, -50, -50, -40, -40, -30,
+            -30, -40, -40, -50, -50, -40, -40, -30,
+            -20, -30, -30, -40, -40, -30, -30, -20,
+            -10, -20, -20, -20, -20, -20, -20, -10,
+            20, 20, 0, 0, 0, 0, 20, 20,
+            20, 30, 10, 0, 0, 10, 30, 20,
+        ],
+        # Falcons attack forward along diagonals, so they like central squares with open diagonals ahead
+        'F': [
+            -10, -5, -5, -5, -5, -5, -5, -10,
+            -5, 0, 5, 5, 5, 5, 0, -5,
+            -5, 5, 10, 15, 15, 10, 5, -5,
+            -5, 5, 15, 20, 20, 15, 5, -5,
+            -5, 5, 10, 15, 15, 10, 5, -5,
+            -5, 0, 10, 10, 10, 10, 0, -5,
+            -10, 0, 5, 5, 5, 5, 0, -10,
+            -15, -10, -10, -10, -10, -10, -10, -15,
+        ],
+        # Hunters attack forward along the column, so they like advanced central columns
+        'H': [
+            0, 0, 5, 5, 5, 5, 0, 0,
+            10, 15, 15, 20, 20, 15, 15, 10,
+            0, 5, 10, 15, 15, 10, 5, 0,
+            0, 5, 10, 10, 10, 10, 5, 0,
+            -5, 0, 5, 10, 10, 5, 0, -5,
+            -5, 0, 5, 5, 5, 5, 0, -5,
+            -10, -5, 0, 0, 0, 0, -5, -10,
+            -10, -10, -5, -5, -5, -5, -10, -10,
+        ],
+    }
+
+    def __init__(self):
+        """
+        Combines material and piece-square values into one table per piece name, Black's tables are mirrored
+        """
+        self._square_values = {}
+        for kind, table in Evaluator._piece_square_tables.items():
+            value = Evaluator._piece_values[kind]
+            self._square_values[kind] = [value + bonus for bonus in table]
+            # Black reads White's table upside down, row 0 becomes row 7
+            self._square_values[kind.lower()] = [value + table[square ^ 56] for square in range(64)]
+
+    @classmethod
+    def get_piece_values(cls):
+        """
+        :return: mapping of upper case piece name to material value
+        """
+        return cls._piece_values
+
+    @classmethod
+    def get_piece_square_tables(cls):
+        """
+        :return: mapping of upper case piece name to a 64 entry table from White's point of view
+        """
+        return cls._piece_square_tables
+
+    @classmethod
+    def get_reserve_values(cls):
+        """
+        :return: mapping of 'unlocked'/'locked' to the value of a fairy piece waiting to be entered
+        """
+        return cls._reserve_values
+
+    def evaluate(self, chessboard):
+        """
+        Scores the position on a chessboard
+        :param chessboard: chessboard object
+        :return: score in centipawns, positive when the player to move is better
+        """
+        position = chessboard.get_position()
+        square_values = self._square_values
+
+        score = 0
+        for piece in 'PNBRQKFH':
+            for name, sign in ((piece, 1), (piece.lower(), -1)):
+                table = square_values[name]
+                for square in position.get_piece_squares(name):
+                    score += sign * table[square]
+
+        score += self.reserve_score(chessboard)
+
+        if chessboard.get_game_manager().get_current_player() == 'WHITE':
+            return score
+        return -score
+
+    def reserve_score(self, chessboard):
+        """
+        Values the fairy pieces each side still has in reserve
+        :param chessboard: chessboard object
+        :return: White's reserve value minus Black's
+        """
+        material_ledger = chessboard.get_game_manager().get_material_ledger()
+        score = 0
+        for colour, fairy_pieces, sign in (('WHITE', 'FH', 1), ('BLACK', 'fh', -1)):
+            reserve_value = Evaluator._reserve_values[
+                'unlocked' if material_ledger.get_unlock_turn(colour) is not None else 'locked'
+            ]
+            for fairy_piece in fairy_pieces:
+                score += sign * reserve_value * material_ledger.get_in_reserve(fairy_piece)
+        return score
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results keyed by position hash key
+    Entries are packed into one flat buffer, two entries per bucket: the first slot keeps the deepest result seen
+    (results from an older search can always be replaced), the second slot is always replaced
+    Each 16 byte entry holds the hash key, move code, score, depth and bound type with the search generation
+    """
+    # Bound types stored with a score
+    EXACT, LOWER_BOUND, UPPER_BOUND = 1, 2, 3
+
+    # key, move code, score, depth, bound type in the low 2 bits and search generation in the high 6 bits
+    _entry_format = struct.Struct('<QHiBB')
+    _bucket_size = 2 * _entry_format.size
+
+    def __init__(self, size_mb=16, buffer=None):
+        """
+        :param size_mb: memory cap in MB, rounded down to a power of two number of buckets
+        :param buffer: writable buffer to keep the entries in (for example shared memory), a new one is made if not
+        given. An existing buffer is used as is, so several tables can share one
+        """
+        size_bytes = self.get_buffer_size(size_mb)
+        self._bucket_mask = size_bytes // self._bucket_size - 1
+        self._buffer = buffer if buffer is not None else bytearray(size_bytes)
+        if len(self._buffer) < size_bytes:
+            raise ValueError(f"Buffer of {len(self._buffer)} bytes is too small for a {size_mb} MB table")
+        self._generation = 0
+
+        # Counters for tuning
+        self._hits = 0
+        self._misses = 0
+        self._collisions = 0
+        self._stores = 0
+        self._replacements = 0
+
+    @classmethod
+    def get_buffer_size(cls, size_mb):
+        """
+        :param size_mb: memory cap in MB
+        :return: number of bytes the entries of a table of that size take, a power of two number of buckets
+        """
+        bucket_count = 1
+        while bucket_count * 2 * cls._bucket_size <= size_mb * 1024 * 1024:
+            bucket_count *= 2
+        return bucket_count * cls._bucket_size
+
+    @classmethod
+    def get_entry_size(cls):
+        """
+        :return: size in bytes of one packed entry
+        """
+        return cls._entry_format.size
+
+    def get_capacity(self):
+        """
+        :return: number of entries the table can hold
+        """
+        return (self._bucket_mask + 1) * 2
+
+    def get_size_bytes(self):
+        """
+        :return: number of bytes used by the entries
+        """
+        return (self._bucket_mask + 1) * self._bucket_size
+
+    def new_search(self):
+        """
+        Starts a new search generation so results from earlier searches are replaced first
+        :return: None
+        """
+        self._generation = (self._generation + 1) & 63
+
+    def clear(self):
+        """
+        Empties every entry and resets the counters
+        :return: None
+        """
+        self._buffer[:self.get_size_bytes()] = bytes(self.get_size_bytes())
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._collisions = 0
+        self._stores = 0
+        self._replacements = 0
+
+    def probe(self, key):
+        """
+        Looks up a position
+        :param key: 64-bit position hash key
+        :return: (move code, score, depth, bound type) tuple, None if the position is not stored
+        """
+        offset = (key & self._bucket_mask) * self._bucket_size
+        unpack_from = self._entry_format.unpack_from
+        collision = False
+        for slot_offset in (offset, offset + 16):
+            stored_key, move_code, score, depth, flags = unpack_from(self._buffer, slot_offset)
+            if flags & 3:
+                if stored_key == key:
+                    self._hits += 1
+                    return move_code, score, depth, flags & 3
+                collision = True
+        self._misses += 1
+        if collision:
+            self._collisions += 1
+        return None
+
+    def store(self, key, move_code, score, depth, bound):
+        """
+        Saves a search result, the deepest result for the bucket is kept in the first slot
+        :param key: 64-bit position hash key
+        :param move_code: best move found as a 16-bit move code, 0 if none
+        :param score: score of the position
+        :param depth: depth the position was searched to
+        :param bound: EXACT, LOWER_BOUND or UPPER_BOUND
+        :return: None
+        """
+        offset = (key & self._bucket_mask) * self._bucket_size
+        stored_key, stored_move, _, stored_depth, flags = self._entry_format.unpack_from(self._buffer, offset)
+
+        # Depth-preferred slot: empty, same position, stale generation or at least as deep
+        if not flags & 3 or stored_key == key or flags >> 2 != self._generation or depth >= stored_depth:
+            # Keep the old move if the new result has none for the same position
+            if stored_key == key and not move_code:
+                move_code = stored_move
+            elif flags & 3 and stored_key != key:
+                self._replacements += 1
+        else:
+            # Always-replace slot
+            offset += 16
+            if self._entry_format.unpack_from(self._buffer, offset)[4] & 3:
+                self._replacements += 1
+
+        self._entry_format.pack_into(self._buffer, offset, key, move_code, score, min(depth, 255),
+                                     bound | self._generation << 2)
+        self._stores += 1
+
+    def get_stats(self):
+        """
+        :return: dictionary of hit, miss, collision, store and replacement counters plus the table size
+        """
+        probes = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'collisions': self._collisions,
+            'stores': self._stores,
+            'replacements': self._replacements,
+            'hit_rate': self._hits / probes if probes else 0.0,
+            'capacity': self.get_capacity(),
+            'size_mb': self.get_size_bytes() / (1024 * 1024),
+        }
+
+
+class MoveOrderer:
+    """
+    Orders moves so alpha-beta finds cutoffs early, each heuristic can be switched off to measure what it buys
+    Moves are tried in buckets:
+    the transposition table move
+    captures, King captures first since they end the game, then most valuable victim / least valuable attacker
+    killer moves, quiet moves that caused a cutoff at the same distance from the root
+    fairy piece entries, ordered by the history table
+    the remaining quiet moves, ordered by the history table
+    The history table scores moves by how often and how deep they caused cutoffs, indexed by move code
+    """
+    # Killer moves kept for each distance from the root
+    _killer_slots = 2
+
+    def __init__(self, mvv_lva=True, killers=True, history=True):
+        """
+        :param mvv_lva: False to leave captures in generated order instead of most valuable victim first
+        :param killers: False to try quiet moves without killer moves
+        :param history: False to leave quiet moves and fairy piece entries in generated order
+        """
+        self._mvv_lva = mvv_lva
+        self._killers_enabled = killers
+        self._history_enabled = history
+        self._killers = []
+        self._history = [0] * (1 << 15)
+
+        # Capture scores: victim value first, cheaper attackers break ties, the King is worth more than any capture
+        self._capture_scores = {}
+        piece_values = Evaluator.get_piece_values()
+        for victim, victim_value in piece_values.items():
+            if victim == 'K':
+                victim_value = 10 * max(piece_values.values())
+            for attacker, attacker_value in piece_values.items():
+                self._capture_scores[victim, attacker] = 100 * victim_value - attacker_value
+
+    def new_search(self):
+        """
+        Forgets killer moves and halves the history scores so older searches count for less
+        :return: None
+        """
+        self._killers = []
+        self._history = [score >> 1 for score in self._history]
+
+    def clear(self):
+        """
+        Forgets killer moves and history scores
+        :return: None
+        """
+        self._killers = []
+        self._history = [0] * (1 << 15)
+
+    def get_killers(self, ply):
+        """
+        :param ply: distance from the root
+        :return: list of killer moves at that distance, most recent first
+        """
+        return self._killers[ply] if ply < len(self._killers) else []
+
+    def get_history_score(self, move):
+        """
+        :param move: (source, destination) tuple, or (fairy piece, entry square) tuple
+        :return: history score of the move
+        """
+        return self._history[MoveCodec.encode_move(move)]
+
+    def order_moves(self, chessboard, moves, first_move=None, ply=0):
+        """
+        :param chessboard: chessboard object
+        :param moves: moves to order
+        :param first_move: move to try before all others (such as the transposition table move), if it is in moves
+        :param ply: distance from the root, selects the killer moves
+        :return: new ordered list of moves
+        """
+        board = chessboard.get_board()
+        columns = GameManager.get_column_mapping()
+        rows = GameManager.get_row_mapping()
+        capture_scores = self._capture_scores
+        killers = self.get_killers(ply) if self._killers_enabled else ()
+        captures = []
+        killer_moves = []
+        entries = []
+        quiet_moves = []
+        for move in moves:
+            if move == first_move:
+                continue
+            source, destination = move
+            if len(source) == 1:
+                entries.append(move)
+                continue
+            victim = board[rows[destination[1]]][columns[destination[0]]]
+            if victim != '_':
+                attacker = board[rows[source[1]]][columns[source[0]]]
+                captures.append((capture_scores[victim.upper(), attacker.upper()], move))
+            elif move in killers:
+                killer_moves.append(move)
+            else:
+                quiet_moves.append(move)
+
+        if self._mvv_lva:
+            captures.sort(key=lambda capture: -capture[0])
+        else:
+            # Captures still go first, King captures ahead of the rest
+            king_square = self._king_square(chessboard)
+            captures.sort(key=lambda capture: capture[1][1] != king_square)
+        if len(killer_moves) > 1:
+            killer_moves.sort(key=killers.index)
+        if self._history_enabled:
+            history = self._history
+            encode_move = MoveCodec.encode_move
+            entries.sort(key=lambda entry: -history[encode_move(entry)])
+            quiet_moves.sort(key=lambda quiet_move: -history[encode_move(quiet_move)])
+
+        ordered_moves = [first_move] if first_move is not None and first_move in moves else []
+        ordered_moves.extend(move for _, move in captures)
+        ordered_moves.extend(killer_moves)
+        ordered_moves.extend(entries)
+        ordered_moves.extend(quiet_moves)
+        return ordered_moves
+
+    def record_cutoff(self, chessboard, move, depth, ply):
+        """
+        Remembers a move that caused a beta cutoff, captures are left to the capture ordering
+        :param chessboard: chessboard object, in the position the move was made from
+        :param move: move that caused the cutoff
+        :param depth: remaining depth the cutoff happened at
+        :param ply: distance from the root
+        :return: None
+        """
+        source, destination = move
+        if len(source) == 2 and chessboard.get_piece(destination) != '_':
+            return
+        if self._history_enabled:
+            self._history[MoveCodec.encode_move(move)] += depth * depth
+        if self._killers_enabled and len(source) == 2:
+            while len(self._killers) <= ply:
+                self._killers.append([])
+            killers = self._killers[ply]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[MoveOrderer._killer_slots:]
+
+    @staticmethod
+    def _king_square(chessboard):
+        """
+        :param chessboard: chessboard object
+        :return: name of the square holding the opponent's King, None if it has been captured
+        """
+        king = 'k' if chessboard.get_game_manager().get_current_player() == 'WHITE' else 'K'
+        king_squares = chessboard.get_piece_squares(king)
+        return GameManager.get_square_names()[next(iter(king_squares))] if king_squares else None
+
+
+class SearchResult:
+    """
+    Outcome of a search: the best move found and how the search went
+    """
+
+    def __init__(self, best_move, score, depth, nodes, elapsed, stopped):
+        """
+        :param best_move: best move found, None if the player to move has no moves
+        :param score: score of the best move from the searching player's point of view
+        :param depth: deepest iteration that was completed
+        :param nodes: number of positions visited
+        :param elapsed: seconds spent searching
+        :param stopped: True if the time or node budget cut the search short
+        """
+        self._best_move = best_move
+        self._score = score
+        self._depth = depth
+        self._nodes = nodes
+        self._elapsed = elapsed
+        self._stopped = stopped
+
+    def get_best_move(self):
+        """
+        :return: best move found as a (source, destination) tuple
+        """
+        return self._best_move
+
+    def get_score(self):
+        """
+        :return: score of the best move from the searching player's point of view
+        """
+        return self._score
+
+    def get_depth(self):
+        """
+        :return: deepest iteration that was completed
+        """
+        return self._depth
+
+    def get_nodes(self):
+        """
+        :return: number of positions visited
+        """
+        return self._nodes
+
+    def get_elapsed(self):
+        """
+        :return: seconds spent searching
+        """
+        return self._elapsed
+
+    def was_stopped(self):
+        """
+        :return: True if the time or node budget cut the search short
+        """
+        return self._stopped
+
+    def get_nodes_per_second(self):
+        """
+        :return: search speed
+        """
+        return self._nodes / self._elapsed if self._elapsed > 0 else 0.0
+
+
+class SearchEngine:
+    """
+    Negamax alpha-beta search with iterative deepening under a wall-clock and node budget
+    Capturing a King ends the game, so King captures are scored as terminal wins instead of searching past them
+    Fairy piece entries are searched like any other move
+    At the horizon a quiescence search plays out captures (and optionally fairy piece entries that attack a piece)
+    until the position is quiet, so the search does not stop with a piece hanging
+    """
+    # Score for capturing the King, reduced by the ply it happens at so quicker wins score higher
+    _king_capture_score = 100000
+
+    # How many nodes are searched between checks of the clock
+    _check_interval = 256
+
+    # A capture is skipped in quiescence when even winning the victim plus this margin cannot raise alpha
+    _delta_margin = 200
+
+    def __init__(self, time_limit=1.0, node_limit=None, max_depth=64, evaluator=None, transposition_table=None,
+                 hash_size_mb=16, move_orderer=None, quiescence=True, quiescence_entries=False,
+                 quiescence_depth=8, quiescence_node_limit=2000, book=None, tablebase=None):
+        """
+        :param time_limit: hard limit in seconds for each move, None for no limit
+        :param node_limit: maximum number of positions visited for each move, None for no limit
+        :param max_depth: deepest iteration to search
+        :param evaluator: Evaluator used at the leaves, a default one is created if not given
+        :param transposition_table: TranspositionTable to use, one of hash_size_mb is created if not given
+        :param hash_size_mb: size of the transposition table created when none is given, 0 searches without one
+        :param move_orderer: MoveOrderer used to order moves, one with every heuristic is created if not given
+        :param quiescence: False to evaluate positions at the horizon without searching captures
+        :param quiescence_entries: True to also search fairy piece entries that attack a piece during quiescence
+        :param quiescence_depth: most plies quiescence searches past the horizon
+        :param quiescence_node_limit: most positions one quiescence search visits before it stands pat everywhere
+        :param book: OpeningBook consulted before searching, its move is played at once when the position is in it
+        :param tablebase: Tablebase of solved endings, positions in it are looked up instead of searched
+        """
+        self._time_limit = time_limit
+        self._node_limit = node_limit
+        self._max_depth = max_depth
+        self._evaluator = evaluator if evaluator is not None else Evaluator()
+        if transposition_table is None and hash_size_mb:
+            transposition_table = TranspositionTable(hash_size_mb)
+        self._transposition_table = transposition_table
+        self._move_orderer = move_orderer if move_orderer is not None else MoveOrderer()
+        self._quiescence = quiescence
+        self._quiescence_entries = quiescence_entries
+        self._quiescence_depth = quiescence_depth
+        self._quiescence_node_limit = quiescence_node_limit
+        self._book = book
+        self._tablebase = tablebase
+
+        # Per-search bookkeeping
+        self._nodes = 0
+        self._quiescence_nodes = 0
+        self._quiescence_budget = 0
+        self._deadline = None
+        self._node_budget = None
+        self._stop_requested = False
+
+    @classmethod
+    def get_king_capture_score(cls):
+        """
+        :return: score for capturing the King on the next move, scores within 1000 of it are forced King captures
+        """
+        return cls._king_capture_score
+
+    def get_transposition_table(self):
+        """
+        :return: TranspositionTable used by the search, None if searching without one
+        """
+        return self._transposition_table
+
+    def get_move_orderer(self):
+        """
+        :return: MoveOrderer used by the search
+        """
+        return self._move_orderer
+
+    def stop(self):
+        """
+        Asks a running search to return its best move so far, safe to call from another thread
+        :return: None
+        """
+        self._stop_requested = True
+
+    def search(self, chessboard, time_limit=None, node_limit=None, max_depth=None, start_depth=1, shuffle_seed=None):
+        """
+        Searches the chessboard's current position, the board is left exactly as it was found
+        :param chessboard: chessboard object, searched in place with make_move / unmake_move
+        :param time_limit: overrides the engine's time limit for this search
+        :param node_limit: overrides the engine's node limit for this search
+        :param max_depth: overrides the engine's maximum depth for this search
+        :param start_depth: depth of the first iteration, parallel helper searches start deeper than the main one
+        :param shuffle_seed: seed to shuffle the root moves after the table move with, None keeps the usual order
+        :return: SearchResult holding the best move found
+        """
+        start_time = time.perf_counter()
+        time_limit = self._time_limit if time_limit is None else time_limit
+        node_limit = self._node_limit if node_limit is None else node_limit
+        max_depth = self._max_depth if max_depth is None else max_depth
+
+        self._nodes = 0
+        self._quiescence_nodes = 0
+        self._deadline = start_time + time_limit if time_limit is not None else None
+        self._node_budget = node_limit
+        self._stop_requested = False
+        # Book moves are played without searching
+        if self._book is not None:
+            book_move = self._book.choose_move(chessboard)
+            if book_move is not None:
+                return SearchResult(book_move, 0, 0, 0, time.perf_counter() - start_time, False)
+        # So are the best moves of solved endings
+        if self._tablebase is not None:
+            tablebase_move = self._tablebase.best_move(chessboard)
+            if tablebase_move is not None:
+                move, value = tablebase_move
+                return SearchResult(move, self._tablebase_score(value, 0), 0, 0, time.perf_counter() - start_time,
+                                    False)
+
+        if self._transposition_table is not None:
+            self._transposition_table.new_search()
+        self._move_orderer.new_search()
+
+        table_move = self._probe_move(chessboard)
+        root_moves = self.order_moves(chessboard, chessboard.generate_moves(), table_move)
+        if shuffle_seed is not None:
+            shuffled_moves = root_moves[1:] if root_moves and root_moves[0] == table_move else root_moves
+            random.Random(shuffle_seed).shuffle(shuffled_moves)
+            root_moves = root_moves[:len(root_moves) - len(shuffled_moves)] + shuffled_moves
+        if not root_moves:
+            return SearchResult(None, 0, 0, 0, time.perf_counter() - start_time, False)
+
+        # Capturing the King ends the game, there is nothing to search
+        king_capture = self.find_king_capture(chessboard, root_moves)
+        if king_capture is not None:
+            return SearchResult(king_capture, self._king_capture_score - 1, 1, 1,
+                                time.perf_counter() - start_time, False)
+
+        # Until the first iteration finishes the best guess is the first ordered move
+        best_move = root_moves[0]
+        best_score = -self._king_capture_score
+        completed_depth = 0
+        stopped = False
+        history_length = len(chessboard.get_move_history())
+
+        for depth in range(min(start_depth, max_depth), max_depth + 1):
+            try:
+                score, move = self._search_root(chessboard, root_moves, depth)
+            except SearchTimeout as timeout:
+                # Unwind any moves still made on the board. The previous best move is always searched first, so a
+                # best move from the interrupted iteration has been compared against it at the deeper depth
+                while len(chessboard.get_move_history()) > history_length:
+                    chessboard.unmake_move()
+                partial_move, partial_score = timeout.args if timeout.args else (None, None)
+                if partial_move is not None:
+                    best_move = partial_move
+                    best_score = partial_score
+                stopped = True
+                break
+
+            best_move = move
+            best_score = score
+            completed_depth = depth
+
+            # Search the best move first on the next iteration
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+
+            # A forced King capture cannot be improved on
+            if abs(score) >= self._king_capture_score - 1000:
+                break
+
+            # Stop early if the next, longer iteration is unlikely to finish in time
+            if self._deadline is not None:
+                elapsed = time.perf_counter() - start_time
+                if elapsed * 2 > time_limit:
+                    break
+
+        return SearchResult(best_move, best_score, completed_depth, self._nodes,
+                            time.perf_counter() - start_time, stopped)
+
+    def _search_root(self, chessboard, root_moves, depth):
+        """
+        Searches every root move to the given depth
+        :param chessboard: chessboard object
+        :param root_moves: ordered list of root moves
+        :param depth: depth to search in plies
+        :return: (best score, best move)
+        """
+        alpha = -self._king_capture_score - 1
+        beta = self._king_capture_score + 1
+        best_move = None
+        for move in root_moves:
+            try:
+                chessboard.make_move(move)
+                score = -self._negamax(chessboard, depth - 1, -beta, -alpha, 1)
+                chessboard.unmake_move()
+            except SearchTimeout:
+                raise SearchTimeout(best_move, alpha)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        if self._transposition_table is not None:
+            self._transposition_table.store(chessboard.get_hash_key(), MoveCodec.encode_move(best_move),
+                                            self._score_to_table(alpha, 0), depth, TranspositionTable.EXACT)
+        return alpha, best_move
+
+    def _negamax(self, chessboard, depth, alpha, beta, ply):
+        """
+        Alpha-beta search of the chessboard's current position
+        :param chessboard: chessboard object
+        :param depth: remaining depth in plies
+        :param alpha: lower bound of the search window
+        :param beta: upper bound of the search window
+        :param ply: distance from the root
+        :return: score from the point of view of the player to move
+        """
+        self._nodes += 1
+        if self._nodes % self._check_interval == 0:
+            self._check_limits()
+
+        # The previous move captured our King
+        if chessboard.get_game_manager().get_game_state() != 'UNFINISHED':
+            return -(self._king_capture_score - ply)
+
+        # Solved endings are exact, no need to search them
+        if self._tablebase is not None:
+            value = self._tablebase.probe(chessboard)
+            if value is not None:
+                return self._tablebase_score(value, ply)
+
+        if depth <= 0:
+            if not self._quiescence:
+                return self._evaluator.evaluate(chessboard)
+            self._quiescence_budget = self._quiescence_node_limit
+            return self._quiesce(chessboard, alpha, beta, ply, 0)
+
+        # A stored result that is deep enough can end the search here, otherwise its move is tried first
+        table = self._transposition_table
+        key = chessboard.get_hash_key()
+        table_move = None
+        if table is not None:
+            entry = table.probe(key)
+            if entry is not None:
+                move_code, score, entry_depth, bound = entry
+                table_move = MoveCodec.decode_move(move_code)
+                if entry_depth >= depth:
+                    score = self._score_from_table(score, ply)
+                    if (
+                            bound == TranspositionTable.EXACT or
+                            (bound == TranspositionTable.LOWER_BOUND and score >= beta) or
+                            (bound == TranspositionTable.UPPER_BOUND and score <= alpha)
+                    ):
+                        return score
+
+        moves = chessboard.generate_moves()
+        if not moves:
+            return 0
+
+        # Capturing the opponent's King wins immediately, no need to search further
+        if self.find_king_capture(chessboard, moves) is not None:
+            return self._king_capture_score - ply - 1
+
+        original_alpha = alpha
+        best_score = -self._king_capture_score - 1
+        best_move = None
+        for move in self.order_moves(chessboard, moves, table_move, ply):
+            chessboard.make_move(move)
+            score = -self._negamax(chessboard, depth - 1, -beta, -alpha, ply + 1)
+            chessboard.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self._move_orderer.record_cutoff(chessboard, move, depth, ply)
+                        break
+
+        if table is not None:
+            if best_score >= beta:
+                bound = TranspositionTable.LOWER_BOUND
+            elif best_score <= original_alpha:
+                bound = TranspositionTable.UPPER_BOUND
+            else:
+                bound = TranspositionTable.EXACT
+            table.store(key, MoveCodec.encode_move(best_move), self._score_to_table(best_score, ply), depth, bound)
+        return best_score
+
+    def _quiesce(self, chessboard, alpha, beta, ply, quiescence_ply):
+        """
+        Searches captures until the position is quiet, the player to move may always stand pat on the evaluation
+        :param chessboard: chessboard object
+        :param alpha: lower bound of the search window
+        :param beta: upper bound of the search window
+        :param ply: distance from the root
+        :param quiescence_ply: distance from the horizon
+        :return: score from the point of view of the player to move
+        """
+        self._nodes += 1
+        self._quiescence_nodes += 1
+        self._quiescence_budget -= 1
+        if self._nodes % self._check_interval == 0:
+            self._check_limits()
+
+        # The previous capture took our King
+        if chessboard.get_game_manager().get_game_state() != 'UNFINISHED':
+            return -(self._king_capture_score - ply)
+
+        stand_pat = self._evaluator.evaluate(chessboard)
+        if stand_pat >= beta:
+            return stand_pat
+        if quiescence_ply >= self._quiescence_depth or self._quiescence_budget <= 0:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = chessboard.generate_captures()
+        if self.find_king_capture(chessboard, captures) is not None:
+            return self._king_capture_score - ply - 1
+        moves = self.order_moves(chessboard, captures, None, ply)
+        if self._quiescence_entries:
+            moves.extend(self._attacking_entries(chessboard))
+
+        best_score = stand_pat
+        piece_values = Evaluator.get_piece_values()
+        for move in moves:
+            # Delta pruning: skip captures that cannot raise alpha even with a margin for positional gains
+            if len(move[0]) == 2:
+                victim_value = piece_values[chessboard.get_piece(move[1]).upper()]
+                if stand_pat + victim_value + self._delta_margin <= alpha:
+                    continue
+            chessboard.make_move(move)
+            score = -self._quiesce(chessboard, -beta, -alpha, ply + 1, quiescence_ply + 1)
+            chessboard.unmake_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    @staticmethod
+    def _attacking_entries(chessboard):
+        """
+        :param chessboard: chessboard object
+        :return: fairy piece entries that would attack one of the opponent's pieces from their entry square
+        """
+        position = chessboard.get_position()
+        square_indexes = GameManager.get_square_index_mapping()
+        opponent = 'BLACK' if chessboard.get_game_manager().get_current_player() == 'WHITE' else 'WHITE'
+        opponent_mask = position.get_colour_mask(opponent)
+        occupied = position.get_occupied()
+        entries = []
+        for fairy_piece, destination in MoveGenerator.generate_fairy_entries(chessboard):
+            square = square_indexes[destination]
+            attacks = AttackTables.slider_attacks(square, AttackTables.get_piece_directions(fairy_piece),
+                                                  occupied | 1 << square)
+            if attacks & opponent_mask:
+                entries.append((fairy_piece, destination))
+        return entries
+
+    def get_quiescence_nodes(self):
+        """
+        :return: number of positions the last search visited in quiescence, included in its node count
+        """
+        return self._quiescence_nodes
+
+    def _probe_move(self, chessboard):
+        """
+        :param chessboard: chessboard object
+        :return: best move stored for the current position, None if there is none
+        """
+        if self._transposition_table is None:
+            return None
+        entry = self._transposition_table.probe(chessboard.get_hash_key())
+        return MoveCodec.decode_move(entry[0]) if entry is not None else None
+
+    def _tablebase_score(self, value, ply):
+        """
+        :param value: value of the position stored in the tablebase
+        :param ply: distance from the root
+        :return: score of the position, wins and losses scored like the King captures they end in
+        """
+        result, plies = self._tablebase.get_result(value)
+        if result == 'WIN':
+            return self._king_capture_score - ply - plies
+        if result == 'LOSS':
+            return -(self._king_capture_score - ply - plies)
+        return 0
+
+    def _score_to_table(self, score, ply):
+        """
+        King capture scores count plies from the root, the table stores them counted from the position itself
+        :param score: score from the search
+        :param ply: distance from the root
+        :return: score to store
+        """
+        if score >= self._king_capture_score - 1000:
+            return score + ply
+        if score <= -self._king_capture_score + 1000:
+            return score - ply
+        return score
+
+    def _score_from_table(self, score, ply):
+        """
+        :param score: score read from the table
+        :param ply: distance from the root
+        :return: score counted from the root again
+        """
+        if score >= self._king_capture_score - 1000:
+            return score - ply
+        if score <= -self._king_capture_score + 1000:
+            return score + ply
+        return score
+
+    def _check_limits(self):
+        """
+        Raises SearchTimeout once the time or node budget is used up or a stop was requested
+        :return: None
+        """
+        if self._stop_requested:
+            raise SearchTimeout()
+        if self._node_budget is not None and self._nodes >= self._node_budget:
+            raise SearchTimeout()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+
+    @staticmethod
+    def find_king_capture(chessboard, moves):
+        """
+        :param chessboard: chessboard object
+        :param moves: moves available to the player to move
+        :return: the move capturing the opponent's King, None if there is none
+        """
+        king = 'k' if chessboard.get_game_manager().get_current_player() == 'WHITE' else 'K'
+        king_squares = chessboard.get_piece_squares(king)
+        if not king_squares:
+            return None
+        king_square = GameManager.get_square_names()[next(iter(king_squares))]
+        for move in moves:
+            if move[1] == king_square and len(move[0]) == 2:
+                return move
+        return None
+
+    def order_moves(self, chessboard, moves, first_move=None, ply=0):
+        """
+        :param chessboard: chessboard object
+        :param moves: moves to order
+        :param first_move: move to try before all others (such as the transposition table move), if it is in moves
+        :param ply: distance from the root
+        :return: new ordered list of moves, see MoveOrderer.order_moves
+        """
+        return self._move_orderer.order_moves(chessboard, moves, first_move, ply)
@@ -0,0 +1,246 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Position search index over archived Falcon - Hunter chess games
+
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from Falcon_Hunter_Archive import ArchiveReader
+from Falcon_Hunter_Chess import Chessboard, GameError, MoveCodec, PositionNotation
+
+
+class PositionIndex:
+    """
+    Finds the archived games that reached a position, keyed by the position hash key, which covers the pieces, the
+    side to move, the fairy pieces already entered and the sides allowed to enter them
+    The index file is a 16 byte header (magic, version and entry count) followed by one 16 byte entry for every
+    position of every game: hash key, game number, ply and the code of the move played next (0 once the game ended
+    there), sorted by hash key then game and ply. Entries are big-endian so sorting the raw bytes sorts them by key,
+    which lets the builder merge sorted runs without unpacking them
+    The file is memory mapped and a lookup is a binary search, so no game is replayed to answer a query
+    """
+    _magic = b'FHPI'
+    _version = 1
+    _header = struct.Struct('<4sHxxQ')
+    _entry = struct.Struct('>QIHH')
+    _key = struct.Struct('>Q')
+
+    def __init__(self, path, archive=None):
+        """
+        :param path: path of the index file
+        :param archive: ArchiveReader of the indexed games, only needed for results in next_moves
+        """
+        self._archive = archive
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._entry_count = self._header.unpack_from(self._map, 0)
+        if magic != self._magic or version != self._version:
+            raise ValueError(f"{path} is not a version {self._version} position index")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """
+        :return: number of indexed positions, one per ply of every game plus its final position
+        """
+        return self._entry_count
+
+    @classmethod
+    def build(cls, archive, path, run_entries=1 << 20):
+        """
+        Indexes every position of every archived game in one pass over the archive
+        Entries are sorted in runs of run_entries that are written to temporary files and merged at the end, so
+        memory use does not grow with the size of the archive
+        :param archive: ArchiveReader of the games to index
+        :param path: path of the index file to write
+        :param run_entries: entries sorted in memory at a time
+        :return: number of entries written
+        """
+        pack = cls._entry.pack
+        decode_move = MoveCodec.decode_move
+        run_paths = []
+        entries = []
+        entry_count = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            for game_number, (codes, _) in enumerate(archive):
+                chessboard = Chessboard()
+                for ply, code in enumerate(codes):
+                    entries.append(pack(chessboard.get_hash_key(), game_number, ply, code))
+                    chessboard.make_move(decode_move(code))
+                entries.append(pack(chessboard.get_hash_key(), game_number, len(codes), 0))
+                if len(entries) >= run_entries:
+                    run_paths.append(cls._write_run(entries, directory))
+                    entry_count += len(entries)
+                    entries = []
+            entry_count += len(entries)
+            entries.sort()
+
+            # The last run stays in memory and is merged with the ones on disk
+            runs = [cls._read_run(run_path) for run_path in run_paths]
+            with open(path, 'wb', buffering=1 << 20) as index_file:
+                index_file.write(cls._header.pack(cls._magic, cls._version, entry_count))
+                for entry in heapq.merge(entries, *runs):
+                    index_file.write(entry)
+        finally:
+            for run_path in run_paths:
+                os.remove(run_path)
+        return entry_count
+
+    @staticmethod
+    def _write_run(entries, directory):
+        """
+        :param entries: packed entries, sorted in place
+        :param directory: directory to write the run in
+        :return: path of a temporary file holding the sorted entries
+        """
+        entries.sort()
+        run_file = tempfile.NamedTemporaryFile('wb', dir=directory, suffix='.run', delete=False)
+        with run_file:
+            run_file.write(b''.join(entries))
+        return run_file.name
+
+    @classmethod
+    def _read_run(cls, path):
+        """
+        :param path: path of a run file
+        :return: generator of its packed entries
+        """
+        size = cls._entry.size
+        with open(path, 'rb') as run_file:
+            while True:
+                block = run_file.read(size << 12)
+                if not block:
+                    break
+                for offset in range(0, len(block), size):
+                    yield block[offset:offset + size]
+
+    def _lower_bound(self, key):
+        """
+        :param key: 64-bit position hash key
+        :return: number of the first entry whose key is not below key
+        """
+        unpack_from = self._key.unpack_from
+        header_size = self._header.size
+        entry_size = self._entry.size
+        low = 0
+        high = self._entry_count
+        while low < high:
+            middle = (low + high) >> 1
+            if unpack_from(self._map, header_size + middle * entry_size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, key):
+        """
+        :param key: 64-bit position hash key, e.g. chessboard.get_hash_key()
+        :return: list of (game number, ply, next move code) tuples for every time an archived game reached the position
+        """
+        unpack_from = self._entry.unpack_from
+        header_size = self._header.size
+        entry_size = self._entry.size
+        matches = []
+        for entry_number in range(self._lower_bound(key), self._entry_count):
+            entry_key, game_number, ply, code = unpack_from(self._map, header_size + entry_number * entry_size)
+            if entry_key != key:
+                break
+            matches.append((game_number, ply, code))
+        return matches
+
+    def find_games(self, chessboard):
+        """
+        :param chessboard: chessboard holding the position to look up
+        :return: sorted list of the numbers of the games that reached the position
+        """
+        return sorted({game_number for game_number, _, _ in self.find(chessboard.get_hash_key())})
+
+    def next_moves(self, chessboard):
+        """
+        Opening statistics for a position: every move played from it in the archive, with the results of those games
+        A game that reached the position more than once counts once for each move it played there
+        :param chessboard: chessboard holding the position to look up
+        :return: dictionary of move to a dictionary of 'games' and the count of each result, most played first
+        """
+        if self._archive is None:
+            raise ValueError("Results need the archive the index was built from")
+        results = self._archive.get_results()
+        statistics = {}
+        seen = set()
+        for game_number, _, code in self.find(chessboard.get_hash_key()):
+            if not code or (game_number, code) in seen:
+                continue
+            seen.add((game_number, code))
+            move = MoveCodec.decode_move(code)
+            if move not in statistics:
+                statistics[move] = dict.fromkeys(['games'] + results, 0)
+            statistics[move]['games'] += 1
+            statistics[move][self._archive.get_codes(game_number)[1]] += 1
+        return dict(sorted(statistics.items(), key=lambda item: -item[1]['games']))
+
+    def close(self):
+        """
+        :return: None
+        """
+        self._map.close()
+        self._file.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status, 1 if the position to query is invalid
+    """
+    parser = argparse.ArgumentParser(description="Index archived games by position and look positions up")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help="index every position of an archive")
+    build_parser.add_argument('archive', help="game archive to index")
+    build_parser.add_argument('index', help="index file to write")
+    query_parser = commands.add_parser('query', help="list the games and next moves for a position")
+    query_parser.add_argument('archive', help="game archive the index was built from")
+    query_parser.add_argument('index', help="index file")
+    position_group = query_parser.add_mutually_exclusive_group()
+    position_group.add_argument('--moves', default='', help="moves from the starting position, e.g. 'e2, e4; e7, e5'")
+    position_group.add_argument('--position', help="position in the saved position notation")
+    args = parser.parse_args(argv)
+
+    with ArchiveReader(args.archive) as archive:
+        if args.command == 'build':
+            entry_count = PositionIndex.build(archive, args.index)
+            print(f"Indexed {entry_count} positions from {len(archive)} games", file=sys.stderr)
+            return 0
+
+        try:
+            if args.position:
+                chessboard = PositionNotation.from_text(args.position)
+            else:
+                chessboard = Chessboard()
+                chessboard.apply_moves(PositionNotation.parse_moves(args.moves) if args.moves.strip() else [])
+        except GameError as error:
+            print(f"Invalid position: {error}", file=sys.stderr)
+            return 1
+
+        with PositionIndex(args.index, archive) as index:
+            games = index.find_games(chessboard)
+            print(f"{len(games)} games reached {PositionNotation.to_text(chessboard)}")
+            for move, statistics in index.next_moves(chessboard).items():
+                print(f"  {move[0].lower() if len(move[0]) == 2 else move[0]}, {move[1].lower()}: "
+                      f"{statistics['games']} games, White won {statistics['WHITE_WON']}, "
+                      f"Black won {statistics['BLACK_WON']}, drawn {statistics['DRAW']}, "
+                      f"unfinished {statistics['UNFINISHED']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
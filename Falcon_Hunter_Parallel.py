@@ -0,0 +1,218 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Lazy SMP parallel search across CPU cores for the Falcon - Hunter chess variant
+
+import argparse
+import multiprocessing
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+from Falcon_Hunter_Chess import PositionNotation
+from Falcon_Hunter_Engine import SearchEngine, SearchResult, TranspositionTable
+from Falcon_Hunter_Perft import Perft
+
+
+class ParallelSearch:
+    """
+    Lazy SMP: several worker processes search the same root position at once and share one transposition table kept
+    in shared memory, so results found by one worker cut the searches of the others short
+    Worker 0 is the main search. Helpers start every other one a ply deeper and shuffle the root moves after the table
+    move with their own seed, so they explore the tree in a different order and fill the table ahead of the main
+    search. When the main search finishes the helpers are stopped and the deepest completed result is returned,
+    preferring the main search on equal depth
+    Workers are started once and reused for every search. Table entries are written without locking, a torn entry can
+    at worst give a wrong bound for one position and its move is only tried when it is legal there
+    Offers the same search method as SearchEngine, so it can seat the computer opponent
+    """
+
+    def __init__(self, workers=None, time_limit=1.0, max_depth=64, hash_size_mb=64, book=None, **engine_settings):
+        """
+        :param workers: number of worker processes, defaults to the number of CPU cores
+        :param time_limit: hard limit in seconds for each move, None for no limit
+        :param max_depth: deepest iteration searched
+        :param hash_size_mb: size of the shared transposition table
+        :param book: OpeningBook consulted before the workers are asked to search
+        :param engine_settings: other SearchEngine keyword arguments used by every worker, e.g. {'quiescence': False},
+        with the directory of a tablebase as 'tablebase'
+        """
+        self._workers = workers if workers else multiprocessing.cpu_count()
+        self._time_limit = time_limit
+        self._max_depth = max_depth
+        self._book = book
+
+        table_bytes = TranspositionTable.get_buffer_size(hash_size_mb)
+        self._shared_table = shared_memory.SharedMemory(create=True, size=table_bytes)
+        self._shared_table.buf[:table_bytes] = bytes(table_bytes)
+        self._stop_event = multiprocessing.Event()
+
+        self._connections = []
+        self._processes = []
+        for worker_index in range(self._workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=ParallelSearch._run_worker,
+                args=(worker_index, worker_connection, self._shared_table.name, hash_size_mb, engine_settings,
+                      self._stop_event),
+                daemon=True,
+            )
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_workers(self):
+        """
+        :return: number of worker processes
+        """
+        return self._workers
+
+    def stop(self):
+        """
+        Asks a running search to return its best move so far, safe to call from another thread
+        :return: None
+        """
+        self._stop_event.set()
+
+    def search(self, chessboard, time_limit=None, max_depth=None):
+        """
+        Searches the chessboard's current position with every worker, the chessboard itself is not changed
+        :param chessboard: chessboard object
+        :param time_limit: overrides the time limit for this search
+        :param max_depth: overrides the maximum depth for this search
+        :return: SearchResult of the deepest completed search, with the nodes of every worker added up
+        """
+        start_time = time.perf_counter()
+        time_limit = self._time_limit if time_limit is None else time_limit
+        max_depth = self._max_depth if max_depth is None else max_depth
+
+        if self._book is not None:
+            book_move = self._book.choose_move(chessboard)
+            if book_move is not None:
+                return SearchResult(book_move, 0, 0, 0, time.perf_counter() - start_time, False)
+
+        position = PositionNotation.to_text(chessboard)
+        self._stop_event.clear()
+        for connection in self._connections:
+            connection.send((position, time_limit, max_depth))
+
+        results = [connection.recv() for connection in self._connections]
+        nodes = sum(result[3] for result in results)
+        # Deepest completed search first, the main search on equal depth
+        best_move, score, depth, _, _, stopped = max(results, key=lambda result: result[2])
+        return SearchResult(best_move, score, depth, nodes, time.perf_counter() - start_time, stopped)
+
+    def close(self):
+        """
+        Shuts the workers down and frees the shared transposition table
+        :return: None
+        """
+        if not self._processes:
+            return
+        self._stop_event.set()
+        for connection in self._connections:
+            connection.send(None)
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+        self._shared_table.close()
+        self._shared_table.unlink()
+
+    @staticmethod
+    def _run_worker(worker_index, connection, table_name, hash_size_mb, engine_settings, stop_event):
+        """
+        Worker process loop: searches every position it is sent until it is sent None
+        :param worker_index: 0 for the main search, helpers vary their start depth and root move order by index
+        :param connection: pipe end to receive (position text, time limit, max depth) and send results on
+        :param table_name: name of the shared memory block holding the transposition table
+        :param hash_size_mb: size of the transposition table
+        :param engine_settings: SearchEngine keyword arguments
+        :param stop_event: event set to stop the current search
+        :return: None
+        """
+        shared_table = shared_memory.SharedMemory(name=table_name)
+        # Tablebases are memory mapped in each worker, the settings only carry their directory
+        engine_settings = dict(engine_settings)
+        if engine_settings.get('tablebase'):
+            from Falcon_Hunter_Tablebase import Tablebase
+            engine_settings['tablebase'] = Tablebase(engine_settings['tablebase'])
+        # No limit of its own, so a task without a time limit really searches to its depth
+        engine = SearchEngine(time_limit=None, transposition_table=TranspositionTable(hash_size_mb,
+                                                                                      buffer=shared_table.buf),
+                              **engine_settings)
+        start_depth = 1 + worker_index % 2
+        shuffle_seed = worker_index if worker_index else None
+
+        def stop_when_signalled():
+            stop_event.wait()
+            engine.stop()
+
+        while True:
+            task = connection.recv()
+            if task is None:
+                break
+            position, time_limit, max_depth = task
+
+            # The engine is stopped from a thread once the main search is done or a stop is requested. The thread is
+            # joined before replying so it cannot stop the next search
+            watcher = threading.Thread(target=stop_when_signalled, daemon=True)
+            watcher.start()
+            result = engine.search(PositionNotation.from_text(position), time_limit=time_limit, max_depth=max_depth,
+                                   start_depth=start_depth, shuffle_seed=shuffle_seed)
+            if worker_index == 0:
+                stop_event.set()
+            watcher.join()
+            connection.send((result.get_best_move(), result.get_score(), result.get_depth(), result.get_nodes(),
+                             result.get_elapsed(), result.was_stopped()))
+
+        # The table's view of the buffer must go before the shared memory can be closed
+        del engine
+        shared_table.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point, compares the parallel search against a single SearchEngine on the perft test positions
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status
+    """
+    parser = argparse.ArgumentParser(description="Compare the parallel search against a single search")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="number of worker processes (default the number of CPU cores)")
+    parser.add_argument('--depth', type=int, default=5, help="depth to search to (default 5)")
+    parser.add_argument('--position', default='all', choices=['all'] + sorted(Perft.get_positions()),
+                        help="test position to search (default all)")
+    parser.add_argument('--hash', type=int, default=64, help="transposition table MB (default 64)")
+    args = parser.parse_args(argv)
+
+    position_names = sorted(Perft.get_positions()) if args.position == 'all' else [args.position]
+    totals = {'single': [0, 0.0], 'parallel': [0, 0.0]}
+    with ParallelSearch(args.workers, time_limit=None, max_depth=args.depth, hash_size_mb=args.hash) as parallel:
+        for position_name in position_names:
+            chessboard = Perft.setup_position(position_name)
+            single = SearchEngine(time_limit=None, max_depth=args.depth, hash_size_mb=args.hash)
+            for name, result in (('single', single.search(chessboard)), ('parallel', parallel.search(chessboard))):
+                totals[name][0] += result.get_nodes()
+                totals[name][1] += result.get_elapsed()
+                print(f"{position_name:14} {name:8} depth {result.get_depth()}: {result.get_nodes():>9} nodes "
+                      f"{result.get_elapsed():8.3f}s {result.get_nodes_per_second():>9.0f} nodes/s  "
+                      f"best {result.get_best_move()} score {result.get_score()}")
+
+    (single_nodes, single_elapsed), (parallel_nodes, parallel_elapsed) = totals['single'], totals['parallel']
+    single_speed = single_nodes / max(single_elapsed, 1e-9)
+    parallel_speed = parallel_nodes / max(parallel_elapsed, 1e-9)
+    print(f"{args.workers} workers at depth {args.depth}: {single_elapsed / max(parallel_elapsed, 1e-9):.2f}x time to "
+          f"depth, {parallel_speed:.0f} nodes/s against {single_speed:.0f} nodes/s "
+          f"({parallel_speed / max(single_speed, 1e-9):.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Perft move generation benchmark and correctness check for the Falcon - Hunter chess variant
+
+import argparse
+import sys
+import time
+
+from Falcon_Hunter_Chess import Chessboard, GameError, GameManager, PositionNotation
+
+
+class Perft:
+    """
+    Counts the leaf nodes of the move tree to a fixed depth
+    A captured King ends the game, so positions after a King capture have no moves and add nothing to deeper counts
+    Moves are either generated by the move generator and made with make_move, or found by the validators: every piece
+    of the player to move is tried on every square, and every fairy piece in reserve on every square, through
+    set_piece / set_fairy_piece, down to the leaves. Validated counts then only match the reference counts if the
+    Pieces and PathChecker validators accept exactly the legal moves, and every position where the validators and the
+    move generator disagree is recorded
+    """
+    # Test positions as the moves played from the starting position, with reference counts for each depth
+    _positions = {
+        'start': {
+            'moves': [],
+            'counts': {1: 20, 2: 400, 3: 8902, 4: 197750, 5: 4898614},
+        },
+        # White has lost a Knight and may enter a Falcon or Hunter on the home two ranks
+        'fairy-entry': {
+            'moves': [('B1', 'C3'), ('D7', 'D5'), ('C3', 'D5'), ('D8', 'D5'), ('E2', 'E4'), ('D5', 'D6')],
+            'counts': {1: 33, 2: 1501, 3: 51453},
+        },
+        # Both sides have entered a fairy piece and each still holds one in reserve
+        'fairy-midgame': {
+            'moves': [('B1', 'C3'), ('D7', 'D5'), ('C3', 'D5'), ('D8', 'D5'), ('E2', 'E4'), ('D5', 'D6'),
+                      ('F', 'E2'), ('C8', 'G4'), ('E2', 'G4'), ('h', 'D7')],
+            'counts': {1: 33, 2: 1301, 3: 43815},
+        },
+    }
+
+    def __init__(self, validated=False):
+        """
+        :param validated: True to find and make every move through set_piece / set_fairy_piece instead of the move
+        generator and make_move
+        """
+        self._validated = validated
+        self._disagreements = []
+
+    @classmethod
+    def get_positions(cls):
+        """
+        :return: mapping of test position name to its moves from the starting position and reference counts
+        """
+        return cls._positions
+
+    def get_disagreements(self):
+        """
+        :return: list of (position text, moves only the validators accept, moves only the move generator makes)
+        tuples found by validated runs
+        """
+        return self._disagreements
+
+    @classmethod
+    def setup_position(cls, name):
+        """
+        Builds a chessboard for one of the test positions
+        :param name: name of the test position
+        :return: chessboard object
+        """
+        chessboard = Chessboard()
+        chessboard.apply_moves(cls._positions[name]['moves'])
+        return chessboard
+
+    def perft(self, chessboard, depth):
+        """
+        Counts the positions reached after exactly depth moves, the chessboard is left as it was found
+        :param chessboard: chessboard object
+        :param depth: number of moves to look ahead
+        :return: number of leaf nodes
+        """
+        if depth == 0:
+            return 1
+        moves = self._generate_moves(chessboard)
+        if depth == 1:
+            return len(moves)
+
+        nodes = 0
+        for move in moves:
+            self._make_move(chessboard, move)
+            nodes += self.perft(chessboard, depth - 1)
+            chessboard.unmake_move()
+        return nodes
+
+    def divide(self, chessboard, depth):
+        """
+        Splits the perft count by the first move
+        :param chessboard: chessboard object
+        :param depth: number of moves to look ahead, at least 1
+        :return: dictionary of first move to the number of leaf nodes below it
+        """
+        counts = {}
+        for move in self._generate_moves(chessboard):
+            self._make_move(chessboard, move)
+            counts[move] = self.perft(chessboard, depth - 1)
+            chessboard.unmake_move()
+        return counts
+
+    def _generate_moves(self, chessboard):
+        """
+        :param chessboard: chessboard object
+        :return: list of moves from the move generator, or the moves the validators accept when validating
+        """
+        if not self._validated:
+            return chessboard.generate_moves()
+        # A captured King ends the game, set_piece itself does not check for it
+        if chessboard.get_game_manager().get_game_state() != 'UNFINISHED':
+            return []
+
+        current_player = chessboard.get_game_manager().get_current_player()
+        names = GameManager.get_square_names()
+        own_mask = chessboard.get_position().get_colour_mask(current_player)
+        moves = []
+        for source_index, source in enumerate(names):
+            if not own_mask >> source_index & 1:
+                continue
+            for destination in names:
+                try:
+                    made = chessboard.set_piece(source, destination)
+                except GameError:
+                    continue
+                if made:
+                    chessboard.unmake_move()
+                    moves.append((source, destination))
+        for fairy_piece in ('F', 'H') if current_player == 'WHITE' else ('f', 'h'):
+            if fairy_piece in chessboard.get_entered_fairy_pieces():
+                continue
+            for destination in names:
+                try:
+                    made = chessboard.set_fairy_piece(fairy_piece, destination)
+                except GameError:
+                    continue
+                if made:
+                    chessboard.unmake_move()
+                    moves.append((fairy_piece, destination))
+
+        generated_moves = set(chessboard.generate_moves())
+        if set(moves) != generated_moves:
+            self._disagreements.append((PositionNotation.to_text(chessboard), sorted(set(moves) - generated_moves),
+                                        sorted(generated_moves - set(moves))))
+        return moves
+
+    def _make_move(self, chessboard, move):
+        """
+        Makes a move, through the validating methods if requested
+        :param chessboard: chessboard object
+        :param move: move from _generate_moves
+        :return: None
+        """
+        if not self._validated:
+            chessboard.make_move(move)
+        elif len(move[0]) == 1:
+            chessboard.set_fairy_piece(move[0], move[1])
+        else:
+            chessboard.set_piece(move[0], move[1])
+
+    def run(self, name, depth, show_divide=False, output=sys.stdout):
+        """
+        Runs perft on a test position, printing the count, speed and whether the reference count matched
+        :param name: name of the test position
+        :param depth: number of moves to look ahead
+        :param show_divide: True to also print the count below each first move
+        :param output: file to print to
+        :return: True if the count matches the reference count (or there is none), False otherwise
+        """
+        chessboard = self.setup_position(name)
+        disagreement_count = len(self._disagreements)
+        start_time = time.perf_counter()
+        if show_divide and depth > 0:
+            counts = self.divide(chessboard, depth)
+            nodes = sum(counts.values())
+        else:
+            counts = None
+            nodes = self.perft(chessboard, depth)
+        elapsed = time.perf_counter() - start_time
+
+        if counts is not None:
+            for move in sorted(counts):
+                print(f"  {move[0]}, {move[1]}: {counts[move]}", file=output)
+
+        expected = self._positions[name]['counts'].get(depth)
+        if expected is None:
+            status = "no reference"
+        elif expected == nodes:
+            status = "ok"
+        else:
+            status = f"MISMATCH, expected {expected}"
+        nodes_per_second = nodes / elapsed if elapsed > 0 else 0.0
+        print(f"{name} depth {depth}: {nodes} nodes in {elapsed:.3f}s ({nodes_per_second:,.0f} nodes/sec) {status}",
+              file=output)
+
+        # Positions where the validators and the move generator disagree, only found by validated runs
+        disagreements = self._disagreements[disagreement_count:]
+        for position, validator_only, generator_only in disagreements[:10]:
+            print(f"  validators disagree with the move generator in {position}: only validators accept "
+                  f"{validator_only}, only generated {generator_only}", file=output)
+        if len(disagreements) > 10:
+            print(f"  ... and {len(disagreements) - 10} more positions", file=output)
+        return (expected is None or expected == nodes) and not disagreements
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status, 1 if any count did not match its reference count
+    """
+    parser = argparse.ArgumentParser(description="Count move tree leaf nodes to measure move generation speed")
+    parser.add_argument('--position', default='all', choices=['all'] + sorted(Perft.get_positions()),
+                        help="test position to run (default all)")
+    parser.add_argument('--depth', type=int,
+                        help="depth to search (default every depth with a reference count)")
+    parser.add_argument('--divide', action='store_true',
+                        help="print the count below each first move")
+    parser.add_argument('--validated', action='store_true',
+                        help="find and make every move through set_piece / set_fairy_piece to check and benchmark "
+                             "the Pieces and PathChecker validators")
+    args = parser.parse_args(argv)
+
+    names = sorted(Perft.get_positions()) if args.position == 'all' else [args.position]
+    perft = Perft(validated=args.validated)
+    all_matched = True
+    for name in names:
+        depths = [args.depth] if args.depth is not None else sorted(Perft.get_positions()[name]['counts'])
+        for depth in depths:
+            all_matched = perft.run(name, depth, args.divide) and all_matched
+    return 0 if all_matched else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
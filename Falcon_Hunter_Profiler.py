@@ -0,0 +1,421 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Opt-in instrumentation of the Falcon - Hunter chess rules engine hot paths
+
+import argparse
+import functools
+import io
+import json
+import random
+import sys
+import time
+
+import Falcon_Hunter_Chess
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies in nanoseconds: every power of two is split into 8 buckets, so a percentile is
+    within an eighth of the true value while the memory used stays fixed however many latencies are recorded
+    """
+    _sub_buckets = 8
+    _sub_bucket_bits = 3
+
+    def __init__(self):
+        """
+        Starts empty, buckets are only stored once a latency falls in them
+        """
+        self._counts = {}
+        self._count = 0
+        self._total = 0
+        self._max = 0
+
+    def record(self, nanoseconds):
+        """
+        :param nanoseconds: latency to add
+        :return: None
+        """
+        if nanoseconds < self._sub_buckets:
+            bucket = nanoseconds
+        else:
+            exponent = nanoseconds.bit_length() - self._sub_bucket_bits - 1
+            bucket = ((exponent + 1) << self._sub_bucket_bits) + (nanoseconds >> exponent) - self._sub_buckets
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self._count += 1
+        self._total += nanoseconds
+        if nanoseconds > self._max:
+            self._max = nanoseconds
+
+    @classmethod
+    def get_bucket_limit(cls, bucket):
+        """
+        :param bucket: bucket number
+        :return: largest latency in nanoseconds that falls in the bucket
+        """
+        if bucket < cls._sub_buckets:
+            return bucket
+        exponent = (bucket >> cls._sub_bucket_bits) - 1
+        mantissa = (bucket & (cls._sub_buckets - 1)) + cls._sub_buckets
+        return ((mantissa + 1) << exponent) - 1
+
+    def get_count(self):
+        """
+        :return: number of latencies recorded
+        """
+        return self._count
+
+    def get_percentile(self, percent):
+        """
+        :param percent: percentile to read, e.g. 99
+        :return: latency in nanoseconds that percent of the recorded latencies do not exceed, 0 if none were recorded
+        """
+        if not self._count:
+            return 0
+        rank = max(1, -(-self._count * percent // 100))
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                return min(self.get_bucket_limit(bucket), self._max)
+        return self._max
+
+    def to_dict(self):
+        """
+        :return: summary in microseconds and the non-empty buckets keyed by their upper limit, ready for JSON
+        """
+        return {
+            'count': self._count,
+            'mean_us': round(self._total / self._count / 1000, 3) if self._count else 0.0,
+            'p50_us': self.get_percentile(50) / 1000,
+            'p90_us': self.get_percentile(90) / 1000,
+            'p99_us': self.get_percentile(99) / 1000,
+            'max_us': self._max / 1000,
+            'buckets_us': {f'{self.get_bucket_limit(bucket) / 1000:g}': self._counts[bucket]
+                           for bucket in sorted(self._counts)},
+        }
+
+
+class RulesProfiler:
+    """
+    Opt-in instrumentation of the rules engine: call counts and cumulative time of the move validation, path checking,
+    move making and rendering methods, latency histograms of validated moves, and rejected moves counted by reason
+    enable swaps timing wrappers in for the instrumented methods on their classes and disable puts the original
+    methods back, so while the profiler is disabled the rules engine runs exactly its own code and pays nothing
+    Times are inclusive: get_valid_move's time includes the valid_*_move call it makes, and so on
+    Rejections are counted from set_piece / set_fairy_piece calls that fail, classified with MoveGenerator.check_move,
+    and from check_move calls that return a reason, such as the game server's
+    """
+    # Methods timed, by class name, a trailing '*' matches every method starting with the prefix
+    _timed_methods = (
+        ('Pieces', 'get_valid_move'),
+        ('Pieces', 'valid_*'),
+        ('PathChecker', 'get_valid_path'),
+        ('PathChecker', 'check_*'),
+        ('BoardRenderer', 'render'),
+        ('BoardRenderer', 'render_frame'),
+    )
+
+    # Validated move methods, also recorded in the latency histograms and classified when they reject a move
+    _move_methods = (
+        ('Chessboard', 'set_piece'),
+        ('Chessboard', 'set_fairy_piece'),
+    )
+
+    def __init__(self, rules=None):
+        """
+        :param rules: module holding the rules engine classes, Falcon_Hunter_Chess if not given. Pass the running
+        module when Falcon_Hunter_Chess is run as a script, its classes are then not the imported module's
+        """
+        self._rules = rules if rules is not None else Falcon_Hunter_Chess
+        self._originals = []
+        self._calls = {}
+        self._histograms = {}
+        self._rejected = {}
+        self._start_time = time.perf_counter()
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    def is_enabled(self):
+        """
+        :return: True while the instrumented methods are wrapped
+        """
+        return bool(self._originals)
+
+    def enable(self):
+        """
+        Wraps the instrumented methods, counts already recorded are kept
+        :return: None
+        """
+        if self._originals:
+            return
+        move_generator = getattr(self._rules, 'MoveGenerator')
+        check_move = move_generator.__dict__['check_move']
+        self._wrap(move_generator, 'check_move', self._checked(check_move.__func__))
+        for class_name, pattern in self._timed_methods:
+            rules_class = getattr(self._rules, class_name)
+            for name in self._match(rules_class, pattern):
+                descriptor = rules_class.__dict__[name]
+                if isinstance(descriptor, staticmethod):
+                    self._wrap(rules_class, name, staticmethod(self._timed(f'{class_name}.{name}',
+                                                                            descriptor.__func__)))
+                else:
+                    self._wrap(rules_class, name, self._timed(f'{class_name}.{name}', descriptor))
+        for class_name, name in self._move_methods:
+            rules_class = getattr(self._rules, class_name)
+            self._wrap(rules_class, name, self._timed_move(name, rules_class.__dict__[name], check_move.__func__))
+
+    def disable(self):
+        """
+        Puts the original methods back, the recorded counts stay until reset
+        :return: None
+        """
+        while self._originals:
+            rules_class, name, descriptor = self._originals.pop()
+            setattr(rules_class, name, descriptor)
+
+    def reset(self):
+        """
+        Clears every count, histogram and rejection, also while enabled
+        :return: None
+        """
+        for stats in self._calls.values():
+            stats[0] = stats[1] = 0
+        for name in self._histograms:
+            self._histograms[name] = LatencyHistogram()
+        self._rejected.clear()
+        self._start_time = time.perf_counter()
+
+    def get_calls(self):
+        """
+        :return: dictionary of 'Class.method' to (calls, cumulative seconds), most time first
+        """
+        return dict(sorted(((name, (calls, nanoseconds / 1e9)) for name, (calls, nanoseconds) in self._calls.items()
+                            if calls), key=lambda item: -item[1][1]))
+
+    def get_histogram(self, name):
+        """
+        :param name: 'moves' for every validated move, 'set_piece', 'set_fairy_piece' or 'rejected'
+        :return: LatencyHistogram, None if no move of that kind was recorded
+        """
+        return self._histograms.get(name)
+
+    def get_rejected(self):
+        """
+        :return: dictionary of MoveStatus reason name to the number of moves rejected for it, most common first
+        """
+        return dict(sorted(self._rejected.items(), key=lambda item: -item[1]))
+
+    def to_dict(self):
+        """
+        :return: everything recorded since the last reset, ready for JSON
+        """
+        return {
+            'enabled': self.is_enabled(),
+            'elapsed_seconds': round(time.perf_counter() - self._start_time, 3),
+            'calls': {name: {'calls': calls, 'total_ms': round(seconds * 1000, 3),
+                             'mean_us': round(seconds * 1e6 / calls, 3)}
+                      for name, (calls, seconds) in self.get_calls().items()},
+            'move_latency': {name: histogram.to_dict() for name, histogram in self._histograms.items()
+                             if histogram.get_count()},
+            'rejected': self.get_rejected(),
+        }
+
+    def to_json(self):
+        """
+        :return: to_dict as indented JSON text
+        """
+        return json.dumps(self.to_dict(), indent=2)
+
+    def write_json(self, path):
+        """
+        :param path: file to write the JSON report to
+        :return: None
+        """
+        with open(path, 'w') as report_file:
+            report_file.write(self.to_json() + '\n')
+
+    @staticmethod
+    def _match(rules_class, pattern):
+        """
+        :param rules_class: class to look in
+        :param pattern: method name, or a prefix ending in '*'
+        :return: names of the matching methods defined on the class itself
+        """
+        if not pattern.endswith('*'):
+            return [pattern]
+        return [name for name, value in vars(rules_class).items()
+                if name.startswith(pattern[:-1]) and callable(getattr(rules_class, name))]
+
+    def _wrap(self, rules_class, name, wrapper):
+        """
+        :param rules_class: class to patch
+        :param name: method name
+        :param wrapper: replacement, the original is kept for disable
+        :return: None
+        """
+        self._originals.append((rules_class, name, rules_class.__dict__[name]))
+        setattr(rules_class, name, wrapper)
+
+    def _stats(self, name):
+        """
+        :param name: 'Class.method'
+        :return: [calls, cumulative nanoseconds] list, updated in place by the wrappers
+        """
+        return self._calls.setdefault(name, [0, 0])
+
+    def _timed(self, name, function):
+        """
+        :param name: 'Class.method'
+        :param function: original function
+        :return: wrapper counting the calls and their time
+        """
+        stats = self._stats(name)
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += perf_counter_ns() - start
+        return timed
+
+    def _timed_move(self, name, function, check_move):
+        """
+        :param name: method name, also the name of its latency histogram
+        :param function: original set_piece or set_fairy_piece
+        :param check_move: original MoveGenerator.check_move, to classify rejected moves without counting them twice
+        :return: wrapper recording the move's latency, or the reason it was rejected, and returning the original result
+        """
+        stats = self._stats(f'Chessboard.{name}')
+        histograms = self._histograms
+        for histogram_name in ('moves', name, 'rejected'):
+            histograms.setdefault(histogram_name, LatencyHistogram())
+        rejected = self._rejected
+        legal = self._rules.MoveStatus.LEGAL
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(function)
+        def timed_move(chessboard, source, destination):
+            start = perf_counter_ns()
+            made = False
+            try:
+                # The original result is handed back untouched, only a True result counts as a move made
+                result = function(chessboard, source, destination)
+                made = result is True
+                return result
+            finally:
+                elapsed = perf_counter_ns() - start
+                stats[0] += 1
+                stats[1] += elapsed
+                if made:
+                    histograms['moves'].record(elapsed)
+                    histograms[name].record(elapsed)
+                else:
+                    histograms['rejected'].record(elapsed)
+                    status = check_move(chessboard, (source, destination))
+                    reason = status.name if status != legal else 'UNCLASSIFIED'
+                    rejected[reason] = rejected.get(reason, 0) + 1
+        return timed_move
+
+    def _checked(self, check_move):
+        """
+        :param check_move: original MoveGenerator.check_move
+        :return: wrapper timing the checks and counting the reasons moves are rejected for
+        """
+        stats = self._stats('MoveGenerator.check_move')
+        rejected = self._rejected
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(check_move)
+        def checked(chessboard, move):
+            start = perf_counter_ns()
+            status = check_move(chessboard, move)
+            stats[0] += 1
+            stats[1] += perf_counter_ns() - start
+            if status:
+                rejected[status.name] = rejected.get(status.name, 0) + 1
+            return status
+        return staticmethod(checked)
+
+
+def play_workload(games, seed=0, illegal_rate=0.2):
+    """
+    Plays random games through the validated set_piece / set_fairy_piece path, trying a random pseudo move instead of
+    a generated one at the illegal rate, and renders every position
+    :param games: number of games
+    :param seed: random seed, the same seed plays the same games
+    :param illegal_rate: share of attempts that pick two random squares, most of which are rejected
+    :return: number of moves made
+    """
+    rules = Falcon_Hunter_Chess
+    squares = list(rules.GameManager.get_square_index_mapping())
+    rng = random.Random(seed)
+    renderer = rules.BoardRenderer('plain', output=io.StringIO())
+    made = 0
+    for _ in range(games):
+        chessboard = rules.Chessboard()
+        for _ in range(200):
+            if chessboard.get_game_manager().get_game_state() != 'UNFINISHED':
+                break
+            if rng.random() < illegal_rate:
+                source, destination = rng.choice(squares), rng.choice(squares)
+            else:
+                moves = chessboard.generate_moves()
+                if not moves:
+                    break
+                source, destination = rng.choice(moves)
+            try:
+                if len(source) == 1:
+                    entered = chessboard.set_fairy_piece(source, destination)
+                else:
+                    entered = chessboard.set_piece(source, destination)
+            except rules.GameError:
+                continue
+            if entered:
+                made += 1
+                renderer.render(chessboard.get_board())
+    return made
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status
+    """
+    parser = argparse.ArgumentParser(description="Profile the rules engine on random games and report JSON")
+    parser.add_argument('--games', type=int, default=20, help="number of random games to play (default 20)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default 0)")
+    parser.add_argument('--output', help="file to write the JSON report to, standard output if not given")
+    args = parser.parse_args(argv)
+
+    # The same games are played without and then with the instrumentation, to show what it costs while enabled
+    start_time = time.perf_counter()
+    play_workload(args.games, args.seed)
+    plain_time = time.perf_counter() - start_time
+
+    profiler = RulesProfiler()
+    with profiler:
+        start_time = time.perf_counter()
+        made = play_workload(args.games, args.seed)
+        profiled_time = time.perf_counter() - start_time
+
+    if args.output:
+        profiler.write_json(args.output)
+    else:
+        print(profiler.to_json())
+    print(f"{made} moves in {args.games} games: {plain_time:.2f}s disabled, {profiled_time:.2f}s profiled",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Batch replay and validation of recorded Falcon - Hunter chess games
+
+import argparse
+import itertools
+import multiprocessing
+import sys
+
+from Falcon_Hunter_Chess import Chessboard, GameError, MoveStatus, PositionNotation
+
+
+class GameReplayer:
+    """
+    Replays recorded games through the rules engine without any board printing or prompts
+    Games are read one per line with moves in the same notation players type, separated by ';', for example
+    'e2, e4; e7, e5; b1, c3' or 'F, e2' to enter a fairy piece. Blank lines and lines starting with '#' are skipped
+    Lines are read, replayed and reported one batch at a time, so memory use does not grow with the size of the input
+    """
+
+    def __init__(self, processes=1, batch_size=1000):
+        """
+        :param processes: number of worker processes, 1 replays games in this process
+        :param batch_size: number of games read ahead at a time
+        """
+        self._processes = processes
+        self._batch_size = batch_size
+
+    @staticmethod
+    def read_games(lines):
+        """
+        :param lines: iterable of input lines, e.g. an open file
+        :return: generator of (line number, game text) tuples
+        """
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line_number, line
+
+    @staticmethod
+    def replay_game(game):
+        """
+        Plays a recorded game from the starting position, stopping at the first illegal move
+        Moves after a King has been captured are illegal since the game is over
+        :param game: (line number, game text) tuple
+        :return: dictionary with the 'line' number, 'valid' flag, number of 'plies' played and final 'game_state', and
+        for invalid games the 'illegal_ply' number (1 for the first move), the 'move' text and the 'reason'
+        Blank moves, such as after a trailing ';', are skipped like PositionNotation.parse_moves does
+
+        >>> GameReplayer.replay_game((1, 'e2, e4; e7, e5;'))['valid']
+        True
+        >>> result = GameReplayer.replay_game((2, 'e2, e4;; e7, e5; e5, e4'))
+        >>> result['illegal_ply'], result['move'], result['reason']
+        (3, 'e5, e4', 'OPPONENTS_PIECE')
+        """
+        line_number, text = game
+        chessboard = Chessboard()
+        game_manager = chessboard.get_game_manager()
+        result = {'line': line_number, 'valid': True}
+
+        move_texts = [move_text for move_text in text.split(';') if move_text.strip()]
+        for ply, move_text in enumerate(move_texts, 1):
+            try:
+                move = PositionNotation.parse_move(move_text)
+            except GameError:
+                status = None
+            else:
+                status = chessboard.check_move(move)
+            if status != MoveStatus.LEGAL:
+                result['valid'] = False
+                result['illegal_ply'] = ply
+                result['move'] = move_text.strip()
+                result['reason'] = 'UNREADABLE' if status is None else status.name
+                break
+            chessboard.make_move(move)
+
+        result['plies'] = len(chessboard.get_move_history())
+        result['game_state'] = game_manager.get_game_state()
+        return result
+
+    def run(self, lines):
+        """
+        Replays every game, yielding results in input order
+        :param lines: iterable of input lines
+        :return: generator of result dictionaries, see replay_game
+        """
+        games = self.read_games(lines)
+        if self._processes == 1:
+            yield from map(self.replay_game, games)
+            return
+
+        with multiprocessing.Pool(self._processes) as pool:
+            chunk_size = max(1, self._batch_size // (self._processes * 4))
+            while True:
+                batch = list(itertools.islice(games, self._batch_size))
+                if not batch:
+                    break
+                yield from pool.imap(self.replay_game, batch, chunk_size)
+
+    @staticmethod
+    def format_result(result):
+        """
+        :param result: result dictionary from replay_game
+        :return: tab separated report line: line number, OK or ILLEGAL, plies played and game state, followed by the
+        illegal ply, move and reason for invalid games
+        """
+        fields = [str(result['line']), 'OK' if result['valid'] else 'ILLEGAL', str(result['plies']),
+                  result['game_state']]
+        if not result['valid']:
+            fields += [str(result['illegal_ply']), result['move'], result['reason']]
+        return '\t'.join(fields)
+
+
+def main(argv=None):
+    """
+    Command line entry point, writes one report line per game and the totals to stderr
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status, 1 if any game had an illegal move
+    """
+    parser = argparse.ArgumentParser(description="Replay and validate recorded games, one game per line")
+    parser.add_argument('files', nargs='*', default=['-'], help="game files to read, '-' for stdin (default)")
+    parser.add_argument('--processes', type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument('--output', help="file to write the report to (default stdout)")
+    args = parser.parse_args(argv)
+
+    replayer = GameReplayer(args.processes)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    valid_games = 0
+    invalid_games = 0
+    try:
+        for name in args.files:
+            games_file = sys.stdin if name == '-' else open(name)
+            try:
+                for result in replayer.run(games_file):
+                    if result['valid']:
+                        valid_games += 1
+                    else:
+                        invalid_games += 1
+                    output.write(GameReplayer.format_result(result) + '\n')
+            finally:
+                if games_file is not sys.stdin:
+                    games_file.close()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"{valid_games + invalid_games} games: {valid_games} valid, {invalid_games} with an illegal move",
+          file=sys.stderr)
+    return 1 if invalid_games else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
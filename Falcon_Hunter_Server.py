@@ -0,0 +1,626 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Asyncio server hosting many Falcon - Hunter chess games over a line protocol
+
+import argparse
+import asyncio
+import itertools
+import sys
+import time
+
+from Falcon_Hunter_Chess import Chessboard, GameError, MoveStatus, PositionNotation
+
+
+class ClientSession:
+    """
+    One connected player
+    Lines sent to the player wait in an outgoing queue that a separate task writes to the socket, so a slow reader
+    never holds up the rest of the server. A player who lets too many lines pile up is disconnected
+    """
+
+    def __init__(self, reader, writer, max_queued_lines):
+        """
+        :param reader: asyncio StreamReader of the connection
+        :param writer: asyncio StreamWriter of the connection
+        :param max_queued_lines: number of unsent lines allowed before the player is disconnected
+        """
+        self._reader = reader
+        self._writer = writer
+        self._max_queued_lines = max_queued_lines
+        self._outgoing = asyncio.Queue()
+        self._writer_task = asyncio.ensure_future(self._write_lines())
+        self._closed = False
+
+        # Game the player is in and the colour they play, None when not in a game
+        self._game = None
+        self._colour = None
+
+        # time.monotonic() of the player's last command or turn change, the idle timeout counts from here
+        self._clock_start = time.monotonic()
+
+    async def _write_lines(self):
+        """
+        Writes queued lines to the socket until close is called, waiting for the socket to drain after each line
+        :return: None
+        """
+        try:
+            while True:
+                line = await self._outgoing.get()
+                if line is None:
+                    break
+                self._writer.write(line.encode() + b'\n')
+                await self._writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._writer.close()
+
+    def send(self, line):
+        """
+        Queues a line for the player, disconnecting them if they have stopped reading
+        :param line: text of the line without the newline
+        :return: None
+        """
+        if self._closed:
+            return
+        if self._outgoing.qsize() >= self._max_queued_lines:
+            self.abort()
+            return
+        self._outgoing.put_nowait(line)
+
+    def close(self):
+        """
+        Closes the connection once every queued line has been written
+        :return: None
+        """
+        if not self._closed:
+            self._closed = True
+            self._outgoing.put_nowait(None)
+
+    def abort(self):
+        """
+        Closes the connection straight away, dropping any queued lines
+        :return: None
+        """
+        self._closed = True
+        self._writer_task.cancel()
+        self._writer.transport.abort()
+
+    async def wait_closed(self):
+        """
+        Waits for queued lines to be written and the connection to close
+        :return: None
+        """
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+
+    def is_closed(self):
+        """
+        :return: True once the connection is closing
+        """
+        return self._closed
+
+    def get_reader(self):
+        """
+        :return: asyncio StreamReader of the connection
+        """
+        return self._reader
+
+    def restart_clock(self):
+        """
+        Starts the idle timeout again, called for every command and every turn change
+        :return: None
+        """
+        self._clock_start = time.monotonic()
+
+    def get_idle_time(self):
+        """
+        :return: seconds since the player's last command or turn change
+        """
+        return time.monotonic() - self._clock_start
+
+    def join_game(self, game, colour):
+        """
+        :param game: ServerGame the player joins
+        :param colour: 'WHITE' or 'BLACK'
+        :return: None
+        """
+        self._game = game
+        self._colour = colour
+        self.restart_clock()
+
+    def leave_game(self):
+        """
+        :return: None
+        """
+        self._game = None
+        self._colour = None
+        self.restart_clock()
+
+    def get_game(self):
+        """
+        :return: ServerGame the player is in, None if not in a game
+        """
+        return self._game
+
+    def get_colour(self):
+        """
+        :return: 'WHITE' or 'BLACK', None if not in a game
+        """
+        return self._colour
+
+
+class ServerGame:
+    """
+    One game hosted by the server, with its own chessboard and the sessions of its two players
+    """
+
+    def __init__(self, game_id):
+        """
+        :param game_id: number identifying the game
+        """
+        self._game_id = game_id
+        self._chessboard = Chessboard()
+        self._players = {'WHITE': None, 'BLACK': None}
+
+    def get_game_id(self):
+        """
+        :return: number identifying the game
+        """
+        return self._game_id
+
+    def get_chessboard(self):
+        """
+        :return: chessboard of the game
+        """
+        return self._chessboard
+
+    def get_player(self, colour):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :return: ClientSession playing that colour, None if the seat is empty
+        """
+        return self._players[colour]
+
+    def set_player(self, colour, session):
+        """
+        :param colour: 'WHITE' or 'BLACK'
+        :param session: ClientSession taking the seat, None to empty it
+        :return: None
+        """
+        self._players[colour] = session
+
+    def broadcast(self, line):
+        """
+        :param line: line sent to both players
+        :return: None
+        """
+        for session in self._players.values():
+            if session is not None:
+                session.send(line)
+
+    def restart_clocks(self):
+        """
+        Starts both players' idle timeouts again when the turn changes
+        :return: None
+        """
+        for session in self._players.values():
+            if session is not None:
+                session.restart_clock()
+
+    def is_waiting(self, session):
+        """
+        :param session: ClientSession of one of the players
+        :return: True if the player is waiting for an opponent to join or to move
+        """
+        if None in self._players.values():
+            return True
+        return self._chessboard.get_game_manager().get_current_player() != session.get_colour()
+
+
+class GameServer:
+    """
+    Hosts many concurrent games for players connecting over TCP or a Unix socket
+    The protocol is one command per line, the server answers with one or more lines:
+    NEW                    start a game as White, answered with GAME <id> WHITE
+    JOIN <id>              take the Black seat of a waiting game, both players get START <id>
+    LIST                   GAMES followed by the ids of games waiting for a second player
+    e2, e4 or MOVE e2, e4  make a move in the usual notation, F, e2 enters a fairy piece
+    BOARD                  send the position again
+    RESIGN                 give up the game
+    PING                   answered with PONG
+    QUIT                   close the connection
+    After every move both players get MOVED <colour> <move>, then BOARD <position> with the position in
+    PositionNotation text form, then TURN <colour> or GAMEOVER <result>. Rejected commands are answered with
+    ERROR <reason>, using the MoveStatus names for illegal moves
+    Players who send nothing for the idle timeout from the start of their turn or their last command, or while not in
+    a game, are disconnected
+    """
+
+    def __init__(self, idle_timeout=300.0, max_queued_lines=256, max_line_length=1024):
+        """
+        :param idle_timeout: seconds a player may stay silent when the server is waiting on them
+        :param max_queued_lines: unsent lines allowed per player before a player who stopped reading is disconnected
+        :param max_line_length: longest command line accepted
+        """
+        self._idle_timeout = idle_timeout
+        self._max_queued_lines = max_queued_lines
+        self._max_line_length = max_line_length
+        self._games = {}
+        self._game_ids = itertools.count(1)
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        """
+        Starts listening for players
+        :param host: address to listen on
+        :param port: TCP port, 0 picks a free port
+        :param unix_path: path of a Unix socket to listen on instead of TCP
+        :return: the address the server is listening on
+        """
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self.handle_client, unix_path,
+                                                           limit=self._max_line_length)
+        else:
+            self._server = await asyncio.start_server(self.handle_client, host, port, limit=self._max_line_length)
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        """
+        :return: serves players until cancelled
+        """
+        await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Stops listening for new players
+        :return: None
+        """
+        self._server.close()
+        await self._server.wait_closed()
+
+    def get_games(self):
+        """
+        :return: mapping of game id to ServerGame for every game in progress
+        """
+        return self._games
+
+    async def handle_client(self, reader, writer):
+        """
+        Reads and handles the commands of one connection until it closes or idles out
+        :param reader: asyncio StreamReader of the connection
+        :param writer: asyncio StreamWriter of the connection
+        :return: None
+        """
+        session = ClientSession(reader, writer, self._max_queued_lines)
+        session.send("WELCOME Falcon-Hunter")
+        try:
+            while not session.is_closed():
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.get_time_left(session))
+                except asyncio.TimeoutError:
+                    # The turn may have changed while waiting, so only a player whose own clock ran out is idle
+                    if self.get_time_left(session) > 0:
+                        continue
+                    session.send("BYE idle")
+                    break
+                except ValueError:
+                    session.send("BYE line too long")
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                session.restart_clock()
+                self.handle_line(session, line.decode('utf-8', 'replace').strip())
+        finally:
+            self.leave_game(session, "OPPONENT_LEFT")
+            session.close()
+            await session.wait_closed()
+
+    def get_time_left(self, session):
+        """
+        :param session: ClientSession
+        :return: seconds the player may stay silent before being disconnected, counted from their last command or
+        the start of their turn, the full idle timeout while they wait on their opponent
+        """
+        game = session.get_game()
+        if game is not None and game.is_waiting(session):
+            return self._idle_timeout
+        return self._idle_timeout - session.get_idle_time()
+
+    def handle_line(self, session, line):
+        """
+        Carries out one command
+        :param session: ClientSession that sent the command
+        :param line: command text
+        :return: None
+        """
+        if not line:
+            return
+        command, _, argument = line.partition(' ')
+        command = command.upper()
+        if command == 'NEW':
+            self.new_game(session)
+        elif command == 'JOIN':
+            self.join_game(session, argument.strip())
+        elif command == 'LIST':
+            waiting = [str(game_id) for game_id, game in self._games.items() if game.get_player('BLACK') is None]
+            session.send(' '.join(['GAMES'] + waiting))
+        elif command == 'MOVE':
+            self.make_move(session, argument)
+        elif ',' in line:
+            self.make_move(session, line)
+        elif command == 'BOARD':
+            if session.get_game() is None:
+                session.send("ERROR not in a game")
+            else:
+                self.send_position(session.get_game(), session)
+        elif command == 'RESIGN':
+            game = session.get_game()
+            if game is None:
+                session.send("ERROR not in a game")
+            else:
+                winner = 'BLACK' if session.get_colour() == 'WHITE' else 'WHITE'
+                self.end_game(game, f"GAMEOVER {winner}_WON resign")
+        elif command == 'PING':
+            session.send("PONG")
+        elif command == 'QUIT':
+            session.send("BYE")
+            session.close()
+        else:
+            session.send(f"ERROR unknown command {command}")
+
+    def new_game(self, session):
+        """
+        :param session: ClientSession starting a game as White
+        :return: None
+        """
+        if session.get_game() is not None:
+            session.send("ERROR already in a game")
+            return
+        game = ServerGame(next(self._game_ids))
+        self._games[game.get_game_id()] = game
+        game.set_player('WHITE', session)
+        session.join_game(game, 'WHITE')
+        session.send(f"GAME {game.get_game_id()} WHITE")
+
+    def join_game(self, session, game_id):
+        """
+        :param session: ClientSession taking the Black seat
+        :param game_id: id of the game as text
+        :return: None
+        """
+        if session.get_game() is not None:
+            session.send("ERROR already in a game")
+            return
+        game = self._games.get(int(game_id)) if game_id.isdigit() else None
+        if game is None or game.get_player('BLACK') is not None:
+            session.send(f"ERROR no game {game_id} waiting for a player")
+            return
+        game.set_player('BLACK', session)
+        session.join_game(game, 'BLACK')
+        session.send(f"GAME {game.get_game_id()} BLACK")
+        game.broadcast(f"START {game.get_game_id()}")
+        game.restart_clocks()
+        self.send_position(game)
+
+    def make_move(self, session, move_text):
+        """
+        Checks and makes a move, then sends the new position to both players
+        :param session: ClientSession making the move
+        :param move_text: move in the usual notation, e.g. 'e2, e4' or 'F, e2'
+        :return: None
+        """
+        game = session.get_game()
+        if game is None:
+            session.send("ERROR not in a game")
+            return
+        if game.get_player('BLACK') is None:
+            session.send("ERROR waiting for an opponent")
+            return
+        chessboard = game.get_chessboard()
+        game_manager = chessboard.get_game_manager()
+        if game_manager.get_current_player() != session.get_colour():
+            session.send("ERROR NOT_YOUR_TURN")
+            return
+        try:
+            move = PositionNotation.parse_move(move_text)
+        except GameError:
+            session.send("ERROR UNREADABLE")
+            return
+        status = chessboard.check_move(move)
+        if status != MoveStatus.LEGAL:
+            session.send(f"ERROR {status.name}")
+            return
+
+        chessboard.make_move(move)
+        game.restart_clocks()
+        source = move[0] if len(move[0]) == 1 else move[0].lower()
+        game.broadcast(f"MOVED {session.get_colour()} {source}, {move[1].lower()}")
+        self.send_position(game)
+        if game_manager.get_game_state() != 'UNFINISHED':
+            self.end_game(game, None)
+
+    def send_position(self, game, session=None):
+        """
+        Sends the position and whose turn it is
+        :param game: ServerGame
+        :param session: ClientSession to send to, both players if not given
+        :return: None
+        """
+        chessboard = game.get_chessboard()
+        game_manager = chessboard.get_game_manager()
+        lines = [f"BOARD {PositionNotation.to_text(chessboard)}"]
+        if game_manager.get_game_state() == 'UNFINISHED':
+            lines.append(f"TURN {game_manager.get_current_player()}")
+        for line in lines:
+            if session is None:
+                game.broadcast(line)
+            else:
+                session.send(line)
+
+    def end_game(self, game, message):
+        """
+        Tells both players the result and removes the game
+        :param game: ServerGame that ended
+        :param message: line sent to both players, the game state is sent if not given
+        :return: None
+        """
+        if message is None:
+            message = f"GAMEOVER {game.get_chessboard().get_game_manager().get_game_state()}"
+        game.broadcast(message)
+        for colour in ('WHITE', 'BLACK'):
+            player = game.get_player(colour)
+            if player is not None:
+                player.leave_game()
+        self._games.pop(game.get_game_id(), None)
+
+    def leave_game(self, session, message):
+        """
+        Removes a departing player's game, telling their opponent
+        :param session: ClientSession leaving
+        :param message: line sent to the opponent
+        :return: None
+        """
+        game = session.get_game()
+        if game is None:
+            return
+        game.set_player(session.get_colour(), None)
+        session.leave_game()
+        self.end_game(game, message)
+
+
+class LineClient:
+    """
+    Minimal client speaking the server's line protocol, a stand-in for real players in scripts and checks
+    """
+
+    def __init__(self, reader, writer, timeout=5.0):
+        """
+        :param reader: asyncio StreamReader of the connection
+        :param writer: asyncio StreamWriter of the connection
+        :param timeout: seconds to wait for a line from the server
+        """
+        self._reader = reader
+        self._writer = writer
+        self._timeout = timeout
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765, unix_path=None, timeout=5.0):
+        """
+        :param host: server address
+        :param port: server TCP port
+        :param unix_path: path of the server's Unix socket, used instead of TCP if given
+        :param timeout: seconds to wait for a line from the server
+        :return: connected LineClient
+        """
+        if unix_path is not None:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, timeout)
+
+    async def send(self, line):
+        """
+        :param line: command text without the newline
+        :return: None
+        """
+        self._writer.write(line.encode() + b'\n')
+        await self._writer.drain()
+
+    async def receive(self):
+        """
+        :return: next line from the server without the newline, '' once the server has closed the connection
+        """
+        line = await asyncio.wait_for(self._reader.readline(), self._timeout)
+        return line.decode().rstrip('\n')
+
+    async def receive_until(self, prefix):
+        """
+        :param prefix: start of the line being waited for
+        :return: list of lines received, ending with the first one starting with prefix
+        """
+        lines = []
+        while True:
+            line = await self.receive()
+            lines.append(line)
+            if line.startswith(prefix) or not line:
+                return lines
+
+    async def close(self):
+        """
+        :return: closes the connection
+        """
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def run_demo():
+    """
+    Starts a server on a free port and plays a short game between two local clients, printing what they receive
+    :return: True if the game ended with the expected result
+    """
+    server = GameServer()
+    host, port = (await server.start(port=0))[:2]
+    white = await LineClient.connect(host, port)
+    black = await LineClient.connect(host, port)
+
+    await white.send("NEW")
+    game_line = (await white.receive_until("GAME"))[-1]
+    await black.send(f"JOIN {game_line.split()[1]}")
+    await white.receive_until("TURN")
+    await black.receive_until("TURN")
+
+    moves = [(white, "e2, e4"), (black, "f7, f6"), (white, "d1, h5"), (black, "g7, g6"), (white, "h5, g6"),
+             (black, "a7, a6"), (white, "g6, e8")]
+    last_line = ''
+    for player, move in moves:
+        await player.send(move)
+        white_lines = await white.receive_until("TURN" if move != moves[-1][1] else "GAMEOVER")
+        await black.receive_until("TURN" if move != moves[-1][1] else "GAMEOVER")
+        last_line = white_lines[-1]
+        print(f"{move:8} -> {' | '.join(white_lines)}")
+
+    await white.close()
+    await black.close()
+    await server.close()
+    return last_line == "GAMEOVER WHITE_WON"
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status
+    """
+    parser = argparse.ArgumentParser(description="Host Falcon - Hunter chess games over a line protocol")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="TCP port to listen on (default 8765)")
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--idle-timeout', type=float, default=300.0,
+                        help="seconds before a silent player is disconnected (default 300)")
+    parser.add_argument('--demo', action='store_true',
+                        help="play a short game between two local clients and exit")
+    args = parser.parse_args(argv)
+
+    if args.demo:
+        return 0 if asyncio.run(run_demo()) else 1
+
+    async def serve():
+        server = GameServer(idle_timeout=args.idle_timeout)
+        address = await server.start(args.host, args.port, args.unix)
+        print(f"Listening on {address}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,602 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Retrograde analysis endgame tablebases for the Falcon - Hunter chess variant
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from array import array
+
+from Falcon_Hunter_Chess import AttackTables, GameError, MaterialLedger, PositionNotation
+
+
+class Tablebase:
+    """
+    Probes solved endgames: every position with a few pieces, counting fairy pieces still in reserve, is stored as
+    won, lost or drawn for the player to move with the number of plies until a King is captured
+    One file per material, named like 'KQvK' or 'KvK(F)' with reserve fairy pieces in brackets. A file is a 32 byte
+    header (magic, version and material name) followed by one byte per position: 0 for a draw, an odd number d when
+    the player to move captures the King on ply d, an even number d when their own King is captured on ply d, and
+    255 for squares holding two pieces. A position's index is the side to move (0 for White) followed by 6 bits per
+    piece with the square of each piece, White's pieces first in KQRBNFHP order and then Black's
+    In these endings both players have lost a Queen, Rook, Knight or Bishop long ago, so fairy pieces still in reserve
+    can always be entered
+    """
+    _magic = b'FHTB'
+    _version = 1
+    _header = struct.Struct('<4sHxx24s')
+    _piece_order = 'KQRBNFHP'
+    _suffix = '.fhtb'
+
+    # Stored values that are not a distance
+    DRAW = 0
+    ILLEGAL = 255
+
+    def __init__(self, directory):
+        """
+        Memory maps every table in the directory
+        :param directory: directory holding the table files
+        """
+        self._tables = {}
+        self._files = []
+        self._max_pieces = 0
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(self._suffix):
+                continue
+            table_file = open(os.path.join(directory, file_name), 'rb')
+            table_map = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, name = self._header.unpack_from(table_map, 0)
+            if magic != self._magic or version != self._version:
+                raise ValueError(f"{file_name} is not a version {self._version} tablebase file")
+            name = name.rstrip(b'\0').decode()
+            self._files.append((table_file, table_map))
+            self._tables[name] = table_map
+            self._max_pieces = max(self._max_pieces, sum(character.isupper() for character in name))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """
+        :return: number of tables
+        """
+        return len(self._tables)
+
+    def get_max_pieces(self):
+        """
+        :return: largest number of pieces, Kings and reserve fairy pieces included, of any table
+        """
+        return self._max_pieces
+
+    @classmethod
+    def get_sort_key(cls, piece):
+        """
+        :param piece: piece name in either case
+        :return: position of the piece in the order pieces are listed in a material
+        """
+        return cls._piece_order.index(piece.upper())
+
+    @classmethod
+    def get_material_name(cls, material):
+        """
+        :param material: (White's pieces on the board, White's reserve, Black's pieces on the board, Black's reserve)
+        strings, each sorted in KQRBNFHP order
+        :return: material name, e.g. 'KQvK' or 'KvK(F)'
+        """
+        white_board, white_reserve, black_board, black_reserve = material
+        white = white_board + (f'({white_reserve})' if white_reserve else '')
+        black = black_board.upper() + (f'({black_reserve.upper()})' if black_reserve else '')
+        return f'{white}v{black}'
+
+    @classmethod
+    def get_path(cls, directory, material):
+        """
+        :param directory: directory holding the table files
+        :param material: material tuple, see get_material_name
+        :return: path of the material's table file
+        """
+        return os.path.join(directory, cls.get_material_name(material) + cls._suffix)
+
+    @staticmethod
+    def get_index(white_to_move, squares):
+        """
+        :param white_to_move: True if White is to move
+        :param squares: square index of every piece on the board, in the material's order
+        :return: index of the position in its table
+        """
+        index = 0 if white_to_move else 1
+        for square in squares:
+            index = index << 6 | square
+        return index
+
+    @staticmethod
+    def get_result(value):
+        """
+        :param value: stored value of a position
+        :return: ('WIN', plies), ('LOSS', plies) or ('DRAW', 0) for the player to move
+        """
+        if value == Tablebase.DRAW:
+            return 'DRAW', 0
+        return ('WIN' if value & 1 else 'LOSS'), value
+
+    def probe(self, chessboard):
+        """
+        Looks the chessboard's position up, cheap enough to call at every node of a search
+        :param chessboard: chessboard object
+        :return: stored value of the position, None if there is no table for its material
+        """
+        position = chessboard.get_position()
+        if position.get_occupied().bit_count() > self._max_pieces:
+            return None
+        game_manager = chessboard.get_game_manager()
+        if game_manager.get_game_state() != 'UNFINISHED':
+            return None
+        material_ledger = game_manager.get_material_ledger()
+
+        white_board = []
+        black_board = []
+        squares = []
+        for pieces, names in ((white_board, 'KQRBNFHP'), (black_board, 'kqrbnfhp')):
+            for piece in names:
+                for square in position.get_piece_squares(piece):
+                    pieces.append(piece)
+                    squares.append(square)
+        reserves = []
+        for colour, fairy_pieces in (('WHITE', 'FH'), ('BLACK', 'fh')):
+            reserve = ''.join(piece for piece in fairy_pieces if material_ledger.get_in_reserve(piece))
+            if reserve and not material_ledger.is_entry_unlocked(colour, game_manager.get_turn_count()):
+                return None
+            reserves.append(reserve)
+
+        material = (''.join(white_board), reserves[0], ''.join(black_board).lower(), reserves[1])
+        table = self._tables.get(self.get_material_name(material))
+        if table is None:
+            return None
+        index = self.get_index(game_manager.get_current_player() == 'WHITE', squares)
+        return table[self._header.size + index]
+
+    def best_move(self, chessboard):
+        """
+        Picks the quickest win, else a draw, else the slowest loss, by probing the position after every move
+        :param chessboard: chessboard object, its position must be in a table
+        :return: (move, value of the position) tuple, None if the position is not in a table
+        """
+        value = self.probe(chessboard)
+        if value is None:
+            return None
+        best_move = None
+        best_rank = None
+        for move in chessboard.generate_moves():
+            chessboard.make_move(move)
+            if chessboard.get_game_manager().get_game_state() != 'UNFINISHED':
+                reply_value = Tablebase.ILLEGAL
+            else:
+                reply_value = self.probe(chessboard)
+            chessboard.unmake_move()
+            if reply_value is None:
+                continue
+            # Ranked from the mover's side: captures the King now, wins sooner, draws, loses later
+            if reply_value == Tablebase.ILLEGAL:
+                rank = (3, 0)
+            elif reply_value == Tablebase.DRAW:
+                rank = (1, 0)
+            elif reply_value & 1:
+                rank = (0, reply_value)
+            else:
+                rank = (2, -reply_value)
+            if best_rank is None or rank > best_rank:
+                best_move = move
+                best_rank = rank
+        return (best_move, value) if best_move is not None else None
+
+    def close(self):
+        """
+        :return: None
+        """
+        for table_file, table_map in self._files:
+            table_map.close()
+            table_file.close()
+        self._files = []
+        self._tables = {}
+
+
+class TablebaseGenerator:
+    """
+    Solves every material with up to max_pieces pieces (Kings and reserve fairy pieces included) by retrograde analysis
+    Each table is solved in two passes. The forward pass visits every position once: a King capture wins at once,
+    captures and fairy piece entries lead to smaller or already solved tables and are looked up there, and the quiet
+    moves that stay in the table are counted. The retrograde pass then settles positions in order of distance, walking
+    quiet moves backwards from every settled position: a position the opponent loses from is won one ply later, and
+    a position whose quiet moves all lead to won positions for the opponent is lost once its other moves are too.
+    Positions never settled are draws
+    Materials are solved in stages of total pieces and then fairy pieces in reserve, since captures lead to fewer
+    pieces and entries to fewer pieces in reserve. Every table in a stage is solved in parallel, one per process, and
+    tables already on disk are kept so an interrupted run carries on where it stopped
+    """
+    # Opposite of each AttackTables ray direction, to walk a sliding move backwards
+    _opposite_directions = (1, 0, 3, 2, 7, 6, 5, 4)
+
+    def __init__(self, directory, max_pieces=3, processes=None):
+        """
+        :param directory: directory to write the table files to
+        :param max_pieces: largest number of pieces to solve, Kings and reserve fairy pieces included
+        :param processes: number of worker processes, defaults to the number of CPU cores, 1 solves in this process
+        """
+        self._directory = directory
+        self._max_pieces = max_pieces
+        self._processes = processes if processes else multiprocessing.cpu_count()
+
+    @classmethod
+    def get_materials(cls, max_pieces):
+        """
+        :param max_pieces: largest number of pieces, Kings and reserve fairy pieces included
+        :return: list of material tuples in the order they must be solved, see Tablebase.get_material_name
+        """
+        starting_counts = MaterialLedger.get_starting_counts()
+
+        def side_materials(budget):
+            # Every set of extra pieces for one side: board pieces within the starting counts, and each fairy piece
+            # either on the board, in reserve or captured
+            materials = [('K', '')]
+            for piece in 'QRBNP':
+                materials = [(board + piece * count, reserve) for board, reserve in materials
+                             for count in range(starting_counts[piece] + 1) if len(board) + count - 1 <= budget]
+            for piece in 'FH':
+                materials = [option for board, reserve in materials
+                             for option in ((board, reserve), (board + piece, reserve), (board, reserve + piece))
+                             if len(option[0]) + len(option[1]) - 1 <= budget]
+            return [(''.join(sorted(board, key=Tablebase.get_sort_key)), reserve) for board, reserve in materials]
+
+        budget = max_pieces - 2
+        materials = []
+        for white_board, white_reserve in side_materials(budget):
+            for black_board, black_reserve in side_materials(budget):
+                if len(white_board) + len(white_reserve) + len(black_board) + len(black_reserve) <= max_pieces:
+                    materials.append((white_board, white_reserve, black_board.lower(), black_reserve.lower()))
+        materials.sort(key=lambda material: (sum(map(len, material)), len(material[1]) + len(material[3]),
+                                             Tablebase.get_material_name(material)))
+        return materials
+
+    def generate(self, output=sys.stdout):
+        """
+        Solves every material that is not already on disk
+        :param output: stream to report each solved table on
+        :return: number of tables solved
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        stages = {}
+        for material in self.get_materials(self._max_pieces):
+            if not os.path.exists(Tablebase.get_path(self._directory, material)):
+                stage = (sum(map(len, material)), len(material[1]) + len(material[3]))
+                stages.setdefault(stage, []).append((self._directory, material))
+
+        solved = 0
+        pool = multiprocessing.Pool(self._processes) if self._processes > 1 else None
+        try:
+            for stage in sorted(stages):
+                tasks = stages[stage]
+                results = pool.imap_unordered(self._solve_task, tasks) if pool else map(self._solve_task, tasks)
+                for name, counts, elapsed in results:
+                    solved += 1
+                    print(f"{name:12} {counts['positions']:>9} positions: {counts['wins']:>9} won, "
+                          f"{counts['losses']:>9} lost, {counts['draws']:>9} drawn, longest {counts['longest']:>3} "
+                          f"plies  {elapsed:7.1f}s", file=output, flush=True)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        return solved
+
+    @staticmethod
+    def _solve_task(task):
+        """
+        :param task: (directory, material) tuple
+        :return: (material name, counts, seconds taken)
+        """
+        start_time = time.perf_counter()
+        directory, material = task
+        counts = TablebaseGenerator.solve(directory, material)
+        return Tablebase.get_material_name(material), counts, time.perf_counter() - start_time
+
+    @classmethod
+    def solve(cls, directory, material):
+        """
+        Solves one material and writes its table, every table it leads to must already be written
+        :param directory: directory holding the table files
+        :param material: material tuple, see Tablebase.get_material_name
+        :return: dictionary of positions, wins, losses and draws counts and the longest distance
+        """
+        white_board, white_reserve, black_board, black_reserve = material
+        pieces = white_board + black_board
+        piece_count = len(pieces)
+        side_shift = 6 * piece_count
+        size = 2 << side_shift
+        shifts = [6 * (piece_count - 1 - number) for number in range(piece_count)]
+        is_white = [piece.isupper() for piece in pieces]
+        kinds = [piece.upper() for piece in pieces]
+
+        king_attacks = AttackTables.get_king_attacks()
+        knight_attacks = AttackTables.get_knight_attacks()
+        slider_attacks = AttackTables.slider_attacks
+        full_mask = AttackTables.get_full_mask()
+        directions = [AttackTables.get_piece_directions(piece) if kind in 'QRBFH' else () for piece, kind in
+                      zip(pieces, kinds)]
+        reverse_directions = [tuple(cls._opposite_directions[direction] for direction in piece_directions)
+                              for piece_directions in directions]
+        pawn_pushes = {True: AttackTables.get_pawn_pushes('WHITE'), False: AttackTables.get_pawn_pushes('BLACK')}
+        pawn_attacks = {True: AttackTables.get_pawn_attacks('WHITE'), False: AttackTables.get_pawn_attacks('BLACK')}
+        home_ranks = {True: AttackTables.get_home_ranks('WHITE'), False: AttackTables.get_home_ranks('BLACK')}
+
+        # Tables reached by capturing each piece, and by entering each reserve fairy piece with where it is inserted
+        open_files = []
+
+        def open_table(sub_material):
+            table_file = open(Tablebase.get_path(directory, sub_material), 'rb')
+            table_map = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+            open_files.append((table_file, table_map))
+            return table_map
+
+        header_size = Tablebase._header.size
+        capture_tables = [None] * piece_count
+        for number, piece in enumerate(pieces):
+            if kinds[number] != 'K':
+                if is_white[number]:
+                    board = white_board[:number] + white_board[number + 1:]
+                    capture_tables[number] = open_table((board, white_reserve, black_board, black_reserve))
+                else:
+                    black_number = number - len(white_board)
+                    board = black_board[:black_number] + black_board[black_number + 1:]
+                    capture_tables[number] = open_table((white_board, white_reserve, board, black_reserve))
+        entry_tables = {True: [], False: []}
+        for white, board, reserve, offset in ((True, white_board, white_reserve, 0),
+                                               (False, black_board, black_reserve, len(white_board))):
+            for fairy_piece in reserve:
+                insert_at = offset + sum(Tablebase.get_sort_key(piece) < Tablebase.get_sort_key(fairy_piece)
+                                         for piece in board)
+                new_board = ''.join(sorted(board + fairy_piece, key=Tablebase.get_sort_key))
+                new_reserve = reserve.replace(fairy_piece, '')
+                sub_material = ((new_board, new_reserve, black_board, black_reserve) if white else
+                                (white_board, white_reserve, new_board, new_reserve))
+                entry_tables[white].append((open_table(sub_material), insert_at))
+
+        values = bytearray(size)
+        settled = bytearray(size)
+        quiet_moves = bytearray(size)
+        win_out = bytearray(size)
+        loss_out = bytearray(size)
+        draw_out = bytearray(size)
+        buckets = [array('I') for _ in range(256)]
+        # Distances are stored in a byte with 255 marking illegal positions, so the longest is 254 plies
+        overflow_message = f"Distances in {Tablebase.get_material_name(material)} do not fit in a byte"
+        get_index = Tablebase.get_index
+
+        # Forward pass
+        for index in range(size):
+            white_to_move = not index >> side_shift
+            squares = [index >> shift & 63 for shift in shifts]
+            occupant = {square: number for number, square in enumerate(squares)}
+            if len(occupant) != piece_count:
+                values[index] = Tablebase.ILLEGAL
+                settled[index] = 1
+                continue
+            own = 0
+            for number, square in enumerate(squares):
+                if is_white[number] == white_to_move:
+                    own |= 1 << square
+            occupied = sum(1 << square for square in squares)
+            opponent = occupied ^ own
+
+            # 256 until a winning capture or entry is found, a win in 255 plies is real but too long to store
+            best_win = 256
+            worst_loss = 0
+            draw = False
+            quiet_count = 0
+            king_captured = False
+            for number in range(piece_count):
+                if is_white[number] != white_to_move:
+                    continue
+                square = squares[number]
+                kind = kinds[number]
+                if kind == 'P':
+                    step = -8 if white_to_move else 8
+                    targets = pawn_pushes[white_to_move][square] & ~occupied
+                    if targets and (square >> 3) == (6 if white_to_move else 1) and \
+                            not occupied >> (square + 2 * step) & 1:
+                        targets |= 1 << (square + 2 * step)
+                    targets |= pawn_attacks[white_to_move][square] & opponent
+                elif kind == 'K':
+                    targets = king_attacks[square] & ~own
+                elif kind == 'N':
+                    targets = knight_attacks[square] & ~own
+                else:
+                    targets = slider_attacks(square, directions[number], occupied) & ~own
+                quiet_count += (targets & ~opponent).bit_count()
+
+                captures = targets & opponent
+                while captures:
+                    target_bit = captures & -captures
+                    captures ^= target_bit
+                    captured = occupant[target_bit.bit_length() - 1]
+                    if kinds[captured] == 'K':
+                        king_captured = True
+                        break
+                    new_squares = list(squares)
+                    new_squares[number] = target_bit.bit_length() - 1
+                    del new_squares[captured]
+                    reply = capture_tables[captured][header_size + get_index(not white_to_move, new_squares)]
+                    if reply == Tablebase.DRAW:
+                        draw = True
+                    elif reply & 1:
+                        worst_loss = max(worst_loss, reply + 1)
+                    else:
+                        best_win = min(best_win, reply + 1)
+                if king_captured:
+                    break
+
+            if king_captured:
+                win_out[index] = 1
+                buckets[1].append(index)
+                continue
+
+            for table, insert_at in entry_tables[white_to_move]:
+                entry_squares = home_ranks[white_to_move] & ~occupied
+                while entry_squares:
+                    square_bit = entry_squares & -entry_squares
+                    entry_squares ^= square_bit
+                    new_squares = squares[:insert_at] + [square_bit.bit_length() - 1] + squares[insert_at:]
+                    reply = table[header_size + get_index(not white_to_move, new_squares)]
+                    if reply == Tablebase.DRAW:
+                        draw = True
+                    elif reply & 1:
+                        worst_loss = max(worst_loss, reply + 1)
+                    else:
+                        best_win = min(best_win, reply + 1)
+
+            if best_win == 255 or worst_loss > 254:
+                raise ValueError(overflow_message)
+            quiet_moves[index] = quiet_count
+            win_out[index] = best_win if best_win < 256 else 0
+            loss_out[index] = worst_loss
+            draw_out[index] = draw
+            if best_win < 256:
+                buckets[best_win].append(index)
+            elif quiet_count == 0:
+                # No quiet moves: lost if every other move loses, drawn if one draws or there are no moves at all
+                if draw or not worst_loss:
+                    settled[index] = 1
+                else:
+                    buckets[worst_loss].append(index)
+
+        # Retrograde pass, settling positions in order of distance
+        side_bit = 1 << side_shift
+        for distance in range(1, 255):
+            bucket = buckets[distance]
+            for index in bucket:
+                if settled[index]:
+                    continue
+                settled[index] = 1
+                values[index] = distance
+
+                # Undo a quiet move of the player who moved last
+                last_mover_white = bool(index >> side_shift)
+                squares = [index >> shift & 63 for shift in shifts]
+                occupied = sum(1 << square for square in squares)
+                empty = full_mask ^ occupied
+                for number in range(piece_count):
+                    if is_white[number] != last_mover_white:
+                        continue
+                    square = squares[number]
+                    kind = kinds[number]
+                    if kind == 'P':
+                        step = 8 if last_mover_white else -8
+                        sources = 0
+                        if 0 <= square + step < 64 and empty >> (square + step) & 1:
+                            sources = 1 << (square + step)
+                            if (square >> 3) == (4 if last_mover_white else 3) and empty >> (square + 2 * step) & 1:
+                                sources |= 1 << (square + 2 * step)
+                    elif kind == 'K':
+                        sources = king_attacks[square] & empty
+                    elif kind == 'N':
+                        sources = knight_attacks[square] & empty
+                    else:
+                        sources = slider_attacks(square, reverse_directions[number], occupied) & empty
+
+                    base = (index ^ side_bit) & ~(63 << shifts[number])
+                    while sources:
+                        source_bit = sources & -sources
+                        sources ^= source_bit
+                        previous = base | (source_bit.bit_length() - 1) << shifts[number]
+                        if settled[previous]:
+                            continue
+                        if distance & 1:
+                            # One more of the previous position's quiet moves is known to lose, which only matters
+                            # if it has no winning move
+                            if win_out[previous]:
+                                continue
+                            quiet_moves[previous] -= 1
+                            if quiet_moves[previous] == 0:
+                                if draw_out[previous]:
+                                    settled[previous] = 1
+                                elif max(distance + 1, loss_out[previous]) > 254:
+                                    raise ValueError(overflow_message)
+                                else:
+                                    buckets[max(distance + 1, loss_out[previous])].append(previous)
+                        elif distance + 1 > 254:
+                            raise ValueError(overflow_message)
+                        else:
+                            buckets[distance + 1].append(previous)
+            buckets[distance] = None
+
+        for table_file, table_map in open_files:
+            table_map.close()
+            table_file.close()
+
+        path = Tablebase.get_path(directory, material)
+        with open(path + '.tmp', 'wb') as table_file:
+            table_file.write(Tablebase._header.pack(Tablebase._magic, Tablebase._version,
+                                                    Tablebase.get_material_name(material).encode()))
+            table_file.write(values)
+        os.replace(path + '.tmp', path)
+
+        illegal = values.count(Tablebase.ILLEGAL)
+        draws = values.count(Tablebase.DRAW)
+        wins = sum(values.count(distance) for distance in range(1, 255, 2))
+        return {
+            'positions': size - illegal,
+            'wins': wins,
+            'losses': size - illegal - draws - wins,
+            'draws': draws,
+            'longest': max((distance for distance in range(1, 255) if values.count(distance)), default=0),
+        }
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status, 1 if the position to probe is invalid or not in the tablebase
+    """
+    parser = argparse.ArgumentParser(description="Generate and probe endgame tablebases")
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate_parser = commands.add_parser('generate', help="solve every ending with up to --pieces pieces")
+    generate_parser.add_argument('directory', help="directory to write the tables to")
+    generate_parser.add_argument('--pieces', type=int, default=3,
+                                 help="most pieces, Kings and reserve fairy pieces included (default 3)")
+    generate_parser.add_argument('--processes', type=int, help="worker processes (default one per CPU core)")
+    probe_parser = commands.add_parser('probe', help="look a position up")
+    probe_parser.add_argument('directory', help="directory holding the tables")
+    probe_parser.add_argument('position', help="position in the saved position notation")
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        solved = TablebaseGenerator(args.directory, args.pieces, args.processes).generate()
+        print(f"Solved {solved} tables", file=sys.stderr)
+        return 0
+
+    try:
+        chessboard = PositionNotation.from_text(args.position)
+    except GameError as error:
+        print(f"Invalid position: {error}", file=sys.stderr)
+        return 1
+    with Tablebase(args.directory) as tablebase:
+        found = tablebase.best_move(chessboard)
+        if found is None:
+            print("The position is not in the tablebase")
+            return 1
+        move, value = found
+        result, plies = Tablebase.get_result(value)
+        source, destination = move
+        outcome = f"{result} in {plies} plies" if plies else result
+        print(f"{outcome}, best move {source.lower() if len(source) == 2 else source}, {destination.lower()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
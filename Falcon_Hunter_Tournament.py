@@ -0,0 +1,307 @@
+# Programmer(s): Anish Ramanadham
+# Github Username: ARamanadham
+# Description: Headless engine-vs-engine tournaments for the Falcon - Hunter chess variant
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+from Falcon_Hunter_Archive import ArchiveWriter
+from Falcon_Hunter_Chess import Chessboard, GameError, PositionNotation
+from Falcon_Hunter_Engine import SearchEngine
+
+
+class Tournament:
+    """
+    Plays engine-vs-engine games across a pool of worker processes, without the ChessVar input loop or board printing
+    Every game gets its own Chessboard and GameManager, and each worker builds its two engines once and reuses them
+    for every game it plays. Each opening is played twice with the engines swapping colours
+    """
+    # Openings as moves from the starting position
+    _default_openings = [
+        [],
+        [('E2', 'E4'), ('E7', 'E5')],
+        [('D2', 'D4'), ('D7', 'D5')],
+        [('E2', 'E4'), ('C7', 'C5')],
+        [('C2', 'C4'), ('E7', 'E5')],
+        [('G1', 'F3'), ('G8', 'F6')],
+        [('D2', 'D4'), ('G8', 'F6')],
+        [('E2', 'E4'), ('D7', 'D5'), ('E4', 'D5'), ('D8', 'D5')],
+    ]
+
+    # Engines built once per worker process by _initialize_worker
+    _worker_engines = None
+
+    def __init__(self, engine_a, engine_b, games=100, openings=None, processes=None, max_plies=300):
+        """
+        :param engine_a: dictionary of SearchEngine keyword arguments for engine A, e.g. {'time_limit': 0.1}
+        :param engine_b: dictionary of SearchEngine keyword arguments for engine B
+        :param games: number of games to play
+        :param openings: list of openings, each a list of moves from the starting position, defaults are used if None
+        :param processes: number of worker processes, defaults to the number of CPU cores, 1 plays in this process
+        :param max_plies: games still running after this many moves are drawn
+        """
+        self._engine_settings = (dict(engine_a), dict(engine_b))
+        self._games = games
+        self._openings = openings if openings else Tournament._default_openings
+        self._processes = processes if processes else multiprocessing.cpu_count()
+        self._max_plies = max_plies
+
+        # Results so far from engine A's point of view
+        self._wins = 0
+        self._draws = 0
+        self._losses = 0
+        self._elapsed = 0.0
+
+    @classmethod
+    def get_default_openings(cls):
+        """
+        :return: list of built in openings, each a list of moves from the starting position
+        """
+        return cls._default_openings
+
+    def run(self):
+        """
+        Plays every game, yielding each result as soon as its game finishes
+        :return: generator of result dictionaries, see play_game
+        """
+        tasks = [
+            (game_number, self._openings[(game_number // 2) % len(self._openings)], game_number % 2 == 1,
+             self._max_plies)
+            for game_number in range(self._games)
+        ]
+        start_time = time.perf_counter()
+
+        if self._processes == 1:
+            Tournament._initialize_worker(self._engine_settings)
+            results = map(Tournament._play_task, tasks)
+            for result in results:
+                self._record(result, start_time)
+                yield result
+            return
+
+        with multiprocessing.Pool(self._processes, Tournament._initialize_worker, (self._engine_settings,)) as pool:
+            for result in pool.imap_unordered(Tournament._play_task, tasks):
+                self._record(result, start_time)
+                yield result
+
+    def _record(self, result, start_time):
+        """
+        Adds a finished game to the totals
+        :param result: result dictionary of the game
+        :param start_time: perf_counter value when the tournament started
+        :return: None
+        """
+        if result['winner'] == 'A':
+            self._wins += 1
+        elif result['winner'] == 'B':
+            self._losses += 1
+        else:
+            self._draws += 1
+        self._elapsed = time.perf_counter() - start_time
+
+    def get_summary(self):
+        """
+        :return: dictionary of engine A's wins, draws, losses and score, plus games played and games per second
+        """
+        played = self._wins + self._draws + self._losses
+        return {
+            'games': played,
+            'wins': self._wins,
+            'draws': self._draws,
+            'losses': self._losses,
+            'score': (self._wins + 0.5 * self._draws) / played if played else 0.0,
+            'elapsed': self._elapsed,
+            'games_per_second': played / self._elapsed if self._elapsed > 0 else 0.0,
+        }
+
+    @staticmethod
+    def _initialize_worker(engine_settings):
+        """
+        Builds the two engines once per worker process
+        :param engine_settings: pair of SearchEngine keyword argument dictionaries for engines A and B, with the path
+        of an opening book as 'book' and the directory of a tablebase as 'tablebase'
+        :return: None
+        """
+        engines = []
+        for settings in engine_settings:
+            # Books and tablebases are opened in each worker, the settings only carry their paths
+            settings = dict(settings)
+            if settings.get('book'):
+                from Falcon_Hunter_Book import OpeningBook
+                settings['book'] = OpeningBook(settings['book'])
+            if settings.get('tablebase'):
+                from Falcon_Hunter_Tablebase import Tablebase
+                settings['tablebase'] = Tablebase(settings['tablebase'])
+            engines.append(SearchEngine(**settings))
+        Tournament._worker_engines = tuple(engines)
+
+    @staticmethod
+    def _play_task(task):
+        """
+        Plays one game in a worker process with the worker's engines
+        :param task: (game number, opening moves, True if engine A plays Black, move limit)
+        :return: result dictionary, see play_game
+        """
+        game_number, opening, a_plays_black, max_plies = task
+        engine_a, engine_b = Tournament._worker_engines
+        for engine in (engine_a, engine_b):
+            if engine.get_transposition_table() is not None:
+                engine.get_transposition_table().clear()
+
+        if a_plays_black:
+            result = Tournament.play_game(engine_b, engine_a, opening, max_plies)
+            result['white'] = 'B'
+        else:
+            result = Tournament.play_game(engine_a, engine_b, opening, max_plies)
+            result['white'] = 'A'
+        result['game'] = game_number
+
+        if result['result'] == 'DRAW':
+            result['winner'] = None
+        elif (result['result'] == 'WHITE_WON') == (result['white'] == 'A'):
+            result['winner'] = 'A'
+        else:
+            result['winner'] = 'B'
+        return result
+
+    @staticmethod
+    def play_game(white_engine, black_engine, opening=(), max_plies=300):
+        """
+        Plays one game between two engines on a fresh chessboard
+        Games are drawn when the move limit is reached, a position repeats three times or a player has no moves
+        :param white_engine: SearchEngine playing White
+        :param black_engine: SearchEngine playing Black
+        :param opening: moves to play from the starting position before the engines take over
+        :param max_plies: games still running after this many moves are drawn
+        :return: dictionary with the 'result' ('WHITE_WON', 'BLACK_WON' or 'DRAW'), the 'reason', the number of
+        'plies', the 'moves' played and the 'elapsed' seconds
+        """
+        start_time = time.perf_counter()
+        chessboard = Chessboard()
+        game_manager = chessboard.get_game_manager()
+        chessboard.apply_moves(opening)
+
+        repetitions = {chessboard.get_hash_key(): 1}
+        result = 'DRAW'
+        reason = 'move limit'
+        while len(chessboard.get_move_history()) < max_plies:
+            engine = white_engine if game_manager.get_current_player() == 'WHITE' else black_engine
+            move = engine.search(chessboard).get_best_move()
+            if move is None:
+                reason = 'no moves'
+                break
+            if not chessboard.is_legal(move):
+                raise GameError(f"Engine played an illegal move {move}")
+            chessboard.make_move(move)
+
+            if game_manager.get_game_state() != 'UNFINISHED':
+                result = game_manager.get_game_state()
+                reason = 'king captured'
+                break
+            key = chessboard.get_hash_key()
+            repetitions[key] = repetitions.get(key, 0) + 1
+            if repetitions[key] >= 3:
+                reason = 'repetition'
+                break
+
+        return {
+            'result': result,
+            'reason': reason,
+            'plies': len(chessboard.get_move_history()),
+            'moves': chessboard.get_move_history(),
+            'elapsed': time.perf_counter() - start_time,
+        }
+
+    @staticmethod
+    def load_openings(path):
+        """
+        Reads openings from a file, one opening per line with moves separated by ';', for example 'e2, e4; e7, e5'
+        Blank lines and lines starting with '#' are skipped, every opening is replayed so a bad line is reported
+        before any game starts
+        :param path: path of the openings file
+        :return: list of openings, each a list of moves, GameError is raised naming the line of an illegal opening
+        """
+        openings = []
+        with open(path) as openings_file:
+            for line_number, line in enumerate(openings_file, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    opening = PositionNotation.parse_moves(line)
+                    Chessboard().apply_moves(opening)
+                except GameError as error:
+                    raise GameError(f"{path}:{line_number}: {error}") from None
+                openings.append(opening)
+        return openings
+
+
+def main(argv=None):
+    """
+    Command line entry point, streams one line per finished game followed by the totals
+    :param argv: command line arguments, sys.argv is used if not given
+    :return: exit status
+    """
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine games across all CPU cores")
+    parser.add_argument('--games', type=int, default=100, help="number of games to play (default 100)")
+    parser.add_argument('--processes', type=int, help="worker processes (default one per CPU core)")
+    parser.add_argument('--openings', help="file of openings, one per line, e.g. 'e2, e4; e7, e5'")
+    parser.add_argument('--max-plies', type=int, default=300, help="draw games after this many moves (default 300)")
+    parser.add_argument('--archive', help="game archive to append every finished game to")
+    for name in ('a', 'b'):
+        parser.add_argument(f'--{name}-time', type=float, default=0.1,
+                            help=f"seconds per move for engine {name.upper()} (default 0.1)")
+        parser.add_argument(f'--{name}-nodes', type=int,
+                            help=f"node limit per move for engine {name.upper()}")
+        parser.add_argument(f'--{name}-depth', type=int, default=64,
+                            help=f"maximum depth for engine {name.upper()}")
+        parser.add_argument(f'--{name}-hash', type=int, default=16,
+                            help=f"transposition table MB for engine {name.upper()} (default 16)")
+        parser.add_argument(f'--{name}-quiescence', choices=['off', 'captures', 'entries'], default='captures',
+                            help=f"quiescence search for engine {name.upper()}: none, captures only, or captures and "
+                                 f"attacking fairy piece entries (default captures)")
+        parser.add_argument(f'--{name}-book', help=f"opening book for engine {name.upper()}")
+        parser.add_argument(f'--{name}-tablebase', help=f"endgame tablebase directory for engine {name.upper()}")
+    args = parser.parse_args(argv)
+
+    engines = []
+    for name in ('a', 'b'):
+        engines.append({
+            'time_limit': getattr(args, f'{name}_time'),
+            'node_limit': getattr(args, f'{name}_nodes'),
+            'max_depth': getattr(args, f'{name}_depth'),
+            'hash_size_mb': getattr(args, f'{name}_hash'),
+            'quiescence': getattr(args, f'{name}_quiescence') != 'off',
+            'quiescence_entries': getattr(args, f'{name}_quiescence') == 'entries',
+            'book': getattr(args, f'{name}_book'),
+            'tablebase': getattr(args, f'{name}_tablebase'),
+        })
+    try:
+        openings = Tournament.load_openings(args.openings) if args.openings else None
+    except GameError as error:
+        print(f"Invalid opening: {error}", file=sys.stderr)
+        return 1
+
+    tournament = Tournament(engines[0], engines[1], args.games, openings, args.processes, args.max_plies)
+    archive_writer = ArchiveWriter(args.archive) if args.archive else None
+    try:
+        for result in tournament.run():
+            print(f"Game {result['game']}: {result['white']} played White, {result['result']} "
+                  f"({result['reason']}) in {result['plies']} plies", flush=True)
+            if archive_writer is not None:
+                archive_writer.append_game(result['moves'], result['result'])
+    finally:
+        if archive_writer is not None:
+            archive_writer.close()
+
+    summary = tournament.get_summary()
+    print(f"Engine A: {summary['wins']} wins, {summary['draws']} draws, {summary['losses']} losses "
+          f"(score {summary['score']:.1%}) in {summary['elapsed']:.1f}s, "
+          f"{summary['games_per_second']:.2f} games/sec")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())